@@ -0,0 +1,45 @@
+"""Added build done ledger
+
+Revision ID: 5b8e0f7c2d41
+Revises: cd510df3fa78
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from alws.constants import BuildDoneStatus
+
+
+# revision identifiers, used by Alembic.
+revision = "5b8e0f7c2d41"
+down_revision = "cd510df3fa78"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "build_done_ledger",
+        sa.Column("build_task_id", sa.Integer(), nullable=False),
+        sa.Column("artifacts_digest", sa.Text(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(BuildDoneStatus, name="builddonestatus"),
+            nullable=False,
+        ),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["build_task_id"],
+            ["build_tasks.id"],
+            name="build_done_ledger_build_task_id_fk",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("build_task_id", "artifacts_digest"),
+    )
+
+
+def downgrade():
+    op.drop_table("build_done_ledger")
+    enum = sa.Enum(BuildDoneStatus, name="builddonestatus")
+    enum.drop(op.get_bind())
@@ -17,6 +17,9 @@ from alws.auth.schemas import UserRead
 from alws.config import settings
 from alws.middlewares import handlers
 from alws.test_scheduler import TestTaskScheduler
+from alws.utils.build_task_heartbeats import BUILD_TASK_HEARTBEATS
+from alws.utils.pulp_client import close_pulp_connection_pool
+from alws.utils.pulp_repo_pool import PULP_REPO_POOL
 
 
 logging.basicConfig(level=settings.logging_level)
@@ -39,6 +42,42 @@ app = FastAPI()
 app.add_middleware(ExceptionMiddleware, handlers=handlers)
 
 
+heartbeats_flusher = None
+
+
+@app.on_event('startup')
+async def start_heartbeats_flusher():
+    global heartbeats_flusher
+    heartbeats_flusher = asyncio.create_task(BUILD_TASK_HEARTBEATS.run())
+
+
+@app.on_event('shutdown')
+async def close_pulp_connections():
+    await close_pulp_connection_pool()
+
+
+@app.on_event('shutdown')
+async def stop_heartbeats_flusher():
+    if heartbeats_flusher is not None:
+        heartbeats_flusher.cancel()
+
+
+repo_pool_refiller = None
+
+
+@app.on_event('startup')
+async def start_repo_pool_refiller():
+    global repo_pool_refiller
+    if PULP_REPO_POOL.enabled:
+        repo_pool_refiller = asyncio.create_task(PULP_REPO_POOL.run())
+
+
+@app.on_event('shutdown')
+async def stop_repo_pool_refiller():
+    if repo_pool_refiller is not None:
+        repo_pool_refiller.cancel()
+
+
 if settings.test_task_scheduler_enabled:
     scheduler = None
     terminate_event = threading.Event()
@@ -5,7 +5,9 @@ import logging
 import typing
 import re
 
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
 
 from alws import models
@@ -13,7 +15,10 @@ from alws.errors import DataNotFoundError, EmptyBuildError
 from alws.config import settings
 from alws.schemas import build_schema
 from alws.constants import BuildTaskStatus, BuildTaskRefType
-from alws.utils.beholder_client import BeholderClient
+from alws.utils.beholder_client import (
+    BeholderClient,
+    get_build_beholder_cache,
+)
 from alws.utils.gitea import (
     GiteaClient,
 )
@@ -26,20 +31,119 @@ from alws.utils.modularity import (
 from alws.utils.multilib import MultilibProcessor
 from alws.utils.parsing import get_clean_distr_name, parse_git_ref
 from alws.utils.pulp_client import PulpClient
+from alws.utils.pulp_repo_pool import PULP_REPO_POOL
+
+__all__ = ['BuildPlanner', 'BulkBuildTasks']
+
+
+class BulkBuildTasks:
+    """
+    Build tasks of a mass rebuild kept as plain rows instead of ORM objects.
+
+    Tasks are numbered in the order they are added, dependencies refer
+    to these numbers. `write` reserves ids from table sequences and inserts
+    refs, tasks and dependencies with executemany in chunks of `chunk_size`.
+    """
+
+    def __init__(self, build: models.Build, chunk_size: int = 1000):
+        self._build = build
+        self._chunk_size = chunk_size
+        self._refs = []
+        self._ref_numbers = {}
+        self.tasks = []
+        self.dependencies = []
+
+    def add_task(
+                self,
+                ref: models.BuildTaskRef,
+                platform: models.Platform,
+                rpm_module: typing.Optional[models.RpmModule],
+                dependencies: typing.List[int],
+                **fields,
+            ) -> int:
+        ref_number = self._ref_numbers.get(id(ref))
+        if ref_number is None:
+            ref_number = len(self._refs)
+            self._ref_numbers[id(ref)] = ref_number
+            self._refs.append(ref)
+        task_number = len(self.tasks)
+        # Modules get their ids when the session is flushed before `write`
+        self.tasks.append((ref_number, platform.id, rpm_module, fields))
+        self.dependencies.extend(
+            (task_number, dependency) for dependency in dependencies
+        )
+        return task_number
+
+    async def _reserve_ids(
+                self, db: AsyncSession, table, count: int) -> typing.List[int]:
+        if not count:
+            return []
+        sequence = f'{table.name}_id_seq'
+        return (await db.execute(
+            select(func.nextval(sequence))
+            .select_from(func.generate_series(1, count))
+        )).scalars().all()
+
+    async def _insert(self, db: AsyncSession, table, rows: list):
+        for start in range(0, len(rows), self._chunk_size):
+            await db.execute(
+                insert(table), rows[start:start + self._chunk_size])
+            logging.info(
+                'Build %d: %d of %d %s rows are written',
+                self._build.id,
+                min(start + self._chunk_size, len(rows)),
+                len(rows),
+                table.name,
+            )
 
-__all__ = ['BuildPlanner']
+    async def write(self, db: AsyncSession):
+        ref_table = models.BuildTaskRef.__table__
+        task_table = models.BuildTask.__table__
+        ref_ids = await self._reserve_ids(db, ref_table, len(self._refs))
+        task_ids = await self._reserve_ids(db, task_table, len(self.tasks))
+        await self._insert(db, ref_table, [
+            {
+                'id': ref_id,
+                'url': ref.url,
+                'git_ref': ref.git_ref,
+                'ref_type': ref.ref_type,
+                'git_commit_hash': ref.git_commit_hash,
+            }
+            for ref_id, ref in zip(ref_ids, self._refs)
+        ])
+        await self._insert(db, task_table, [
+            {
+                'id': task_id,
+                'build_id': self._build.id,
+                'ref_id': ref_ids[ref_number],
+                'platform_id': platform_id,
+                'rpm_module_id': rpm_module.id if rpm_module else None,
+                'is_cas_authenticated': False,
+                **fields,
+            }
+            for task_id, (ref_number, platform_id, rpm_module, fields)
+            in zip(task_ids, self.tasks)
+        ])
+        await self._insert(db, models.BuildTaskDependency, [
+            {
+                'build_task_id': task_ids[task_number],
+                'build_task_dependency': task_ids[dependency],
+            }
+            for task_number, dependency in self.dependencies
+        ])
 
 
 class BuildPlanner:
 
     def __init__(
                 self,
-                db: Session,
+                db: AsyncSession,
                 build: models.Build,
                 platforms: typing.List[build_schema.BuildCreatePlatforms],
                 platform_flavors: typing.Optional[typing.List[int]],
                 is_secure_boot: bool,
                 module_build_index: typing.Optional[dict],
+                bulk_mode: bool = False,
             ):
         self._db = db
         self._gitea_client = GiteaClient(
@@ -51,6 +155,12 @@ class BuildPlanner:
             settings.pulp_user,
             settings.pulp_password
         )
+        # The same module data is requested for every arch and flavour
+        self._beholder_client = BeholderClient(
+            settings.beholder_host,
+            token=settings.beholder_token,
+            cache=get_build_beholder_cache(),
+        )
         self._build = build
         self._task_index = 0
         self._request_platforms = {}
@@ -61,17 +171,29 @@ class BuildPlanner:
         self._module_build_index = module_build_index or {}
         self._module_modified_cache = {}
         self._tasks_cache = collections.defaultdict(list)
+        # Mass rebuilds don't create ORM objects for their tasks
+        self._bulk_tasks = (
+            BulkBuildTasks(build, settings.build_bulk_creation_chunk_size)
+            if bulk_mode else None
+        )
+        self._pooled_repos = []
+        self._modified_pooled_repos = set()
         self._is_secure_boot = is_secure_boot
+        self._platform_flavor_ids = platform_flavors
+        self._module_semaphore = asyncio.Semaphore(
+            settings.build_planner_module_concurrency)
         for platform in platforms:
             self._request_platforms[platform.name] = platform.arch_list
             self._parallel_modes[platform.name] = platform.parallel_mode_enabled
-        self.load_platforms()
-        if platform_flavors:
-            self.load_platform_flavors(platform_flavors)
 
-    def load_platforms(self):
+    async def load(self):
+        await self.load_platforms()
+        if self._platform_flavor_ids:
+            await self.load_platform_flavors(self._platform_flavor_ids)
+
+    async def load_platforms(self):
         platform_names = list(self._request_platforms.keys())
-        self._platforms = self._db.execute(select(models.Platform).where(
+        self._platforms = await self._db.execute(select(models.Platform).where(
             models.Platform.name.in_(platform_names)))
         self._platforms = self._platforms.scalars().all()
         if len(self._platforms) != len(platform_names):
@@ -83,12 +205,12 @@ class BuildPlanner:
                 f'platforms: {missing_platforms} cannot be found in database'
             )
 
-    def load_platform_flavors(self, flavors):
-        db_flavors = self._db.execute(
+    async def load_platform_flavors(self, flavors):
+        db_flavors = (await self._db.execute(
             select(models.PlatformFlavour)
             .where(models.PlatformFlavour.id.in_(flavors))
             .options(selectinload(models.PlatformFlavour.repos))
-        ).scalars().all()
+        )).scalars().all()
         if db_flavors:
             self._platform_flavors = db_flavors
 
@@ -112,10 +234,17 @@ class BuildPlanner:
         repo_name = (
             f'{platform.name}-{arch}-{self._build.id}-{debug_suffix}br'
         )
-        repo_url, pulp_href = await self._pulp_client.create_build_rpm_repo(
-            repo_name)
+        pooled_repo = await PULP_REPO_POOL.claim('rpm')
+        if pooled_repo:
+            repo_url, pulp_href = pooled_repo['url'], pooled_repo['pulp_href']
+            self._pooled_repos.append((pooled_repo, repo_name, 'rpm', 'rpm'))
+        else:
+            repo_url, pulp_href = (
+                await self._pulp_client.create_build_rpm_repo(repo_name))
         modules = self._modules_by_target.get((platform.name, arch), [])
         if modules and not is_debug:
+            # Repository with build content can't be returned to the pool
+            self._modified_pooled_repos.add(pulp_href)
             await self._pulp_client.modify_repository(
                 pulp_href, add=[module.pulp_href for module in modules]
             )
@@ -132,8 +261,14 @@ class BuildPlanner:
     async def create_log_repo(self, repo_type: str,
                               repo_prefix: str = 'build_logs'):
         repo_name = f'build-{self._build.id}-{repo_type}'
-        repo_url, repo_href = await self._pulp_client.create_log_repo(
-            repo_name, distro_path_start=repo_prefix)
+        pooled_repo = await PULP_REPO_POOL.claim(repo_type)
+        if pooled_repo:
+            repo_url, repo_href = pooled_repo['url'], pooled_repo['pulp_href']
+            self._pooled_repos.append(
+                (pooled_repo, repo_name, 'file', repo_type))
+        else:
+            repo_url, repo_href = await self._pulp_client.create_log_repo(
+                repo_name, distro_path_start=repo_prefix)
         repo = models.Repository(
             name=repo_name,
             url=repo_url,
@@ -170,7 +305,59 @@ class BuildPlanner:
             # Add source RPM repository
             tasks.append(self.create_build_repo(platform, 'src', 'rpm'))
 
-        await asyncio.gather(*tasks)
+        # Every repository should be claimed or created before
+        # a failure is raised, so claimed ones can be released
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def rename_pooled_repos(self):
+        # Repositories are already used by the build under pooled names,
+        # so failed renames are retried by the pool refiller
+        results = await asyncio.gather(
+            *(
+                self._pulp_client.rename_repository(
+                    pooled_repo['pulp_href'],
+                    pooled_repo['name'],
+                    repo_name,
+                    repo_type=repo_type,
+                )
+                for pooled_repo, repo_name, repo_type, _ in self._pooled_repos
+            ),
+            return_exceptions=True,
+        )
+        for (pooled_repo, repo_name, repo_type, _), result in zip(
+                self._pooled_repos, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    'Cannot rename pooled repository %s to %s: %s',
+                    pooled_repo['name'], repo_name, result,
+                )
+                await PULP_REPO_POOL.schedule_rename(
+                    pooled_repo, repo_name, repo_type)
+
+    async def release_pooled_repos(self):
+        """
+        Returns claimed repositories to the pool when the build
+        can't be started, repositories with build content are deleted.
+        """
+        for pooled_repo, _, repo_type, kind in self._pooled_repos:
+            if pooled_repo['pulp_href'] not in self._modified_pooled_repos:
+                await PULP_REPO_POOL.release(kind, pooled_repo)
+                continue
+            try:
+                await self._pulp_client.delete_repository_with_distro(
+                    pooled_repo['pulp_href'],
+                    pooled_repo['name'],
+                    repo_type=repo_type,
+                )
+            except Exception:
+                logging.exception(
+                    'Cannot delete pooled repository %s',
+                    pooled_repo['name'],
+                )
+        self._pooled_repos = []
 
     async def add_linked_builds(self, linked_build):
         self._build.linked_builds.append(linked_build)
@@ -209,15 +396,14 @@ class BuildPlanner:
         if not settings.package_beholder_enabled:
             return {}
 
-        beholder_client = BeholderClient(
-            settings.beholder_host, token=settings.beholder_token)
         multilib_artifacts = {}
 
         for platform in self._platforms:
             platform_name = get_clean_distr_name(platform.name)
             multilib_artifacts[platform.name] = \
                 await self.get_platform_multilib_artifacts(
-                    beholder_client, platform_name, platform.distr_version,
+                    self._beholder_client, platform_name,
+                    platform.distr_version,
                     task, has_devel=has_devel)
 
         return multilib_artifacts
@@ -278,8 +464,7 @@ class BuildPlanner:
         if not settings.package_beholder_enabled:
             return {}
 
-        beholder = BeholderClient(
-            settings.beholder_host, token=settings.beholder_token)
+        beholder = self._beholder_client
         clean_name = get_clean_distr_name(platform_name)
         arch = task_arch
         if task_arch == 'i686':
@@ -353,6 +538,58 @@ class BuildPlanner:
 
         return index
 
+    async def _create_arch_module(
+            self,
+            platform: models.Platform,
+            task: build_schema.BuildTaskModuleRef,
+            arch: str,
+            module_version: int,
+    ) -> typing.Tuple[ModuleWrapper, models.RpmModule]:
+        # Module indexes of different arches are independent,
+        # the number of concurrent Beholder and Pulp calls is limited
+        async with self._module_semaphore:
+            module_index = await self.prepare_module_index(
+                platform, task, arch)
+            module = module_index.get_module(
+                task.module_name, task.module_stream)
+            module.add_module_dependencies_from_mock_defs(
+                enabled_modules=task.enabled_modules)
+            module.version = module_version
+            module.context = module.generate_new_context()
+            module.arch = arch
+            module.set_arch_list(
+                self._request_platforms[platform.name]
+            )
+            module_index.add_module(module)
+            if module_index.has_devel_module() and not module.is_devel:
+                devel_module = module_index.get_module(
+                    f'{task.module_name}-devel', task.module_stream)
+                devel_module.version = module.version
+                devel_module.context = module.context
+                devel_module.arch = module.arch
+                devel_module.set_arch_list(
+                    self._request_platforms[platform.name]
+                )
+                devel_module.add_module_dependency_to_devel_module(
+                    module=module)
+            module_pulp_href, sha256 = await self._pulp_client.create_module(
+                module_index.render(),
+                module.name,
+                module.stream,
+                module.context,
+                module.arch
+            )
+        db_module = models.RpmModule(
+            name=module.name,
+            version=str(module.version),
+            stream=module.stream,
+            context=module.context,
+            arch=module.arch,
+            pulp_href=module_pulp_href,
+            sha256=sha256
+        )
+        return module, db_module
+
     async def add_task(self, task: build_schema.BuildTaskRef):
         if isinstance(task, build_schema.BuildTaskRef) and not task.is_module:
             await self._add_single_ref(models.BuildTaskRef(
@@ -377,8 +614,9 @@ class BuildPlanner:
             if devel_module:
                 module_templates.append(devel_module.render())
         else:
-            raw_refs, module_templates = await build_schema.get_module_refs(
-                task, self._platforms[0], self._platform_flavors
+            raw_refs, module_templates, _ = await build_schema.get_module_refs(
+                task, self._platforms[0], self._platform_flavors,
+                beholder_client=self._beholder_client,
             )
         refs = [
             models.BuildTaskRef(
@@ -424,48 +662,13 @@ class BuildPlanner:
                 mock_enabled_modules.extend(
                     task.refs[0].mock_options.get("module_enable", [])
                 )
-            for arch in self._request_platforms[platform.name]:
-                module_index = await self.prepare_module_index(
-                    platform, task, arch)
-                module = module_index.get_module(
-                    task.module_name, task.module_stream)
-                module.add_module_dependencies_from_mock_defs(
-                    enabled_modules=task.enabled_modules)
-                mock_options['module_enable'] = mock_enabled_modules
-                module.version = module_version
-                module.context = module.generate_new_context()
-                module.arch = arch
-                module.set_arch_list(
-                    self._request_platforms[platform.name]
-                )
-                module_index.add_module(module)
-                if module_index.has_devel_module() and not module.is_devel:
-                    devel_module = module_index.get_module(
-                        f'{task.module_name}-devel', task.module_stream)
-                    devel_module.version = module.version
-                    devel_module.context = module.context
-                    devel_module.arch = module.arch
-                    devel_module.set_arch_list(
-                        self._request_platforms[platform.name]
-                    )
-                    devel_module.add_module_dependency_to_devel_module(
-                        module=module)
-                module_pulp_href, sha256 = await self._pulp_client.create_module(
-                    module_index.render(),
-                    module.name,
-                    module.stream,
-                    module.context,
-                    module.arch
-                )
-                db_module = models.RpmModule(
-                    name=module.name,
-                    version=str(module.version),
-                    stream=module.stream,
-                    context=module.context,
-                    arch=module.arch,
-                    pulp_href=module_pulp_href,
-                    sha256=sha256
-                )
+            mock_options['module_enable'] = mock_enabled_modules
+            arch_modules = await asyncio.gather(*(
+                self._create_arch_module(platform, task, arch, module_version)
+                for arch in self._request_platforms[platform.name]
+            ))
+            for arch, (module, db_module) in zip(
+                    self._request_platforms[platform.name], arch_modules):
                 self._modules_by_target[(platform.name, arch)].append(
                     db_module)
         all_modules = []
@@ -531,33 +734,57 @@ class BuildPlanner:
                         mock_options['definitions']['dist'] = dist_macro
                 if not dist_taken_by_user and parsed_dist_macro:
                     mock_options['definitions']['dist'] = f'.{parsed_dist_macro}'
-                build_task = models.BuildTask(
-                    arch=arch,
-                    platform=platform,
-                    status=BuildTaskStatus.IDLE,
-                    index=self._task_index,
-                    ref=ref,
-                    rpm_module=modules[0] if modules else None,
-                    is_secure_boot=self._is_secure_boot,
-                    mock_options=mock_options,
-                )
+                # Only the transitive reduction of dependencies is stored:
+                # previous task of the same platform and arch waits for
+                # all earlier ones, as the previous arch task of the ref
+                # in the sequential mode does
                 task_key = (platform.name, arch)
-                self._tasks_cache[task_key].append(build_task)
-                if first_ref_dep and is_parallel:
-                    build_task.dependencies.append(first_ref_dep)
-                idx = self._task_index - 1
-                while idx >= 0:
-                    dep = self._tasks_cache[task_key][idx]
-                    build_task.dependencies.append(dep)
-                    idx -= 1
-                if not is_parallel:
-                    for dep in arch_tasks:
-                        build_task.dependencies.append(dep)
+                lane_tasks = self._tasks_cache[task_key]
+                dependencies = []
+                if lane_tasks:
+                    dependencies.append(lane_tasks[-1])
+                if first_ref_dep is not None and is_parallel:
+                    dependencies.append(first_ref_dep)
+                if not is_parallel and arch_tasks:
+                    dependencies.append(arch_tasks[-1])
+                task_fields = {
+                    'arch': arch,
+                    'status': BuildTaskStatus.IDLE,
+                    'index': self._task_index,
+                    'is_secure_boot': self._is_secure_boot,
+                    'mock_options': mock_options,
+                }
+                if self._bulk_tasks is not None:
+                    build_task = self._bulk_tasks.add_task(
+                        ref,
+                        platform,
+                        modules[0] if modules else None,
+                        dependencies,
+                        **task_fields,
+                    )
+                else:
+                    build_task = models.BuildTask(
+                        platform=platform,
+                        ref=ref,
+                        rpm_module=modules[0] if modules else None,
+                        dependencies=dependencies,
+                        **task_fields,
+                    )
+                    self._build.tasks.append(build_task)
+                lane_tasks.append(build_task)
                 if first_ref_dep is None:
                     first_ref_dep = build_task
                 arch_tasks.append(build_task)
-                self._build.tasks.append(build_task)
         self._task_index += 1
 
+    async def write_bulk_tasks(self):
+        """
+        Writes tasks collected in the bulk mode, the session should be
+        flushed before, so the build and its modules have ids.
+        """
+        if self._bulk_tasks is None:
+            return
+        await self._bulk_tasks.write(self._db)
+
     def create_build(self):
         return self._build
@@ -13,6 +13,7 @@ __all__ = [
     "REQUEST_TIMEOUT",
     "SYSTEM_USER_NAME",
     "UPLOAD_FILE_CHUNK_SIZE",
+    "BuildDoneStatus",
     "BuildTaskStatus",
     "BuildTaskRefType",
     "ExportStatus",
@@ -109,6 +110,12 @@ class TestCaseStatus(enum.IntEnum):
     SKIPPED = 4
 
 
+class BuildDoneStatus(enum.Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    DONE = "done"
+
+
 class ErrataPackageStatus(enum.Enum):
     proposal = "proposal"
     skipped = "skipped"
@@ -1,19 +1,28 @@
 import asyncio
+import copy
 import datetime
+import itertools
 import logging
 import traceback
 import typing
 from collections import defaultdict
+from contextlib import asynccontextmanager
 
 import sqlalchemy
 from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from alws import models
 from alws.config import settings
-from alws.constants import BuildTaskStatus, ErrataPackageStatus
+from alws.constants import (
+    BuildDoneStatus,
+    BuildTaskStatus,
+    ErrataPackageStatus,
+)
+from alws.dependencies import get_db
 from alws.errors import (
     ArtifactChecksumError,
     ArtifactConversionError,
@@ -22,74 +31,222 @@ from alws.errors import (
     SrpmProvisionError,
 )
 from alws.schemas import build_node_schema
+from alws.utils.build_task_dispatcher import (
+    BUILD_TASK_DISPATCHER,
+    notify_build_tasks_ready,
+)
+from alws.utils.build_task_environment import (
+    BUILD_TASK_ENVIRONMENT_CACHE,
+)
+from alws.utils.build_task_heartbeats import BUILD_TASK_HEARTBEATS
 from alws.utils.modularity import IndexWrapper
 from alws.utils.multilib import MultilibProcessor
 from alws.utils.noarch import save_noarch_packages
 from alws.utils.parsing import clean_release, parse_rpm_nevra
 from alws.utils.pulp_client import PulpClient
+from alws.utils.pulp_content_converter import PulpContentConverter
 from alws.utils.rpm_package import get_rpm_packages_info
+from alws.utils.stage_graph import StageGraph
+
+
+# Every key takes 3 query parameters, asyncpg allows up to 32767
+ERRATA_MATCH_CHUNK_SIZE = 5000
 
 
 async def get_available_build_task(
     db: AsyncSession,
     request: build_node_schema.RequestTask,
 ) -> typing.Optional[models.BuildTask]:
+    ts_expired = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=settings.build_task_lease_timeout,
+    )
     async with db.begin():
-        # TODO: here should be config value
-        ts_expired = datetime.datetime.utcnow() - datetime.timedelta(
-            minutes=20
-        )
-        db_task = await db.execute(
-            select(models.BuildTask)
-            .where(~models.BuildTask.dependencies.any())
-            .with_for_update()
-            .filter(
-                sqlalchemy.and_(
+        # Only task id is locked here, rows which are locked by
+        # concurrent build nodes are skipped instead of waiting for them
+        task_id = (
+            await db.execute(
+                select(models.BuildTask.id)
+                .where(
                     models.BuildTask.status < BuildTaskStatus.COMPLETED,
                     models.BuildTask.arch.in_(request.supported_arches),
                     sqlalchemy.or_(
                         models.BuildTask.ts < ts_expired,
                         models.BuildTask.ts.is_(None),
                     ),
+                    ~sqlalchemy.exists().where(
+                        models.BuildTaskDependency.c.build_task_id
+                        == models.BuildTask.id,
+                    ),
+                    # Build is reported, results are being processed
+                    ~sqlalchemy.exists().where(
+                        models.BuildDoneLedgerEntry.build_task_id
+                        == models.BuildTask.id,
+                        models.BuildDoneLedgerEntry.status
+                        != BuildDoneStatus.DONE,
+                        models.BuildDoneLedgerEntry.updated_at
+                        >= get_build_done_expiration_ts(),
+                    ),
                 )
+                .order_by(models.BuildTask.id.asc())
+                .limit(1)
+                .with_for_update(skip_locked=True)
             )
+        ).scalar()
+        if task_id is None:
+            return
+        await db.execute(
+            update(models.BuildTask)
+            .where(models.BuildTask.id == task_id)
+            .values(
+                ts=datetime.datetime.utcnow(),
+                status=BuildTaskStatus.STARTED,
+            )
+        )
+    db_task = await db.execute(
+        select(models.BuildTask)
+        .where(models.BuildTask.id == task_id)
+        .options(
+            selectinload(models.BuildTask.ref),
+            selectinload(models.BuildTask.artifacts),
+            selectinload(models.BuildTask.rpm_module),
+        )
+    )
+    return db_task.scalars().first()
+
+
+async def __load_build_task_environment(
+    db: AsyncSession,
+    build_id: int,
+    platform_id: int,
+    arch: str,
+) -> build_node_schema.TaskEnvironment:
+    build = (
+        await db.execute(
+            select(models.Build)
+            .where(models.Build.id == build_id)
             .options(
-                selectinload(models.BuildTask.ref),
-                selectinload(models.BuildTask.build).selectinload(
+                selectinload(models.Build.repos),
+                selectinload(models.Build.owner),
+                selectinload(models.Build.linked_builds).selectinload(
                     models.Build.repos
                 ),
-                selectinload(models.BuildTask.platform).selectinload(
-                    models.Platform.repos
+                selectinload(models.Build.platform_flavors).selectinload(
+                    models.PlatformFlavour.repos
                 ),
-                selectinload(models.BuildTask.build).selectinload(
-                    models.Build.owner
-                ),
-                selectinload(models.BuildTask.build)
-                .selectinload(models.Build.linked_builds)
-                .selectinload(models.Build.repos),
-                selectinload(models.BuildTask.build)
-                .selectinload(models.Build.platform_flavors)
-                .selectinload(models.PlatformFlavour.repos),
-                selectinload(models.BuildTask.artifacts),
-                selectinload(models.BuildTask.rpm_module),
             )
-            .order_by(models.BuildTask.id.asc())
         )
-        db_task = db_task.scalars().first()
-        if not db_task:
-            return
-        db_task.ts = datetime.datetime.utcnow()
-        db_task.status = BuildTaskStatus.STARTED
-        await db.commit()
-    return db_task
+    ).scalars().first()
+    platform = (
+        await db.execute(
+            select(models.Platform)
+            .where(models.Platform.id == platform_id)
+            .options(selectinload(models.Platform.repos))
+        )
+    ).scalars().first()
+    # Platform data is modified below, it shouldn't affect the ORM object
+    task_platform = build_node_schema.TaskPlatform(
+        name=platform.name,
+        type=platform.type,
+        data=copy.deepcopy(platform.data),
+    )
+    repositories = []
+    for repo in itertools.chain(platform.repos, build.repos):
+        if repo.arch == arch and repo.type != "build_log":
+            repositories.append(repo)
+    for linked_build in build.linked_builds:
+        for repo in linked_build.repos:
+            if repo.arch == arch and repo.type != "build_log":
+                repositories.append(repo)
+    for flavour in build.platform_flavors:
+        if flavour.data:
+            for key in ("macros", "secure_boot_macros"):
+                if (
+                    "mock" not in flavour.data
+                    or key not in flavour.data["mock"]
+                ):
+                    continue
+                if key not in task_platform.data["mock"]:
+                    task_platform.data["mock"][key] = {}
+                task_platform.data["mock"][key].update(
+                    flavour.data["mock"][key]
+                )
+            if "definitions" in flavour.data:
+                task_platform.data["definitions"].update(
+                    flavour.data["definitions"]
+                )
+        for repo in flavour.repos:
+            if repo.arch == arch:
+                repositories.append(repo)
+    if build.mock_options:
+        task_platform.add_mock_options(build.mock_options)
+    return build_node_schema.TaskEnvironment(
+        platform=task_platform,
+        repositories=[
+            build_node_schema.TaskRepo(
+                name=repo.name,
+                url=repo.url,
+                priority=repo.priority,
+                # mock_enabled flag can be None for old repos
+                mock_enabled=(
+                    True if repo.mock_enabled is None else repo.mock_enabled
+                ),
+            )
+            for repo in repositories
+        ],
+        created_by=build_node_schema.TaskCreatedBy(
+            name=build.owner.username,
+            email=build.owner.email,
+        ),
+    )
 
 
-def add_build_task_dependencies(
-    db: AsyncSession,
+async def get_build_task_environment(
     task: models.BuildTask,
-    last_task: models.BuildTask,
-):
-    task.dependencies.append(last_task)
+    db: typing.Optional[AsyncSession] = None,
+) -> build_node_schema.TaskEnvironment:
+    """
+    Returns platform data, repositories and build owner for the task,
+    they are the same for all tasks of the build, platform and arch.
+    Database session is opened only if the environment isn't cached.
+    """
+
+    async def create():
+        if db is not None:
+            return await __load_build_task_environment(
+                db, task.build_id, task.platform_id, task.arch
+            )
+        async with asynccontextmanager(get_db)() as session:
+            return await __load_build_task_environment(
+                session, task.build_id, task.platform_id, task.arch
+            )
+
+    return await BUILD_TASK_ENVIRONMENT_CACHE.get_or_create(
+        (task.build_id, task.platform_id, task.arch),
+        create,
+    )
+
+
+async def wait_for_available_build_task(
+    request: build_node_schema.RequestTask,
+    timeout: float,
+) -> typing.Optional[models.BuildTask]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    with BUILD_TASK_DISPATCHER.subscribe(request.supported_arches) as ready:
+        while True:
+            ready.clear()
+            # Session is opened only for the claim attempt
+            async with asynccontextmanager(get_db)() as db:
+                task = await get_available_build_task(db, request)
+            if task is not None:
+                return task
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
 
 
 async def get_failed_build_tasks_matrix(db: AsyncSession, build_id: int):
@@ -122,107 +279,162 @@ async def get_failed_build_tasks_matrix(db: AsyncSession, build_id: int):
     return failed_matrix
 
 
+class FailedBuildItemsRestart(typing.NamedTuple):
+    tasks: typing.List[models.BuildTask]
+    drop_srpm_task_ids: typing.Set[int]
+    # (build_task_id, build_task_dependency) pairs
+    dependencies: typing.List[typing.Tuple[int, int]]
+
+
+def plan_failed_build_items_restart_in_parallel(
+    tasks_matrix: typing.Dict[int, typing.Dict[tuple, models.BuildTask]],
+) -> FailedBuildItemsRestart:
+    restart = FailedBuildItemsRestart([], set(), [])
+    # Last idle task of previous indexes, failed tasks are idle
+    # after restart. It waits for earlier ones, so like at build creation
+    # only the transitive reduction of dependencies is stored
+    last_idle_tasks = {}
+    for index_dict in tasks_matrix.values():
+        first_index_dep = None
+        has_completed_tasks = any(
+            task.status == BuildTaskStatus.COMPLETED
+            for task in index_dict.values()
+        )
+        drop_srpm = all(
+            task.status == BuildTaskStatus.FAILED
+            for task in index_dict.values()
+        )
+        for key in sorted(
+            index_dict.keys(),
+            key=lambda x: x[1] == "i686",
+            reverse=True,
+        ):
+            task = index_dict[key]
+            if task.status != BuildTaskStatus.FAILED:
+                continue
+            restart.tasks.append(task)
+            if task.built_srpm_url and drop_srpm:
+                restart.drop_srpm_task_ids.add(task.id)
+            if first_index_dep:
+                restart.dependencies.append((task.id, first_index_dep.id))
+            if key in last_idle_tasks:
+                restart.dependencies.append(
+                    (task.id, last_idle_tasks[key].id)
+                )
+            # if at least one task in index is completed,
+            # we shouldn't wait first task completion
+            if first_index_dep is None and not has_completed_tasks:
+                first_index_dep = task
+        for key, task in index_dict.items():
+            if task.status in (BuildTaskStatus.IDLE, BuildTaskStatus.FAILED):
+                last_idle_tasks[key] = task
+    return restart
+
+
+def plan_failed_build_items_restart(
+    tasks_matrix: typing.Dict[int, typing.Dict[tuple, models.BuildTask]],
+) -> FailedBuildItemsRestart:
+    restart = FailedBuildItemsRestart([], set(), [])
+    last_task = None
+    for tasks_dicts in tasks_matrix.values():
+        failed_tasks = [
+            task
+            for task in tasks_dicts.values()
+            if task.status == BuildTaskStatus.FAILED
+        ]
+        drop_srpm = len(failed_tasks) == len(tasks_dicts)
+        for task in failed_tasks:
+            restart.tasks.append(task)
+            if task.built_srpm_url and drop_srpm:
+                restart.drop_srpm_task_ids.add(task.id)
+            if last_task is not None:
+                restart.dependencies.append((task.id, last_task.id))
+            last_task = task
+    return restart
+
+
+async def restart_failed_build_items(
+    db: AsyncSession,
+    restart: FailedBuildItemsRestart,
+):
+    if not restart.tasks:
+        return
+    task_ids = [task.id for task in restart.tasks]
+    srpm_url = models.BuildTask.built_srpm_url
+    if restart.drop_srpm_task_ids:
+        srpm_url = sqlalchemy.case(
+            (
+                models.BuildTask.id.in_(restart.drop_srpm_task_ids),
+                sqlalchemy.null(),
+            ),
+            else_=models.BuildTask.built_srpm_url,
+        )
+    await db.execute(
+        update(models.BuildTask)
+        .where(models.BuildTask.id.in_(task_ids))
+        .values(status=BuildTaskStatus.IDLE, ts=None, built_srpm_url=srpm_url)
+        .execution_options(synchronize_session=False)
+    )
+    # Restarted tasks can report the same results again, e.g. failed
+    # without artifacts, these reports shouldn't be dropped as retries
+    await db.execute(
+        delete(models.BuildDoneLedgerEntry).where(
+            models.BuildDoneLedgerEntry.build_task_id.in_(task_ids)
+        )
+    )
+    # Heartbeats of the previous attempt shouldn't renew new leases
+    await discard_task_heartbeats(task_ids)
+    if restart.dependencies:
+        await db.execute(
+            pg_insert(models.BuildTaskDependency).on_conflict_do_nothing(),
+            [
+                {"build_task_id": task_id, "build_task_dependency": dep_id}
+                for task_id, dep_id in dict.fromkeys(restart.dependencies)
+            ],
+        )
+
+
 async def update_failed_build_items_in_parallel(
     db: AsyncSession,
     build_id: int,
 ):
     async with db.begin():
-        tasks_cache = await get_failed_build_tasks_matrix(db, build_id)
-        tasks_indexes = list(tasks_cache.keys())
-        for task_index, index_dict in tasks_cache.items():
-            current_idx = tasks_indexes.index(task_index)
-            first_index_dep = None
-
-            completed_index_tasks = []
-            failed_tasks = []
-            for task in index_dict.values():
-                if task.status == BuildTaskStatus.COMPLETED:
-                    completed_index_tasks.append(task)
-                elif task.status == BuildTaskStatus.FAILED:
-                    failed_tasks.append(task)
-
-            drop_srpm = False
-            if len(failed_tasks) == len(index_dict):
-                drop_srpm = True
-
-            for key in sorted(
-                list(index_dict.keys()),
-                key=lambda x: x[1] == "i686",
-                reverse=True,
-            ):
-                task = index_dict[key]
-                if task.status != BuildTaskStatus.FAILED:
-                    continue
-                if task.built_srpm_url and drop_srpm:
-                    task.built_srpm_url = None
-                task.status = BuildTaskStatus.IDLE
-                task.ts = None
-                if first_index_dep:
-                    await db.run_sync(
-                        add_build_task_dependencies, task, first_index_dep
-                    )
-                idx = current_idx - 1
-                while idx >= 0:
-                    prev_task_index = tasks_indexes[idx]
-                    dep = tasks_cache.get(prev_task_index, {}).get(key)
-                    # dependency.status can be completed because
-                    # we stores in cache completed tasks
-                    if dep and dep.status == BuildTaskStatus.IDLE:
-                        await db.run_sync(
-                            add_build_task_dependencies, task, dep
-                        )
-                    idx -= 1
-                # if at least one task in index is completed,
-                # we shouldn't wait first task completion
-                if first_index_dep is None and not completed_index_tasks:
-                    first_index_dep = task
+        tasks_matrix = await get_failed_build_tasks_matrix(db, build_id)
+        restart = plan_failed_build_items_restart_in_parallel(tasks_matrix)
+        await restart_failed_build_items(db, restart)
         await db.commit()
+    await notify_build_tasks_ready({task.arch for task in restart.tasks})
 
 
 async def update_failed_build_items(db: AsyncSession, build_id: int):
     async with db.begin():
-        failed_tasks_matrix = await get_failed_build_tasks_matrix(db, build_id)
-
-        last_task = None
-        for tasks_dicts in failed_tasks_matrix.values():
-            failed_tasks = [
-                task
-                for task in tasks_dicts.values()
-                if task.status == BuildTaskStatus.FAILED
-            ]
-            drop_srpm = False
-            if len(failed_tasks) == len(tasks_dicts):
-                drop_srpm = True
-
-            for task in failed_tasks:
-                if task.built_srpm_url and drop_srpm:
-                    task.built_srpm_url = None
-                task.status = BuildTaskStatus.IDLE
-                task.ts = None
-                if last_task is not None:
-                    await db.run_sync(
-                        add_build_task_dependencies, task, last_task
-                    )
-                last_task = task
+        tasks_matrix = await get_failed_build_tasks_matrix(db, build_id)
+        restart = plan_failed_build_items_restart(tasks_matrix)
+        await restart_failed_build_items(db, restart)
         await db.commit()
+    await notify_build_tasks_ready({task.arch for task in restart.tasks})
 
 
 async def mark_build_tasks_as_cancelled(
     session: AsyncSession,
     build_id: int,
 ):
-    await session.execute(
-        update(models.BuildTask)
-        .where(
-            models.BuildTask.build_id == build_id,
-            models.BuildTask.status == BuildTaskStatus.IDLE,
-        )
-        .values(
-            status=BuildTaskStatus.CANCELLED,
-            error="Build task cancelled by user",
+    cancelled_task_ids = (
+        await session.execute(
+            update(models.BuildTask)
+            .where(
+                models.BuildTask.build_id == build_id,
+                models.BuildTask.status == BuildTaskStatus.IDLE,
+            )
+            .values(
+                status=BuildTaskStatus.CANCELLED,
+                error="Build task cancelled by user",
+            )
+            .returning(models.BuildTask.id)
         )
-    )
+    ).scalars().all()
     await session.commit()
+    await discard_task_heartbeats(cancelled_task_ids)
 
 
 async def log_repo_exists(db: AsyncSession, task: models.BuildTask):
@@ -272,12 +484,120 @@ async def create_build_log_repo(db: AsyncSession, task: models.BuildTask):
     await db.commit()
 
 
-async def ping_tasks(db: AsyncSession, task_list: typing.List[int]):
+async def ping_tasks(task_list: typing.List[int]):
+    try:
+        await BUILD_TASK_HEARTBEATS.record(task_list)
+        return
+    except Exception:
+        logging.exception('Cannot store heartbeats, updating tasks directly')
     query = models.BuildTask.id.in_(task_list)
     now = datetime.datetime.utcnow()
-    async with db.begin():
+    async with asynccontextmanager(get_db)() as db, db.begin():
         await db.execute(update(models.BuildTask).where(query).values(ts=now))
-        await db.commit()
+
+
+async def discard_task_heartbeats(task_ids: typing.Iterable[int]):
+    try:
+        await BUILD_TASK_HEARTBEATS.discard(task_ids)
+    except Exception:
+        logging.exception('Cannot discard heartbeats of tasks: %s', task_ids)
+
+
+def get_build_done_expiration_ts() -> datetime.datetime:
+    # Queued or processing build_done requests older than that
+    # are considered lost (e.g. dramatiq worker was killed)
+    return datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=settings.build_done_processing_timeout,
+    )
+
+
+async def __update_build_done_ledger(
+    db: AsyncSession,
+    request: build_node_schema.BuildDone,
+    status: BuildDoneStatus,
+    where,
+) -> bool:
+    ledger = models.BuildDoneLedgerEntry
+    now = datetime.datetime.utcnow()
+    query = (
+        pg_insert(ledger)
+        .values(
+            build_task_id=request.task_id,
+            artifacts_digest=request.artifacts_digest,
+            status=status,
+            updated_at=now,
+        )
+        .on_conflict_do_update(
+            index_elements=[ledger.build_task_id, ledger.artifacts_digest],
+            set_={"status": status, "updated_at": now},
+            where=where,
+        )
+        .returning(ledger.build_task_id)
+    )
+    return (await db.execute(query)).scalar() is not None
+
+
+async def queue_build_done(
+    db: AsyncSession,
+    request: build_node_schema.BuildDone,
+) -> bool:
+    """
+    Registers build_done request in the processing ledger.
+    Returns False if the same results were already reported,
+    unless their processing is lost.
+    """
+    ledger = models.BuildDoneLedgerEntry
+    return await __update_build_done_ledger(
+        db,
+        request,
+        BuildDoneStatus.QUEUED,
+        where=sqlalchemy.and_(
+            ledger.status != BuildDoneStatus.DONE,
+            ledger.updated_at < get_build_done_expiration_ts(),
+        ),
+    )
+
+
+async def start_build_done_processing(
+    db: AsyncSession,
+    request: build_node_schema.BuildDone,
+) -> bool:
+    """
+    Marks queued build_done request as being processed.
+    Returns False if the request is already processed or done,
+    e.g. when dramatiq message is delivered twice.
+    """
+    ledger = models.BuildDoneLedgerEntry
+    return await __update_build_done_ledger(
+        db,
+        request,
+        BuildDoneStatus.PROCESSING,
+        where=sqlalchemy.or_(
+            ledger.status == BuildDoneStatus.QUEUED,
+            sqlalchemy.and_(
+                ledger.status == BuildDoneStatus.PROCESSING,
+                ledger.updated_at < get_build_done_expiration_ts(),
+            ),
+        ),
+    )
+
+
+async def finish_build_done_processing(
+    db: AsyncSession,
+    request: build_node_schema.BuildDone,
+):
+    await db.execute(
+        update(models.BuildDoneLedgerEntry)
+        .where(
+            models.BuildDoneLedgerEntry.build_task_id == request.task_id,
+            models.BuildDoneLedgerEntry.artifacts_digest
+            == request.artifacts_digest,
+        )
+        .values(
+            status=BuildDoneStatus.DONE,
+            updated_at=datetime.datetime.utcnow(),
+        )
+    )
 
 
 async def get_build_task(db: AsyncSession, task_id: int) -> models.BuildTask:
@@ -319,6 +639,66 @@ async def get_srpm_artifact_by_build_task_id(
     return srpm_artifact.scalars().first()
 
 
+async def find_errata_packages(
+    db: AsyncSession,
+    rpms_info: typing.List[dict],
+    module: typing.Optional[str] = None,
+) -> typing.List[typing.List[models.ErrataPackage]]:
+    """
+    Finds errata packages matching each of the given RPMs by name,
+    version, arch (any arch for noarch RPMs) and cleaned release.
+    All RPMs are looked up with a single query per chunk of
+    ERRATA_MATCH_CHUNK_SIZE keys instead of one query per RPM.
+    If `module` is provided, only errata records of that
+    module:stream are taken into account.
+    """
+    keys = sorted(
+        {(info["name"], info["version"], info["arch"]) for info in rpms_info}
+    )
+    errata_packages = {}
+    for start in range(0, len(keys), ERRATA_MATCH_CHUNK_SIZE):
+        rpm_keys = sqlalchemy.values(
+            sqlalchemy.column("name", sqlalchemy.Text),
+            sqlalchemy.column("version", sqlalchemy.Text),
+            sqlalchemy.column("arch", sqlalchemy.Text),
+            name="rpm_keys",
+        ).data(keys[start:start + ERRATA_MATCH_CHUNK_SIZE])
+        query = select(models.ErrataPackage).join(
+            rpm_keys,
+            sqlalchemy.and_(
+                models.ErrataPackage.name == rpm_keys.c.name,
+                models.ErrataPackage.version == rpm_keys.c.version,
+                sqlalchemy.or_(
+                    rpm_keys.c.arch == "noarch",
+                    models.ErrataPackage.arch == rpm_keys.c.arch,
+                ),
+            ),
+        )
+        if module:
+            query = query.join(
+                models.ErrataRecord,
+                models.ErrataPackage.errata_record_id
+                == models.ErrataRecord.id,
+            ).where(models.ErrataRecord.module == module)
+        for errata_package in (await db.execute(query)).scalars():
+            errata_packages[errata_package.id] = errata_package
+    candidates = defaultdict(list)
+    for errata_package in errata_packages.values():
+        candidates[(errata_package.name, errata_package.version)].append(
+            errata_package
+        )
+    return [
+        [
+            errata_package
+            for errata_package in candidates[(info["name"], info["version"])]
+            if info["arch"] in ("noarch", errata_package.arch)
+            and clean_release(info["release"])
+            == clean_release(errata_package.release)
+        ]
+        for info in rpms_info
+    ]
+
+
 async def __process_rpms(
     db: AsyncSession,
     pulp_client: PulpClient,
@@ -338,42 +718,38 @@ async def __process_rpms(
             and build_repo.debug == is_debug
         )
 
-    rpms = []
     arch_repo = get_repo(task_arch, False)
     debug_repo = get_repo(task_arch, True)
     src_repo = get_repo("src", False)
-    arch_packages_tasks = []
-    src_packages_tasks = []
-    debug_packages_tasks = []
-    for artifact in task_artifacts:
+    # Source RPM is already in the repository if it was built before
+    task_artifacts = [
+        artifact
+        for artifact in task_artifacts
+        if artifact.arch != "src" or built_srpm_url is None
+    ]
+    try:
+        processed_packages = await PulpContentConverter(pulp_client).convert(
+            task_artifacts
+        )
+    except Exception as e:
+        logging.exception("Cannot create RPM packages")
+        raise ArtifactConversionError(
+            f"Cannot put RPM packages into Pulp storage: {e}"
+        )
+    __verify_checksums(processed_packages)
+    repo_hrefs = defaultdict(list)
+    for href, _, artifact in processed_packages:
         if artifact.arch == "src":
-            if built_srpm_url is None:
-                src_packages_tasks.append(pulp_client.create_entity(artifact))
+            repo = src_repo
         elif artifact.is_debuginfo:
-            debug_packages_tasks.append(pulp_client.create_entity(artifact))
+            repo = debug_repo
         else:
-            arch_packages_tasks.append(pulp_client.create_entity(artifact))
-
-    processed_packages = []
-    for tasks, repo in (
-        (src_packages_tasks, src_repo),
-        (arch_packages_tasks, arch_repo),
-        (debug_packages_tasks, debug_repo),
-    ):
-        if not tasks:
+            repo = arch_repo
+        repo_hrefs[repo].append(href)
+    for repo in (src_repo, arch_repo, debug_repo):
+        hrefs = repo_hrefs.get(repo)
+        if not hrefs:
             continue
-        try:
-            results = await asyncio.gather(*tasks)
-        except Exception as e:
-            logging.exception(
-                "Cannot create RPM packages for repo %s", str(repo)
-            )
-            raise ArtifactConversionError(
-                f"Cannot put RPM packages into Pulp storage: {e}"
-            )
-        processed_packages.extend(results)
-        hrefs = [item[0] for item in results]
-        __verify_checksums(processed_packages)
         try:
             await pulp_client.modify_repository(repo.pulp_href, add=hrefs)
         except Exception:
@@ -384,19 +760,6 @@ async def __process_rpms(
                 f"Cannot add RPM packages to the repository {str(repo)}"
             )
 
-    def append_errata_package(_, errata_package, artifact, rpm_info):
-        model = models.ErrataToALBSPackage(
-            status=ErrataPackageStatus.proposal,
-            name=rpm_info["name"],
-            version=rpm_info["version"],
-            release=rpm_info["release"],
-            epoch=int(rpm_info["epoch"]),
-            arch=rpm_info["arch"],
-        )
-        model.errata_package = errata_package
-        model.build_artifact = artifact
-        errata_package.albs_packages.append(model)
-
     rpms = [
         models.BuildTaskArtifact(
             build_task_id=task_id,
@@ -407,51 +770,53 @@ async def __process_rpms(
         )
         for href, _, artifact in processed_packages
     ]
-    rpms_info = get_rpm_packages_info(rpms)
-    for build_task_artifact in rpms:
+    rpms_info = await get_rpm_packages_info(rpms)
+    build_task_module = None
+    if module_index:
+        module = None
+        for mod in module_index.iter_modules():
+            if mod.name.endswith("-devel"):
+                continue
+            module = mod
+        build_task_module = f"{module.name}:{module.stream}"
+    errata_matches = await find_errata_packages(
+        db,
+        [rpms_info[rpm.href] for rpm in rpms],
+        module=build_task_module,
+    )
+    # We add ErrataToALBSPackage proposals for every matching package.
+    # In case of an errata that involves a module, we only add those
+    # packages that belong to the right module:stream
+    proposals = []
+    for build_task_artifact, errata_packages in zip(rpms, errata_matches):
         rpm_info = rpms_info[build_task_artifact.href]
         if rpm_info["arch"] != "src":
             src_name = parse_rpm_nevra(rpm_info["rpm_sourcerpm"]).name
         else:
             src_name = rpm_info["name"]
-        clean_rpm_release = clean_release(rpm_info["release"])
-        conditions = [
-            models.ErrataPackage.name == rpm_info["name"],
-            models.ErrataPackage.version == rpm_info["version"],
-        ]
-        if rpm_info["arch"] != "noarch":
-            conditions.append(models.ErrataPackage.arch == rpm_info["arch"])
-
-        query = select(models.ErrataPackage).where(
-            sqlalchemy.and_(*conditions)
-        )
-
-        if module_index:
-            module = None
-            for mod in module_index.iter_modules():
-                if mod.name.endswith("-devel"):
-                    continue
-                module = mod
-            build_task_module = f"{module.name}:{module.stream}"
-            query = query.join(models.ErrataRecord).filter(
-                models.ErrataRecord.module == build_task_module
-            )
-
-        errata_packages = (await db.execute(query)).scalars().all()
-
-        # We add ErrataToALBSPackage proposals for every matching package.
-        # In case of an errata that involves a module, we only add those
-        # packages that belong to the right module:stream
         for errata_package in errata_packages:
-            if clean_rpm_release != clean_release(errata_package.release):
-                continue
             errata_package.source_srpm = src_name
-            await db.run_sync(
-                append_errata_package,
-                errata_package,
-                build_task_artifact,
-                rpm_info,
-            )
+            proposals.append((errata_package, build_task_artifact, rpm_info))
+    if proposals:
+        # Proposals reference build artifacts by their ids
+        db.add_all(rpms)
+        await db.flush()
+        await db.execute(
+            insert(models.ErrataToALBSPackage),
+            [
+                {
+                    "errata_package_id": errata_package.id,
+                    "albs_artifact_id": build_task_artifact.id,
+                    "status": ErrataPackageStatus.proposal,
+                    "name": rpm_info["name"],
+                    "version": rpm_info["version"],
+                    "release": rpm_info["release"],
+                    "epoch": int(rpm_info["epoch"]),
+                    "arch": rpm_info["arch"],
+                }
+                for errata_package, build_task_artifact, rpm_info in proposals
+            ],
+        )
 
     if module_index and rpms:
         srpm_info = None
@@ -460,7 +825,7 @@ async def __process_rpms(
         if built_srpm_url is not None:
             db_srpm = await get_srpm_artifact_by_build_task_id(db, task_id)
             if db_srpm is not None:
-                srpms_info = get_rpm_packages_info([db_srpm])
+                srpms_info = await get_rpm_packages_info([db_srpm])
                 srpm_info = srpms_info[db_srpm.href]
         try:
             for module in module_index.iter_modules():
@@ -485,11 +850,10 @@ async def __process_logs(
         logging.error("Log repository is absent, skipping logs processing")
         return
     logs = []
-    tasks = [
-        pulp_client.create_entity(artifact) for artifact in task_artifacts
-    ]
     try:
-        results = await asyncio.gather(*tasks)
+        results = await PulpContentConverter(pulp_client).convert(
+            task_artifacts
+        )
     except Exception as e:
         logging.exception("Cannot create log files for %s", str(repository))
         raise ArtifactConversionError(
@@ -527,8 +891,8 @@ async def __process_build_task_artifacts(
     task_artifacts: list,
     status: BuildTaskStatus,
     git_commit_hash: typing.Optional[str],
-) -> typing.Tuple[models.BuildTask, typing.Dict[str, typing.Dict[str, str]]]:
-    processing_stats = {}
+    stages: StageGraph,
+) -> models.BuildTask:
     build_tasks = await db.execute(
         select(models.BuildTask)
         .where(models.BuildTask.id == task_id)
@@ -594,41 +958,27 @@ async def __process_build_task_artifacts(
         message = "No source RPM was sent from build node"
         logging.error(message)
         raise SrpmProvisionError(message)
-    # Committing logs separately for UI to be able to fetch them
-    logging.info("Processing logs")
-    start_time = datetime.datetime.utcnow()
-    logs_entries = await __process_logs(
-        pulp_client, build_task.id, log_artifacts, log_repository
+    # Stages which use database session depend on each other,
+    # Pulp and Beholder requests of the other stages run concurrently
+    stages.add(
+        "logs_processing",
+        lambda: __process_logs(
+            pulp_client, build_task.id, log_artifacts, log_repository
+        ),
+    )
+    stages.add(
+        "packages_processing",
+        lambda: __process_rpms(
+            db,
+            pulp_client,
+            build_task.id,
+            build_task.arch,
+            rpm_artifacts,
+            rpm_repositories,
+            built_srpm_url=build_task.built_srpm_url,
+            module_index=module_index,
+        ),
     )
-    if logs_entries:
-        db.add_all(logs_entries)
-        await db.flush()
-    end_time = datetime.datetime.utcnow()
-    processing_stats["logs_processing"] = {
-        "start_ts": str(start_time),
-        "end_ts": str(end_time),
-        "delta": str(end_time - start_time),
-    }
-    logging.info("Logs processing is finished")
-    logging.info("Processing packages")
-    start_time = datetime.datetime.utcnow()
-    rpm_entries = await __process_rpms(
-        db,
-        pulp_client,
-        build_task.id,
-        build_task.arch,
-        rpm_artifacts,
-        rpm_repositories,
-        built_srpm_url=build_task.built_srpm_url,
-        module_index=module_index,
-    )
-    end_time = datetime.datetime.utcnow()
-    processing_stats["packages_processing"] = {
-        "start_ts": str(start_time),
-        "end_ts": str(end_time),
-        "delta": str(end_time - start_time),
-    }
-    logging.info("Packages processing is finished")
     multilib_conditions = (
         src_rpm is not None,
         build_task.arch == "x86_64",
@@ -638,70 +988,126 @@ async def __process_build_task_artifacts(
         # TODO: Beholder doesn't have authorization right now
         # bool(settings.beholder_token),
     )
+    module_dependencies = ["packages_processing"]
     if all(multilib_conditions):
         processor = MultilibProcessor(
             db, build_task, pulp_client=pulp_client, module_index=module_index
         )
-        logging.info("Processing multilib packages")
-        start_time = datetime.datetime.utcnow()
-        multilib_packages = await processor.get_packages(src_rpm)
-        if module_index:
-            multilib_module_artifacts = await processor.get_module_artifacts()
-            multilib_packages.update(
-                {i["name"]: i["version"] for i in multilib_module_artifacts}
-            )
-            await processor.add_multilib_packages(multilib_packages)
-            await processor.add_multilib_module_artifacts(
-                prepared_artifacts=multilib_module_artifacts
-            )
-        else:
+
+        async def lookup_multilib_packages():
+            # Beholder lookup needs only the source RPM name
+            multilib_packages = await processor.get_packages(src_rpm)
+            multilib_module_artifacts = []
+            if module_index:
+                multilib_module_artifacts = (
+                    await processor.get_module_artifacts()
+                )
+                multilib_packages.update(
+                    {
+                        i["name"]: i["version"]
+                        for i in multilib_module_artifacts
+                    }
+                )
+            return multilib_packages, multilib_module_artifacts
+
+        async def add_multilib_packages():
+            multilib_packages, multilib_module_artifacts = stages.results[
+                "multilib_lookup"
+            ]
             await processor.add_multilib_packages(multilib_packages)
-        end_time = datetime.datetime.utcnow()
-        processing_stats["multilib_processing"] = {
-            "start_ts": str(start_time),
-            "end_ts": str(end_time),
-            "delta": str(end_time - start_time),
-        }
-        logging.info("Multilib packages processing is finished")
+            if module_index:
+                await processor.add_multilib_module_artifacts(
+                    prepared_artifacts=multilib_module_artifacts
+                )
+
+        stages.add("multilib_lookup", lookup_multilib_packages)
+        stages.add(
+            "multilib_processing",
+            add_multilib_packages,
+            depends_on=["multilib_lookup", "packages_processing"],
+        )
+        module_dependencies.append("multilib_processing")
     if build_task.rpm_module and module_index:
-        logging.info("Processing module template")
-        start_time = datetime.datetime.utcnow()
-        try:
-            module_pulp_href, sha256 = await pulp_client.create_module(
-                module_index.render(),
-                build_task.rpm_module.name,
-                build_task.rpm_module.stream,
-                build_task.rpm_module.context,
-                build_task.rpm_module.arch,
-            )
-            old_modules = await pulp_client.get_repo_modules(
-                module_repo.pulp_href,
-            )
-            await pulp_client.modify_repository(
-                module_repo.pulp_href,
-                add=[module_pulp_href],
-                remove=old_modules,
-            )
-            build_task.rpm_module.sha256 = sha256
-            build_task.rpm_module.pulp_href = module_pulp_href
-            end_time = datetime.datetime.utcnow()
-            processing_stats["module_processing"] = {
-                "start_ts": str(start_time),
-                "end_ts": str(end_time),
-                "delta": str(end_time - start_time),
-            }
-        except Exception as e:
-            message = f"Cannot update module information inside Pulp: {str(e)}"
-            logging.exception(message)
-            raise ModuleUpdateError(message) from e
-        logging.info("Module template processing is finished")
 
+        async def update_module():
+            try:
+                module_pulp_href, sha256 = await pulp_client.create_module(
+                    module_index.render(),
+                    build_task.rpm_module.name,
+                    build_task.rpm_module.stream,
+                    build_task.rpm_module.context,
+                    build_task.rpm_module.arch,
+                )
+                old_modules = await pulp_client.get_repo_modules(
+                    module_repo.pulp_href,
+                )
+                await pulp_client.modify_repository(
+                    module_repo.pulp_href,
+                    add=[module_pulp_href],
+                    remove=old_modules,
+                )
+                build_task.rpm_module.sha256 = sha256
+                build_task.rpm_module.pulp_href = module_pulp_href
+            except Exception as e:
+                message = (
+                    f"Cannot update module information inside Pulp: {str(e)}"
+                )
+                logging.exception(message)
+                raise ModuleUpdateError(message) from e
+
+        stages.add(
+            "module_processing",
+            update_module,
+            depends_on=module_dependencies,
+        )
+    await stages.run()
+    logs_entries = stages.results["logs_processing"]
+    rpm_entries = stages.results["packages_processing"]
+    if logs_entries:
+        db.add_all(logs_entries)
     if rpm_entries:
         db.add_all(rpm_entries)
     db.add(build_task)
     await db.flush()
     await db.refresh(build_task)
-    return build_task, processing_stats
+    return build_task
+
+
+async def __remove_fast_failed_tasks_dependencies(
+    db: AsyncSession,
+    task_ids: typing.List[int],
+):
+    # Only the previous task of a platform/arch is stored as a dependency,
+    # fast-failed tasks didn't wait for their own dependencies, so tasks
+    # depending on them inherit those to keep the build order
+    dependents = models.BuildTaskDependency.alias("dependents")
+    inherited = models.BuildTaskDependency.alias("inherited")
+    await db.execute(
+        pg_insert(models.BuildTaskDependency)
+        .from_select(
+            ["build_task_id", "build_task_dependency"],
+            select(
+                dependents.c.build_task_id,
+                inherited.c.build_task_dependency,
+            )
+            .join(
+                inherited,
+                inherited.c.build_task_id
+                == dependents.c.build_task_dependency,
+            )
+            .where(
+                dependents.c.build_task_dependency.in_(task_ids),
+                inherited.c.build_task_dependency.notin_(task_ids),
+            )
+            .distinct(),
+        )
+        .on_conflict_do_nothing()
+    )
+    await db.execute(
+        delete(models.BuildTaskDependency).where(
+            models.BuildTaskDependency.c.build_task_dependency.in_(task_ids),
+        )
+    )
 
 
 async def __update_built_srpm_url(
@@ -750,21 +1156,32 @@ async def __update_built_srpm_url(
             .values(status=BuildTaskStatus.FAILED, error=fast_fail_msg)
         )
         await db.execute(update_query)
-
-        remove_query = delete(models.BuildTaskDependency).where(
-            models.BuildTaskDependency.c.build_task_dependency.in_(
-                uncompleted_tasks_ids
-            ),
+        await __remove_fast_failed_tasks_dependencies(
+            db, uncompleted_tasks_ids
         )
-        await db.execute(remove_query)
         return
 
     # if SRPM built we need to download them
     # from pulp repos in next tasks
     if srpm_artifact and build_task.built_srpm_url is None:
-        srpm_url = "{}-src-{}-br/Packages/{}/{}".format(
+        repo_name = "{}-src-{}-br".format(
             build_task.platform.name,
             build_task.build_id,
+        )
+        # Repositories taken from the pool are distributed
+        # under their pooled names
+        repo_url = (
+            await db.execute(
+                select(models.Repository.url).where(
+                    models.Repository.name == repo_name
+                )
+            )
+        ).scalars().first()
+        base_path = repo_name
+        if repo_url:
+            base_path = repo_url.rstrip("/").rsplit("/", 1)[-1]
+        srpm_url = "{}/Packages/{}/{}".format(
+            base_path,
             srpm_artifact.name[0].lower(),
             srpm_artifact.name,
         )
@@ -828,13 +1245,7 @@ async def fast_fail_other_tasks_by_ref(
         )
         .values(status=BuildTaskStatus.FAILED, error=fast_fail_msg)
     )
-    await db.execute(
-        delete(models.BuildTaskDependency).where(
-            models.BuildTaskDependency.c.build_task_dependency.in_(
-                uncompleted_tasks_ids
-            ),
-        )
-    )
+    await __remove_fast_failed_tasks_dependencies(db, uncompleted_tasks_ids)
 
 
 async def safe_build_done(
@@ -907,8 +1318,29 @@ async def safe_build_done(
                 statistics=build_task_stats,
             ),
         )
+        # Tasks which were waiting only for this one are ready now
+        dependent_arches = (
+            (
+                await db.execute(
+                    select(models.BuildTask.arch)
+                    .distinct()
+                    .join(
+                        models.BuildTaskDependency,
+                        models.BuildTaskDependency.c.build_task_id
+                        == models.BuildTask.id,
+                    )
+                    .where(
+                        models.BuildTaskDependency.c.build_task_dependency
+                        == request.task_id
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
         await db.execute(remove_dep_query)
         await db.commit()
+        await notify_build_tasks_ready(dependent_arches)
     logging.info("Build task: %d, processing is finished", request.task_id)
     return success
 
@@ -917,19 +1349,18 @@ async def build_done(
     db: AsyncSession,
     pulp: PulpClient,
     request: build_node_schema.BuildDone,
-) -> typing.Tuple[models.BuildTask, typing.Dict[str, typing.Dict[str, str]]]:
+) -> typing.Tuple[models.BuildTask, typing.Dict[str, typing.Any]]:
     status = BuildTaskStatus.get_status_by_text(request.status)
-
-    build_done_stats = {}
-    build_task, processing_stats = await __process_build_task_artifacts(
+    stages = StageGraph()
+    build_task = await __process_build_task_artifacts(
         db,
         pulp,
         request.task_id,
         request.artifacts,
         status,
         request.git_commit_hash,
+        stages,
     )
-    build_done_stats.update(processing_stats)
 
     await db.execute(
         update(models.BuildTask)
@@ -937,14 +1368,12 @@ async def build_done(
         .values(status=status)
     )
 
-    start_time = datetime.datetime.utcnow()
-    binary_rpms = await save_noarch_packages(db, pulp, build_task)
-    end_time = datetime.datetime.utcnow()
-    processing_stats["noarch_processing"] = {
-        "start_ts": str(start_time),
-        "end_ts": str(end_time),
-        "delta": str(end_time - start_time),
-    }
+    stages.add(
+        "noarch_processing",
+        lambda: save_noarch_packages(db, pulp, build_task),
+    )
+    await stages.run()
+    binary_rpms = stages.results["noarch_processing"]
 
     rpms_result = await db.execute(
         select(models.BuildTaskArtifact).where(
@@ -1018,4 +1447,8 @@ async def build_done(
 
     db.add_all(binary_rpms)
     await db.flush()
+    build_done_stats = {
+        **stages.stats,
+        "critical_path": stages.get_critical_path_stats(),
+    }
     return build_task, build_done_stats
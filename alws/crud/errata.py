@@ -11,7 +11,7 @@ import createrepo_c as cr
 import jinja2
 from sqlalchemy import and_, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.orm import load_only, selectinload
 from sqlalchemy.sql.expression import func
 
 from alws import models
@@ -21,7 +21,7 @@ from alws.constants import (
     ErrataReferenceType,
     ErrataReleaseStatus,
 )
-from alws.dependencies import get_db, get_pulp_db
+from alws.dependencies import get_async_pulp_db, get_db
 from alws.pulp_models import (
     RpmPackage,
     UpdateCollection,
@@ -44,9 +44,9 @@ from alws.utils.errata import (
 from alws.utils.parsing import clean_release, parse_rpm_nevra
 from alws.utils.pulp_client import PulpClient
 from alws.utils.pulp_utils import (
-    get_rpm_module_packages_from_repository,
-    get_rpm_packages_by_ids,
-    get_rpm_packages_from_repository,
+    get_rpm_module_packages_from_repository_async,
+    get_rpm_packages_by_ids_async,
+    get_rpm_packages_from_repository_async,
     get_uuid_from_pulp_href,
 )
 
@@ -410,7 +410,7 @@ async def load_platform_packages(
 
         repo_id = get_uuid_from_pulp_href(repo.pulp_href)
         if module:
-            pkgs = get_rpm_module_packages_from_repository(
+            pkgs = await get_rpm_module_packages_from_repository_async(
                 repo_id=repo_id,
                 module=module,
                 pkg_names=search_params["name"],
@@ -418,7 +418,7 @@ async def load_platform_packages(
                 pkg_epochs=search_params["epoch"],
             )
         else:
-            pkgs = get_rpm_packages_from_repository(
+            pkgs = await get_rpm_packages_from_repository_async(
                 repo_id=repo_id,
                 pkg_names=search_params["name"],
                 pkg_versions=search_params["version"],
@@ -554,7 +554,7 @@ async def get_matching_albs_packages(
         RpmPackage.arch,
         RpmPackage.rpm_sourcerpm,
     ]
-    pulp_pkgs = get_rpm_packages_by_ids(pulp_pkg_ids, pkg_fields)
+    pulp_pkgs = await get_rpm_packages_by_ids_async(pulp_pkg_ids, pkg_fields)
     for package in result:
         pulp_rpm_package = pulp_pkgs.get(package.href)
         if not pulp_rpm_package:
@@ -858,15 +858,14 @@ async def update_package_status(
     return True
 
 
-async def release_errata_packages(
+async def prepare_errata_pulp_record(
     session: AsyncSession,
     pulp_client: PulpClient,
     record: models.ErrataRecord,
     packages: List[models.ErrataToALBSPackage],
     platform: models.Platform,
     repo_href: str,
-    publish: bool = True,
-):
+) -> Optional[Dict[str, Any]]:
     repo = await pulp_client.get_by_href(repo_href)
     released_record = await pulp_client.list_updateinfo_records(
         id__in=[record.id],
@@ -978,9 +977,31 @@ async def release_errata_packages(
         ],
         "reboot_suggested": reboot_suggested,
     }
+    return pulp_record
+
+
+async def release_errata_packages(
+    session: AsyncSession,
+    pulp_client: PulpClient,
+    record: models.ErrataRecord,
+    packages: List[models.ErrataToALBSPackage],
+    platform: models.Platform,
+    repo_href: str,
+    publish: bool = True,
+):
+    pulp_record = await prepare_errata_pulp_record(
+        session,
+        pulp_client,
+        record,
+        packages,
+        platform,
+        repo_href,
+    )
+    if not pulp_record:
+        return
     await pulp_client.add_errata_record(pulp_record, repo_href)
     if publish:
-        await pulp_client.create_rpm_publication(repo_href)
+        await pulp_client.schedule_rpm_publication(repo_href)
 
 
 async def prepare_updateinfo_mapping(
@@ -1049,8 +1070,8 @@ async def prepare_updateinfo_mapping(
     return updateinfo_mapping
 
 
-def append_update_packages_in_update_records(
-    pulp_db: Session,
+async def append_update_packages_in_update_records(
+    pulp_db: AsyncSession,
     errata_records: List[Dict[str, Any]],
     updateinfo_mapping: DefaultDict[
         str,
@@ -1059,13 +1080,13 @@ def append_update_packages_in_update_records(
         ],
     ],
 ):
-    with pulp_db.begin():
+    async with pulp_db.begin():
         for record in errata_records:
             record_uuid = uuid.UUID(record["pulp_href"].split("/")[-2])
             packages = updateinfo_mapping.get(record["id"])
             if not packages:
                 continue
-            pulp_record = pulp_db.execute(
+            pulp_record = await pulp_db.execute(
                 select(UpdateRecord)
                 .where(UpdateRecord.content_ptr_id == record_uuid)
                 .options(
@@ -1170,7 +1191,13 @@ async def process_errata_release_for_repos(
     session: AsyncSession,
     pulp: PulpClient,
     publish: bool = True,
-) -> Optional[List[Awaitable]]:
+) -> Optional[List[Tuple[str, Awaitable]]]:
+    """
+    Releases errata record packages into repositories.
+    Without `publish` advisories aren't uploaded, instead
+    (repository href, coroutine preparing advisory) pairs are returned,
+    so caller can upload advisories of many records in batches.
+    """
     release_tasks = []
     publish_tasks = []
     for repo_href, packages in repo_mapping.items():
@@ -1194,12 +1221,27 @@ async def process_errata_release_for_repos(
                 ],
                 repository_version=latest_repo_version,
             )
-            with get_pulp_db() as pulp_db:
-                append_update_packages_in_update_records(
+            async with get_async_pulp_db() as pulp_db:
+                await append_update_packages_in_update_records(
                     pulp_db=pulp_db,
                     errata_records=errata_records,
                     updateinfo_mapping=updateinfo_mapping,
                 )
+        if not publish:
+            release_tasks.append(
+                (
+                    repo_href,
+                    prepare_errata_pulp_record(
+                        session,
+                        pulp,
+                        db_record,
+                        packages,
+                        db_record.platform,
+                        repo_href,
+                    ),
+                )
+            )
+            continue
         release_tasks.append(
             release_errata_packages(
                 session,
@@ -1211,8 +1253,7 @@ async def process_errata_release_for_repos(
                 publish=publish,
             )
         )
-        if publish:
-            publish_tasks.append(pulp.create_rpm_publication(repo_href))
+        publish_tasks.append(pulp.schedule_rpm_publication(repo_href))
     if not publish:
         return release_tasks
     await asyncio.gather(*release_tasks)
@@ -1254,7 +1295,7 @@ async def get_release_logs(
         RpmPackage.release,
         RpmPackage.arch,
     ]
-    pulp_pkgs = get_rpm_packages_by_ids(
+    pulp_pkgs = await get_rpm_packages_by_ids_async(
         pulp_pkg_ids=[get_uuid_from_pulp_href(pkg) for pkg in pulp_packages],
         pkg_fields=pkg_fields,
     )
@@ -1348,11 +1389,27 @@ async def release_errata_record(record_id: str):
     logging.info("Record %s successfully released", record_id)
 
 
+async def mark_errata_records_failed(failed_records: Dict[str, str]):
+    async with asynccontextmanager(get_db)() as session:
+        for record_id, error in failed_records.items():
+            logging.error("Cannot release %s record: %s", record_id, error)
+            await session.execute(
+                update(models.ErrataRecord)
+                .where(models.ErrataRecord.id == record_id)
+                .values(
+                    release_status=ErrataReleaseStatus.FAILED,
+                    last_release_log=f"Cannot release record:\n{error}",
+                )
+            )
+        await session.commit()
+
+
 async def bulk_errata_records_release(records_ids: List[str]):
     pulp = PulpClient(
         settings.pulp_host,
         settings.pulp_user,
         settings.pulp_password,
+        priority=settings.pulp_bulk_requests_priority,
     )
     release_tasks = []
     repos_to_publish = []
@@ -1420,13 +1477,44 @@ async def bulk_errata_records_release(records_ids: List[str]):
             if not tasks:
                 continue
             repos_to_publish.extend(repo_mapping.keys())
-            release_tasks.extend(tasks)
+            release_tasks.extend(
+                (db_record.id, repo_href, task) for repo_href, task in tasks
+            )
         await session.commit()
-    logging.info("Executing release tasks")
-    await asyncio.gather(*release_tasks)
+    logging.info("Preparing advisories for release")
+    pulp_records = await asyncio.gather(
+        *(task for _, _, task in release_tasks),
+        return_exceptions=True,
+    )
+    failed_records = {}
+    records_by_repo = collections.defaultdict(list)
+    for (record_id, repo_href, _), pulp_record in zip(
+        release_tasks, pulp_records
+    ):
+        if isinstance(pulp_record, Exception):
+            failed_records[record_id] = str(pulp_record)
+            continue
+        if pulp_record:
+            records_by_repo[repo_href].append(pulp_record)
+    logging.info(
+        "Uploading advisories into %d repositories", len(records_by_repo)
+    )
+    upload_errors = await asyncio.gather(
+        *(
+            pulp.add_errata_records(pulp_records, repo_href)
+            for repo_href, pulp_records in records_by_repo.items()
+        )
+    )
+    for errors in upload_errors:
+        failed_records.update(errors)
+    if failed_records:
+        await mark_errata_records_failed(failed_records)
     logging.info("Executing publication tasks")
     await asyncio.gather(
-        *(pulp.create_rpm_publication(href) for href in set(repos_to_publish))
+        *(
+            pulp.schedule_rpm_publication(href)
+            for href in set(repos_to_publish)
+        )
     )
     logging.info("Bulk errata release is finished")
 
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session, selectinload
 from alws import models
 from alws.errors import DataNotFoundError
 from alws.schemas import platform_schema
+from alws.utils.build_task_environment import BUILD_TASK_ENVIRONMENT_CACHE
 
 
 async def modify_platform(
@@ -74,6 +75,7 @@ async def modify_platform(
             delete(models.Repository).where(remove_query)
         )
         await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
     await db.refresh(db_platform)
     return db_platform
 
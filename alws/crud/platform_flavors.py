@@ -6,6 +6,7 @@ from sqlalchemy.orm import selectinload
 
 from alws import models
 from alws.schemas.platform_flavors_schema import CreateFlavour, UpdateFlavour
+from alws.utils.build_task_environment import BUILD_TASK_ENVIRONMENT_CACHE
 
 
 async def create_flavour(db, flavour: CreateFlavour) -> models.PlatformFlavour:
@@ -65,6 +66,7 @@ async def update_flavour(db, flavour: UpdateFlavour) -> models.PlatformFlavour:
         db_flavour.repos.append(db_repo)
     db.add(db_flavour)
     await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
     return await find_flavour_by_name(db, flavour.name)
 
 
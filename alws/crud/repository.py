@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session, selectinload
 from alws import models
 from alws.config import settings
 from alws.schemas import repository_schema, remote_schema
+from alws.utils.build_task_environment import BUILD_TASK_ENVIRONMENT_CACHE
 from alws.utils.pulp_client import PulpClient
 
 
@@ -125,6 +126,7 @@ async def update_repository(
             setattr(db_repo, field, value)
         db.add(db_repo)
         await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
     await db.refresh(db_repo)
     return db_repo
 
@@ -134,6 +136,7 @@ async def delete_repository(db: Session, repository_id: int):
         await db.execute(delete(models.Repository).where(
             models.Repository.id == repository_id))
         await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
 
 
 async def add_to_platform(db: Session, platform_id: int,
@@ -154,6 +157,7 @@ async def add_to_platform(db: Session, platform_id: int,
     db.add(platform)
     db.add_all(new_repos_list)
     await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
 
     platform_result = await db.execute(select(models.Platform).where(
         models.Platform.id == platform_id).options(
@@ -171,6 +175,7 @@ async def remove_from_platform(
         models.PlatformRepo.c.repository_id.in_(repository_ids)
     ))
     await db.commit()
+    await BUILD_TASK_ENVIRONMENT_CACHE.invalidate()
 
     platform_result = await db.execute(select(models.Platform).where(
         models.Platform.id == platform_id).options(
@@ -26,7 +26,7 @@ from alws.pulp_models import RpmPackage
 from alws.schemas import sign_schema
 from alws.utils.debuginfo import is_debuginfo_rpm
 from alws.utils.pulp_client import PulpClient
-from alws.utils.pulp_utils import get_rpm_packages_by_checksums
+from alws.utils.pulp_utils import get_rpm_packages_by_checksums_async
 
 
 async def __get_build_repos(
@@ -394,7 +394,7 @@ async def complete_sign_task(
                 package_arches_mapping[package.name].add(package.arch)
                 if package.name not in packages_to_convert:
                     packages_to_convert[package.name] = package
-            pulp_db_packages = get_rpm_packages_by_checksums(
+            pulp_db_packages = await get_rpm_packages_by_checksums_async(
                 [pkg.sha256 for pkg in packages_to_convert.values()],
             )
             results = await asyncio.gather(
@@ -10,7 +10,15 @@ from sqlalchemy.pool import NullPool
 from alws.config import settings
 
 
-__all__ = ['Base', 'Session', 'SyncSession', 'PulpSession', 'engine']
+__all__ = [
+    'Base',
+    'Session',
+    'SyncSession',
+    'PulpSession',
+    'PulpAsyncSession',
+    'engine',
+    'pulp_async_engine',
+]
 
 
 DATABASE_URL = settings.database_url
@@ -33,3 +41,9 @@ pulp_engine = create_engine(settings.pulp_database_url,
                             pool_pre_ping=True, pool_recycle=3600)
 pulp_session_factory = sessionmaker(pulp_engine, expire_on_commit=False)
 PulpSession = scoped_session(pulp_session_factory)
+pulp_async_engine = create_async_engine(
+    settings.pulp_async_database_url, poolclass=NullPool, echo_pool=True
+)
+PulpAsyncSession = sessionmaker(
+    pulp_async_engine, expire_on_commit=False, class_=AsyncSession
+)
@@ -15,8 +15,19 @@ import asyncio
 
 import dramatiq
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from dramatiq.middleware import Middleware
 
 from alws.config import settings
+from alws.utils.pulp_client import close_pulp_connection_pool
+
+
+class PulpConnectionPoolMiddleware(Middleware):
+    # Worker threads share the same event loop,
+    # so the pool can be closed once all of them are stopped
+    def after_worker_shutdown(self, broker, worker):
+        if not event_loop.is_closed():
+            event_loop.run_until_complete(close_pulp_connection_pool())
+
 
 rabbitmq_broker = RabbitmqBroker(
     url=f"amqp://"
@@ -25,6 +36,7 @@ rabbitmq_broker = RabbitmqBroker(
     f"{settings.rabbitmq_default_host}:5672/"
     f"{settings.rabbitmq_default_vhost}",
 )
+rabbitmq_broker.add_middleware(PulpConnectionPoolMiddleware())
 dramatiq.set_broker(rabbitmq_broker)
 event_loop = asyncio.get_event_loop()
 
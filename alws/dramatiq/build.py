@@ -1,4 +1,5 @@
 import datetime
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 
 import dramatiq
@@ -7,6 +8,7 @@ import logging
 from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql.expression import func
 
 from alws import models
@@ -21,18 +23,25 @@ from alws.errors import (
     SrpmProvisionError,
 )
 from alws.build_planner import BuildPlanner
+from alws.config import settings
 from alws.schemas import build_schema, build_node_schema
-from alws.database import SyncSession
 from alws.dependencies import get_db
 from alws.dramatiq import event_loop
+from alws.utils.build_task_dispatcher import notify_build_tasks_ready
 
 __all__ = ['start_build', 'build_done']
 
 logger = logging.getLogger(__name__)
 
-def _sync_fetch_build(db: SyncSession, build_id: int) -> models.Build:
-    query = select(models.Build).where(models.Build.id == build_id)
-    result = db.execute(query)
+async def _fetch_build(db: AsyncSession, build_id: int) -> models.Build:
+    # Collections are extended by the build planner,
+    # they can't be lazy loaded with async session
+    query = select(models.Build).where(models.Build.id == build_id).options(
+        selectinload(models.Build.repos),
+        selectinload(models.Build.tasks),
+        selectinload(models.Build.linked_builds),
+    )
+    result = await db.execute(query)
     return result.scalars().first()
 
 
@@ -40,49 +49,85 @@ async def _start_build(build_id: int, build_request: build_schema.BuildCreate):
     has_modules = any((isinstance(t, build_schema.BuildTaskModuleRef)
                        for t in build_request.tasks))
     module_build_index = {}
+    refs_count = sum(
+        len(task.refs)
+        if isinstance(task, build_schema.BuildTaskModuleRef) else 1
+        for task in build_request.tasks
+    )
+    bulk_mode = bool(
+        settings.build_bulk_creation_threshold
+        and refs_count >= settings.build_bulk_creation_threshold
+    )
 
     if has_modules:
-        with SyncSession() as db, db.begin():
-            platforms = db.execute(select(models.Platform).where(
-                models.Platform.name.in_(
+        async with asynccontextmanager(get_db)() as db, db.begin():
+            platforms = (await db.execute(
+                update(models.Platform)
+                .where(models.Platform.name.in_(
                     [p.name for p in build_request.platforms]))
-            ).scalars().all()
-            for platform in platforms:
-                db.execute(update(models.Platform).where(
-                    models.Platform.id == platform.id).values(
-                    {'module_build_index': models.Platform.module_build_index + 1}))
-                db.add(platform)
-            db.flush()
-            for platform in platforms:
-                module_build_index[platform.name] = platform.module_build_index
-            db.commit()
-            db.close()
-
-    with SyncSession() as db:
-        with db.begin():
-            build = _sync_fetch_build(db, build_id)
-            planner = BuildPlanner(
-                db,
-                build,
-                platforms=build_request.platforms,
-                platform_flavors=build_request.platform_flavors,
-                is_secure_boot=build_request.is_secure_boot,
-                module_build_index=module_build_index
-            )
-            for task in build_request.tasks:
-                await planner.add_task(task)
-            for linked_id in build_request.linked_builds:
-                linked_build = _sync_fetch_build(db, linked_id)
-                if linked_build:
-                    await planner.add_linked_builds(linked_build)
-            db.flush()
-            await planner.init_build_repos()
-            db.commit()
-        db.close()
+                .values(
+                    module_build_index=models.Platform.module_build_index + 1
+                )
+                .returning(
+                    models.Platform.name, models.Platform.module_build_index)
+            )).all()
+            for platform_name, platform_build_index in platforms:
+                module_build_index[platform_name] = platform_build_index
+            await db.commit()
+
+    planner = None
+    try:
+        async with asynccontextmanager(get_db)() as db:
+            async with db.begin():
+                build = await _fetch_build(db, build_id)
+                planner = BuildPlanner(
+                    db,
+                    build,
+                    platforms=build_request.platforms,
+                    platform_flavors=build_request.platform_flavors,
+                    is_secure_boot=build_request.is_secure_boot,
+                    module_build_index=module_build_index,
+                    bulk_mode=bulk_mode,
+                )
+                await planner.load()
+                for task in build_request.tasks:
+                    await planner.add_task(task)
+                for linked_id in build_request.linked_builds:
+                    linked_build = (await db.execute(
+                        select(models.Build)
+                        .where(models.Build.id == linked_id)
+                    )).scalars().first()
+                    if linked_build:
+                        await planner.add_linked_builds(linked_build)
+                await db.flush()
+                await planner.write_bulk_tasks()
+                await planner.init_build_repos()
+                await db.commit()
+    except Exception:
+        # Pooled repositories aren't used by the build, which isn't started
+        if planner is not None:
+            await planner.release_pooled_repos()
+        raise
+    await notify_build_tasks_ready(
+        arch
+        for platform in build_request.platforms
+        for arch in platform.arch_list
+    )
+    await planner.rename_pooled_repos()
 
 
 async def _build_done(request: build_node_schema.BuildDone):
     async for db in get_db():
+        started = await build_node_crud.start_build_done_processing(
+            db, request
+        )
+        await db.commit()
+        if not started:
+            logger.info(
+                'Results of build task "%d" are already processed, skipping',
+                request.task_id,
+            )
+            return
         try:
             await build_node_crud.safe_build_done(db, request)
         except Exception as e:
@@ -101,6 +146,8 @@ async def _build_done(request: build_node_schema.BuildDone):
             build_task.status = BuildTaskStatus.FAILED
             await build_node_crud.fast_fail_other_tasks_by_ref(db, build_task)
             await db.commit()
+        await build_node_crud.finish_build_done_processing(db, request)
+        await db.commit()
 
         # We don't want to create the test tasks until all build tasks
         # of the same build_id are completed.
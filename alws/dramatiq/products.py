@@ -14,25 +14,26 @@ from alws.database import Session
 from alws.dramatiq import event_loop
 from alws.utils.log_utils import setup_logger
 from alws.utils.pulp_client import PulpClient
+from alws.utils.pulp_content_listing import PulpContentListing
 
 __all__ = ['perform_product_modification']
 
 logger = setup_logger(__name__)
 
 async def get_existing_packages(
-    pulp_client: PulpClient,
+    content_listing: PulpContentListing,
     repository: models.Repository,
 ) -> typing.List[typing.Dict[str, str]]:
 
     pulp_fields = ["pulp_href", "artifact", "sha256", "location_href", "arch"]
-    return await pulp_client.get_rpm_repository_packages(
+    return await content_listing.get_rpm_repository_packages(
         repository.pulp_href,
         include_fields=pulp_fields,
     )
 
 
 async def get_packages(
-    pulp_client: PulpClient,
+    content_listing: PulpContentListing,
     build_repo: models.Repository,
     dist_repo: models.Repository,
     modification: str,
@@ -50,9 +51,9 @@ async def get_packages(
                 filtered.append(pkg)
         return filtered
 
-    dist_packages = await get_existing_packages(pulp_client, dist_repo)
+    dist_packages = await get_existing_packages(content_listing, dist_repo)
     search_by_href = set([pkg["pulp_href"] for pkg in dist_packages])
-    build_packages = await get_existing_packages(pulp_client, build_repo)
+    build_packages = await get_existing_packages(content_listing, build_repo)
     filtered_build_packages = filter_by_arch(build_packages, dist_repo.arch)
     logger.debug("Packages in product repository %s:\n%s", dist_repo.name,
                  pprint.pformat(dist_packages))
@@ -87,7 +88,7 @@ async def get_packages(
 async def prepare_repo_modify_dict(
     db_build: models.Build,
     db_product: models.Product,
-    pulp_client: PulpClient,
+    content_listing: PulpContentListing,
     modification: str,
     pkgs_blacklist: typing.List[str]
 ) -> typing.Dict[str, typing.List[str]]:
@@ -104,7 +105,7 @@ async def prepare_repo_modify_dict(
         if dist_repo is None:
             continue
         tasks.append(get_packages(
-            pulp_client, repo, dist_repo, modification, pkgs_blacklist
+            content_listing, repo, dist_repo, modification, pkgs_blacklist
         ))
 
     results = await asyncio.gather(*tasks)
@@ -231,7 +232,8 @@ async def _perform_product_modification(
 ):
 
     pulp_client = PulpClient(settings.pulp_host, settings.pulp_user,
-                             settings.pulp_password)
+                             settings.pulp_password,
+                             priority=settings.pulp_bulk_requests_priority)
 
     async with Session() as db, db.begin(): 
         db_product = (await db.execute(
@@ -272,10 +274,12 @@ async def _perform_product_modification(
     await set_platform_for_products_repos(db=db, product=db_product)
     await set_platform_for_build_repos(db=db, build=db_build)
 
+    # Whole production repositories are compared here,
+    # so their content is read from Pulp database instead of REST API
     modify = await prepare_repo_modify_dict(
         db_build,
         db_product,
-        pulp_client,
+        PulpContentListing(),
         modification,
         pkgs_blacklist
     )
@@ -290,7 +294,7 @@ async def _perform_product_modification(
         # We've changed products repositories to not invoke
         # automatic publications, so now we need
         # to manually publish them after modification
-        publish_tasks.append(pulp_client.create_rpm_publication(key))
+        publish_tasks.append(pulp_client.schedule_rpm_publication(key))
     await asyncio.gather(*tasks)
     await asyncio.gather(*publish_tasks)
 
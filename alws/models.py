@@ -17,6 +17,7 @@ from sqlalchemy.orm import declarative_mixin, declared_attr, relationship
 from sqlalchemy.sql import func
 
 from alws.constants import (
+    BuildDoneStatus,
     ErrataPackageStatus,
     ErrataReferenceType,
     ErrataReleaseStatus,
@@ -1377,6 +1378,32 @@ class PerformanceStats(Base):
     )
 
 
+class BuildDoneLedgerEntry(Base):
+    __tablename__ = "build_done_ledger"
+
+    build_task_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            "build_tasks.id",
+            name="build_done_ledger_build_task_id_fk",
+            ondelete="CASCADE",
+        ),
+        primary_key=True,
+    )
+    # Digest of the reported status and artifacts,
+    # see BuildDone.artifacts_digest
+    artifacts_digest = sqlalchemy.Column(sqlalchemy.Text, primary_key=True)
+    status = sqlalchemy.Column(
+        sqlalchemy.Enum(BuildDoneStatus),
+        nullable=False,
+    )
+    updated_at = sqlalchemy.Column(
+        sqlalchemy.DateTime,
+        nullable=False,
+        default=func.current_timestamp(),
+    )
+
+
 idx_build_tasks_status_arch_ts = sqlalchemy.Index(
     "idx_build_tasks_status_arch_ts",
     BuildTask.status,
@@ -41,15 +41,16 @@ from alws.perms.authorization import can_perform
 from alws.pulp_models import RpmPackage
 from alws.schemas import release_schema
 from alws.utils.beholder_client import BeholderClient
+from alws.utils.cas_checker import CAS_ARTIFACT_CHECKER
 from alws.utils.debuginfo import clean_debug_name, is_debuginfo_rpm
 from alws.utils.measurements import class_measure_work_time_async
 from alws.utils.modularity import IndexWrapper, ModuleWrapper
 from alws.utils.parsing import get_clean_distr_name
 from alws.utils.pulp_client import PulpClient
 from alws.utils.pulp_utils import (
-    get_rpm_packages_by_ids,
-    get_rpm_packages_from_repositories,
-    get_rpm_packages_from_repository,
+    get_rpm_packages_by_ids_async,
+    get_rpm_packages_from_repositories_async,
+    get_rpm_packages_from_repository_async,
     get_uuid_from_pulp_href,
 )
 
@@ -138,7 +139,7 @@ class BaseReleasePlanner(metaclass=ABCMeta):
                 )
             )
             publish_tasks.append(
-                self.pulp_client.create_rpm_publication(repo.pulp_href),
+                self.pulp_client.schedule_rpm_publication(repo.pulp_href),
             )
         await asyncio.gather(*modify_tasks)
         await asyncio.gather(*publish_tasks)
@@ -190,8 +191,8 @@ class BaseReleasePlanner(metaclass=ABCMeta):
     async def authenticate_package(self, package_checksum: str):
         is_authenticated = False
         if self.codenotary_enabled:
-            is_authenticated = self._cas_wrapper.authenticate_artifact(
-                package_checksum, use_hash=True
+            is_authenticated = await CAS_ARTIFACT_CHECKER.authenticate(
+                self._cas_wrapper, package_checksum
             )
         return package_checksum, is_authenticated
 
@@ -211,7 +212,7 @@ class BaseReleasePlanner(metaclass=ABCMeta):
             RpmPackage.release,
             RpmPackage.arch,
         ]
-        pulp_packages = get_rpm_packages_by_ids(
+        pulp_packages = await get_rpm_packages_by_ids_async(
             [
                 get_uuid_from_pulp_href(rpm.artifact.href)
                 for rpm in build_rpms
@@ -700,7 +701,7 @@ class CommunityReleasePlanner(BaseReleasePlanner):
             if repo.arch == "x86_64"
         ]
         for repo_id in x86_64_build_repos_ids:
-            for rpm_pkg in get_rpm_packages_from_repository(
+            for rpm_pkg in await get_rpm_packages_from_repository_async(
                 repo_id,
                 pkg_arches=["i686"],
             ):
@@ -848,7 +849,7 @@ class CommunityReleasePlanner(BaseReleasePlanner):
         )
         await asyncio.gather(
             *(
-                self.pulp_client.create_rpm_publication(href)
+                self.pulp_client.schedule_rpm_publication(href)
                 for href in repository_modification_mapping.keys()
             )
         )
@@ -970,7 +971,7 @@ class AlmaLinuxReleasePlanner(BaseReleasePlanner):
                 collection.append(package[key])
 
         packages_presence_info = defaultdict(list)
-        pulp_packages = get_rpm_packages_from_repositories(
+        pulp_packages = await get_rpm_packages_from_repositories_async(
             repo_ids=list(repo_mapping),
             pkg_names=pkg_names,
             pkg_epochs=pkg_epochs,
@@ -1564,18 +1565,27 @@ class AlmaLinuxReleasePlanner(BaseReleasePlanner):
 
         # check packages presence in prod repos
         self.base_platform = release.platform
-        for pkg_dict in release.plan["packages"]:
-            package = pkg_dict["package"]
-            if self.codenotary_enabled:
-                authenticate_tasks.append(
-                    self.authenticate_package(package["sha256"])
-                )
-        (
-            pkgs_from_repos,
-            pkgs_in_repos,
-        ) = await self.check_packages_presence_in_prod_repositories(
-            release.plan["packages"],
-        )
+        if self.codenotary_enabled:
+            # Checks run in a thread pool while packages presence
+            # in production repositories is checked
+            authenticate_tasks = [
+                asyncio.ensure_future(self.authenticate_package(sha256))
+                for sha256 in {
+                    pkg_dict["package"]["sha256"]
+                    for pkg_dict in release.plan["packages"]
+                }
+            ]
+        try:
+            (
+                pkgs_from_repos,
+                pkgs_in_repos,
+            ) = await self.check_packages_presence_in_prod_repositories(
+                release.plan["packages"],
+            )
+        except Exception:
+            for task in authenticate_tasks:
+                task.cancel()
+            raise
         release.plan["packages_from_repos"] = pkgs_from_repos
         release.plan["packages_in_repos"] = pkgs_in_repos
         if self.codenotary_enabled:
@@ -1711,7 +1721,7 @@ class AlmaLinuxReleasePlanner(BaseReleasePlanner):
                 )
                 # after modify repo we need to publish repo content
                 publication_tasks.append(
-                    self.pulp_client.create_rpm_publication(repo.pulp_href)
+                    self.pulp_client.schedule_rpm_publication(repo.pulp_href)
                 )
         await asyncio.gather(*modify_tasks)
         await asyncio.gather(*publication_tasks)
@@ -1,11 +1,9 @@
-import datetime
-import itertools
 import typing
 
 from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from alws import dramatiq
+from alws import dramatiq, models
 from alws.auth import get_current_user
 from alws.config import settings
 from alws.constants import BuildTaskRefType, BuildTaskStatus
@@ -20,14 +18,13 @@ router = APIRouter(
 )
 
 
+# Heartbeats are written to the database in batches,
+# see alws.utils.build_task_heartbeats
 @router.post("/ping")
-async def ping(
-    node_status: build_node_schema.Ping,
-    db: AsyncSession = Depends(get_db),
-):
+async def ping(node_status: build_node_schema.Ping):
     if not node_status.active_tasks:
         return {}
-    await build_node.ping_tasks(db, node_status.active_tasks)
+    await build_node.ping_tasks(node_status.active_tasks)
     return {}
 
 
@@ -41,13 +38,14 @@ async def build_done(
     if BuildTaskStatus.is_finished(build_task.status):
         response.status_code = status.HTTP_409_CONFLICT
         return {"ok": False}
-    # We're setting build task timestamp to 3 hours upwards, so
-    # dramatiq can have a time to complete task and build node
-    # won't rebuild task again and again while it's in the queue
-    # in the future this probably should be handled somehow better
-    build_task.ts = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
+    # Build task isn't given to other nodes while its results
+    # are queued or processed, retries of the same results are dropped
+    queued = await build_node.queue_build_done(db, build_done_)
     await db.commit()
-    dramatiq.build_done.send(build_done_.dict())
+    # Build node doesn't ping reported tasks anymore
+    await build_node.discard_task_heartbeats([build_done_.task_id])
+    if queued:
+        dramatiq.build_done.send(build_done_.dict())
     return {"ok": True}
 
 
@@ -62,6 +60,31 @@ async def get_task(
     task = await build_node.get_available_build_task(db, request)
     if not task:
         return
+    environment = await build_node.get_build_task_environment(task, db)
+    return make_task_response(task, environment)
+
+
+# Database session isn't injected here, because waiting build node
+# shouldn't hold a database connection while there are no tasks for it
+@router.get(
+    "/wait_task",
+    response_model=typing.Optional[build_node_schema.Task],
+)
+async def wait_task(request: build_node_schema.WaitTaskRequest):
+    task = await build_node.wait_for_available_build_task(
+        request,
+        timeout=min(request.timeout, settings.build_node_max_wait_timeout),
+    )
+    if not task:
+        return
+    environment = await build_node.get_build_task_environment(task)
+    return make_task_response(task, environment)
+
+
+def make_task_response(
+    task: models.BuildTask,
+    environment: build_node_schema.TaskEnvironment,
+) -> dict:
     # generate full url to builted SRPM for using less memory in database
     built_srpm_url = task.built_srpm_url
     srpm_hash = None
@@ -77,62 +100,27 @@ async def get_task(
             ),
             None,
         )
+    # Platform data, repositories and build mock options are shared
+    # by all tasks of the build, see build_node.get_build_task_environment
     response = {
         "id": task.id,
         "arch": task.arch,
         "build_id": task.build_id,
         "ref": task.ref,
-        "platform": build_node_schema.TaskPlatform.from_orm(task.platform),
-        "repositories": [],
+        "platform": environment.platform,
+        "repositories": environment.repositories,
         "built_srpm_url": built_srpm_url,
         "is_secure_boot": task.is_secure_boot,
         "alma_commit_cas_hash": task.alma_commit_cas_hash,
         "srpm_hash": srpm_hash,
-        "created_by": {
-            "name": task.build.owner.username,
-            "email": task.build.owner.email,
-        },
+        "created_by": environment.created_by,
     }
-    for repo in itertools.chain(task.platform.repos, task.build.repos):
-        if repo.arch == task.arch and repo.type != "build_log":
-            response["repositories"].append(repo)
-    for build in task.build.linked_builds:
-        for repo in build.repos:
-            if repo.arch == task.arch and repo.type != "build_log":
-                response["repositories"].append(repo)
-    if task.build.platform_flavors:
-        for flavour in task.build.platform_flavors:
-            if flavour.data:
-                for key in ("macros", "secure_boot_macros"):
-                    if (
-                        "mock" not in flavour.data
-                        or key not in flavour.data["mock"]
-                    ):
-                        continue
-                    if key not in response["platform"].data["mock"]:
-                        response["platform"].data["mock"][key] = {}
-                    response["platform"].data["mock"][key].update(
-                        flavour.data["mock"][key]
-                    )
-                if "definitions" in flavour.data:
-                    response["platform"].data["definitions"].update(
-                        flavour.data["definitions"]
-                    )
-            for repo in flavour.repos:
-                if repo.arch == task.arch:
-                    response["repositories"].append(repo)
 
     # TODO: Get rid of this fixes when all affected builds would be processed
-    # mock_enabled flag can be None for old build/flavour/platform repos
-    for repo in response["repositories"]:
-        if repo.mock_enabled is None:
-            repo.mock_enabled = True
     # ref_type can be None for old modular builds
     if task.ref.ref_type is None:
         task.ref.ref_type = BuildTaskRefType.GIT_BRANCH
 
-    if task.build.mock_options:
-        response["platform"].add_mock_options(task.build.mock_options)
     if task.mock_options:
         response["platform"].add_mock_options(task.mock_options)
     if task.rpm_module:
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import typing
 
 from pydantic import BaseModel
@@ -70,6 +72,13 @@ class TaskPlatform(BaseModel):
         orm_mode = True
 
 
+class TaskEnvironment(BaseModel):
+
+    platform: TaskPlatform
+    repositories: typing.List[TaskRepo]
+    created_by: TaskCreatedBy
+
+
 class Task(BaseModel):
 
     id: int
@@ -126,7 +135,28 @@ class BuildDone(BaseModel):
     alma_commit_cas_hash: typing.Optional[str]
     git_commit_hash: typing.Optional[str]
 
+    @property
+    def artifacts_digest(self) -> str:
+        # Node statistics and artifact hrefs may differ between retries
+        # of the same build, so only reported content is taken into account
+        payload = {
+            'status': self.status,
+            'artifacts': sorted(
+                (artifact.name, artifact.type, artifact.sha256)
+                for artifact in self.artifacts
+            ),
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode()
+        ).hexdigest()
+
 
 class RequestTask(BaseModel):
 
     supported_arches: typing.List[str]
+
+
+class WaitTaskRequest(RequestTask):
+
+    # Seconds to wait for a task if there are no tasks available right now
+    timeout: int = 60
@@ -13,7 +13,10 @@ from alws.config import settings
 from alws.constants import BuildTaskRefType
 from alws.errors import EmptyBuildError
 from alws.schemas.perf_stats_schema import PerformanceStats
-from alws.utils.beholder_client import BeholderClient
+from alws.utils.beholder_client import (
+    BeholderClient,
+    get_build_beholder_cache,
+)
 from alws.utils.gitea import GiteaClient, download_modules_yaml
 from alws.utils.modularity import (
     ModuleWrapper,
@@ -411,6 +414,7 @@ async def get_module_refs(
     platform: models.Platform,
     flavors: typing.List[models.PlatformFlavour],
     platform_arches: typing.List[str] = None,
+    beholder_client: typing.Optional[BeholderClient] = None,
 ) -> typing.Tuple[
     typing.List[ModuleRef],
     typing.List[str],
@@ -421,10 +425,12 @@ async def get_module_refs(
         logging.getLogger(__name__),
     )
 
-    beholder_client = BeholderClient(
-        host=settings.beholder_host,
-        token=settings.beholder_token,
-    )
+    if beholder_client is None:
+        beholder_client = BeholderClient(
+            host=settings.beholder_host,
+            token=settings.beholder_token,
+            cache=get_build_beholder_cache(),
+        )
     clean_dist_name = get_clean_distr_name(platform.name)
     distr_ver = platform.distr_version
     modified_list = await get_modified_refs_list(
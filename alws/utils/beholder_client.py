@@ -1,23 +1,132 @@
+import asyncio
+import collections
 import copy
 import json
 import logging
+import time
 import typing
 import urllib.parse
 
 import aiohttp
 
+from alws.config import settings
 from alws.constants import LOWEST_PRIORITY, REQUEST_TIMEOUT
 from alws.models import Platform
 from alws.utils.parsing import get_clean_distr_name
 
 
+CacheKey = typing.Tuple[str, typing.Tuple[typing.Tuple[str, str], ...]]
+
+
+class BeholderCache:
+    """
+    Memoizes responses of Beholder GET requests by URL and params.
+
+    Request-scoped cache (e.g. for one planned build) keeps responses
+    until it's dropped, concurrent requests of the same URL share one
+    call and failures are memoized as well. If `shared` cache is given,
+    successful responses are also looked up and stored there.
+    With `ttl` entries expire, `max_size` limits the number of entries.
+    Callers get copies of responses, so they can modify them.
+    """
+
+    def __init__(
+        self,
+        ttl: typing.Optional[int] = None,
+        max_size: typing.Optional[int] = None,
+        shared: typing.Optional["BeholderCache"] = None,
+    ):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._shared = shared
+        self._items: typing.OrderedDict[
+            CacheKey, typing.Tuple[typing.Optional[float], asyncio.Future]
+        ] = collections.OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _get_future(
+        self,
+        key: CacheKey,
+    ) -> typing.Optional[asyncio.Future]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, future = item
+        if expires_at is not None and expires_at < time.monotonic():
+            self._items.pop(key, None)
+            return None
+        self._items.move_to_end(key)
+        return future
+
+    def _set_future(self, key: CacheKey, future: asyncio.Future):
+        expires_at = None
+        if self._ttl is not None:
+            expires_at = time.monotonic() + self._ttl
+        self._items[key] = (expires_at, future)
+        self._items.move_to_end(key)
+        while self._max_size and len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    async def get_or_fetch(
+        self,
+        key: CacheKey,
+        fetch: typing.Callable[[], typing.Awaitable[typing.Any]],
+    ) -> typing.Any:
+        future = self._get_future(key)
+        if future is not None:
+            self.stats["hits"] += 1
+            return copy.deepcopy(await asyncio.shield(future))
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._set_future(key, future)
+        try:
+            if self._shared is not None:
+                response = await self._shared.get_or_fetch(key, fetch)
+            else:
+                response = await fetch()
+        except Exception as exc:
+            if self._ttl is not None:
+                # Shared caches don't keep failures
+                self._items.pop(key, None)
+            future.set_exception(exc)
+            # Mark exception as retrieved if nobody else waits for it
+            future.exception()
+            raise
+        except BaseException:
+            self._items.pop(key, None)
+            future.cancel()
+            raise
+        future.set_result(response)
+        return copy.deepcopy(response)
+
+    def clear(self):
+        self._items.clear()
+
+
+SHARED_BEHOLDER_CACHE = (
+    BeholderCache(
+        ttl=settings.beholder_cache_ttl,
+        max_size=settings.beholder_cache_max_size,
+    )
+    if settings.beholder_cache_ttl
+    else None
+)
+
+
+def get_build_beholder_cache() -> BeholderCache:
+    # One cache is used while a build is planned
+    return BeholderCache(shared=SHARED_BEHOLDER_CACHE)
+
+
 class BeholderClient:
     def __init__(
         self,
         host: str,
         token: str = "",
+        cache: typing.Optional[BeholderCache] = None,
     ):
         self._host = host
+        self._cache = cache
         self._headers = {}
         if token:
             self._headers.update(
@@ -142,6 +251,23 @@ class BeholderClient:
         endpoint: str,
         headers: typing.Optional[dict] = None,
         params: typing.Optional[dict] = None,
+    ):
+        if self._cache is None or headers:
+            return await self._get(endpoint, headers=headers, params=params)
+        key = (
+            self._get_url(endpoint),
+            tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        )
+        return await self._cache.get_or_fetch(
+            key,
+            lambda: self._get(endpoint, params=params),
+        )
+
+    async def _get(
+        self,
+        endpoint: str,
+        headers: typing.Optional[dict] = None,
+        params: typing.Optional[dict] = None,
     ):
         req_headers = self._headers.copy()
         if headers:
@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+import json
+import logging
+import typing
+
+import aioredis
+
+from alws.config import settings
+
+
+__all__ = [
+    'BUILD_TASKS_CHANNEL',
+    'BuildTaskDispatcher',
+    'BUILD_TASK_DISPATCHER',
+    'notify_build_tasks_ready',
+]
+
+
+BUILD_TASKS_CHANNEL = 'build_tasks_ready'
+# Wakes waiters for every architecture
+ANY_ARCH = '*'
+
+
+class _RedisClients:
+    def __init__(self):
+        self._redis = None
+        self._loop = None
+
+    def get(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(settings.redis_url)
+            self._loop = loop
+        return self._redis
+
+
+_PUBLISHER = _RedisClients()
+
+
+async def notify_build_tasks_ready(
+    arches: typing.Optional[typing.Iterable[str]] = None,
+):
+    """
+    Wakes build nodes waiting for tasks of given architectures
+    (of any architecture if `arches` isn't provided).
+    Notification is best effort, waiting nodes poll again on timeout.
+    """
+    arches = sorted(set(arches)) if arches is not None else [ANY_ARCH]
+    if not arches:
+        return
+    try:
+        await _PUBLISHER.get().publish(BUILD_TASKS_CHANNEL, json.dumps(arches))
+    except Exception:
+        logging.exception('Cannot notify build nodes about new tasks')
+
+
+class BuildTaskDispatcher:
+    """
+    Keeps a single Redis subscription per process and wakes
+    long-polling build nodes whose supported architectures
+    match the architectures of the tasks that became ready.
+    """
+
+    def __init__(self, reconnect_delay: float = 5.0):
+        self._reconnect_delay = reconnect_delay
+        self._waiters: typing.Dict[asyncio.Event, typing.Set[str]] = {}
+        self._redis = _RedisClients()
+        self._listener: typing.Optional[asyncio.Task] = None
+        self._loop = None
+        self.stats = {'notifications': 0, 'wakeups': 0}
+
+    def _ensure_listener(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._waiters = {}
+            self._listener = None
+            self._loop = loop
+        if self._listener is None or self._listener.done():
+            self._listener = loop.create_task(self._listen())
+
+    @contextlib.contextmanager
+    def subscribe(
+        self,
+        arches: typing.Iterable[str],
+    ) -> typing.Iterator[asyncio.Event]:
+        """
+        Registers a waiter for the given architectures, returned event
+        is set when tasks of these architectures may be available.
+        Register before checking for tasks to not miss notifications.
+        """
+        self._ensure_listener()
+        event = asyncio.Event()
+        self._waiters[event] = set(arches)
+        try:
+            yield event
+        finally:
+            self._waiters.pop(event, None)
+
+    def wake(self, arches: typing.Iterable[str]):
+        self.stats['notifications'] += 1
+        arches = set(arches)
+        for event, waiter_arches in self._waiters.items():
+            if ANY_ARCH in arches or waiter_arches & arches:
+                self.stats['wakeups'] += 1
+                event.set()
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.get().pubsub()
+                await pubsub.subscribe(BUILD_TASKS_CHANNEL)
+                # Tasks could become ready while we weren't subscribed
+                self.wake([ANY_ARCH])
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=60,
+                    )
+                    if message is None:
+                        continue
+                    self.wake(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Build tasks subscription is broken')
+                await asyncio.sleep(self._reconnect_delay)
+
+
+BUILD_TASK_DISPATCHER = BuildTaskDispatcher()
@@ -0,0 +1,131 @@
+import asyncio
+import collections
+import copy
+import logging
+import time
+import typing
+
+import aioredis
+
+from alws.config import settings
+
+
+__all__ = ['BuildTaskEnvironmentCache', 'BUILD_TASK_ENVIRONMENT_CACHE']
+
+
+EnvironmentKey = typing.Tuple[int, int, str]
+
+
+class BuildTaskEnvironmentCache:
+    """
+    Per-process LRU cache of build task environments (platform data,
+    repositories, build owner) shared by all tasks of the same
+    (build id, platform id, arch).
+
+    Environment depends on platforms, flavours, repositories and
+    linked builds, so every change of them should call `invalidate`
+    (linked builds are set by the build planner before build tasks
+    can be taken by build nodes). If `redis_url` is provided, invalidation bumps a generation counter
+    in Redis and entries cached by every web server process with older
+    generations aren't used anymore. When the counter can't be read,
+    cache is bypassed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: int = 600,
+        redis_url: typing.Optional[str] = None,
+        key: str = 'build_task_environment_generation',
+    ):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._redis_url = redis_url
+        self._key = key
+        self._generation = 0
+        self._items: typing.OrderedDict[
+            EnvironmentKey, typing.Tuple[int, float, typing.Any]
+        ] = collections.OrderedDict()
+        self._redis = None
+        self._loop = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _get_redis(self) -> typing.Optional[aioredis.Redis]:
+        if not self._redis_url:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(self._redis_url)
+            self._loop = loop
+        return self._redis
+
+    async def _get_generation(self) -> typing.Optional[int]:
+        redis = self._get_redis()
+        if redis is None:
+            return self._generation
+        try:
+            return int(await redis.get(self._key) or 0)
+        except Exception:
+            logging.exception('Cannot get build task environment generation')
+            return None
+
+    async def get_or_create(
+        self,
+        key: EnvironmentKey,
+        create: typing.Callable[[], typing.Awaitable[typing.Any]],
+    ) -> typing.Any:
+        """
+        Returns a copy of the cached environment, so callers can apply
+        task specific options to it, `create` is awaited on cache miss.
+        """
+        generation = await self._get_generation()
+        item = self._items.get(key)
+        if (
+            generation is not None
+            and item is not None
+            and item[0] == generation
+            and item[1] >= time.monotonic()
+        ):
+            self._items.move_to_end(key)
+            self.stats['hits'] += 1
+            return copy.deepcopy(item[2])
+        self.stats['misses'] += 1
+        value = await create()
+        if generation is not None:
+            self._items[key] = (
+                generation,
+                time.monotonic() + self._ttl,
+                copy.deepcopy(value),
+            )
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+        return value
+
+    async def invalidate(self):
+        self._items.clear()
+        self._generation += 1
+        self.stats['invalidations'] += 1
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(self._key)
+        except Exception:
+            logging.exception(
+                'Cannot invalidate build task environments in Redis'
+            )
+
+    def clear(self):
+        self._items.clear()
+
+
+BUILD_TASK_ENVIRONMENT_CACHE = BuildTaskEnvironmentCache(
+    max_size=settings.build_task_environment_cache_max_size,
+    ttl=settings.build_task_environment_cache_ttl,
+    redis_url=(
+        settings.redis_url
+        if settings.build_task_environment_cache_redis_enabled
+        else None
+    ),
+)
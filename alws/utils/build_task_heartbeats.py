@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+import logging
+import time
+import typing
+from contextlib import asynccontextmanager
+
+import aioredis
+import sqlalchemy
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from alws import models
+from alws.config import settings
+from alws.constants import BuildTaskStatus
+from alws.dependencies import get_db
+
+
+__all__ = ['BuildTaskHeartbeats', 'BUILD_TASK_HEARTBEATS']
+
+
+class BuildTaskHeartbeats:
+    """
+    Stores build node heartbeats of active build tasks outside
+    of the main database, so pings don't update `build_tasks` rows.
+
+    Heartbeats are kept in Redis if `redis_url` is provided
+    (shared between all web server processes) or in memory otherwise.
+    `flush` writes them to `BuildTask.ts` in one batch, only for started
+    tasks whose lease in the database is past half of `lease_timeout`,
+    so `flush_interval` should be well below half of `lease_timeout`.
+    Heartbeats of restarted, cancelled and finished tasks are discarded.
+    """
+
+    def __init__(
+        self,
+        lease_timeout: int,
+        flush_interval: float = 60.0,
+        redis_url: typing.Optional[str] = None,
+        key: str = 'build_task_heartbeats',
+    ):
+        self._lease_timeout = lease_timeout
+        self._flush_interval = flush_interval
+        self._redis_url = redis_url
+        self._key = key
+        self._heartbeats: typing.Dict[int, float] = {}
+        self._redis = None
+        self._loop = None
+        self.stats = {'heartbeats': 0, 'flushes': 0, 'flushed_tasks': 0}
+
+    def _get_redis(self) -> typing.Optional[aioredis.Redis]:
+        if not self._redis_url:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(self._redis_url)
+            self._loop = loop
+        return self._redis
+
+    async def record(self, task_ids: typing.Iterable[int]):
+        now = time.time()
+        heartbeats = {int(task_id): now for task_id in task_ids}
+        if not heartbeats:
+            return
+        self.stats['heartbeats'] += len(heartbeats)
+        redis = self._get_redis()
+        if redis is None:
+            self._heartbeats.update(heartbeats)
+            return
+        await redis.hset(self._key, mapping=heartbeats)
+
+    async def discard(self, task_ids: typing.Iterable[int]):
+        task_ids = [int(task_id) for task_id in task_ids]
+        if not task_ids:
+            return
+        redis = self._get_redis()
+        if redis is None:
+            for task_id in task_ids:
+                self._heartbeats.pop(task_id, None)
+            return
+        await redis.hdel(self._key, *task_ids)
+
+    async def _get_all(self) -> typing.Dict[int, float]:
+        redis = self._get_redis()
+        if redis is None:
+            return dict(self._heartbeats)
+        return {
+            int(task_id): float(ts)
+            for task_id, ts in (await redis.hgetall(self._key)).items()
+        }
+
+    async def flush(self, db: AsyncSession) -> int:
+        now = time.time()
+        heartbeats = await self._get_all()
+        expired = {
+            task_id for task_id, ts in heartbeats.items()
+            if ts < now - self._lease_timeout
+        }
+        # Nobody pings these tasks anymore, the database lease
+        # is older than the heartbeat so it's already expired too
+        await self.discard(expired)
+        alive = [
+            (task_id, datetime.datetime.utcfromtimestamp(ts))
+            for task_id, ts in heartbeats.items()
+            if task_id not in expired
+        ]
+        if not alive:
+            return 0
+        renew_before = datetime.datetime.utcnow() - datetime.timedelta(
+            seconds=self._lease_timeout / 2,
+        )
+        values = sqlalchemy.values(
+            sqlalchemy.column('id', sqlalchemy.Integer),
+            sqlalchemy.column('ts', sqlalchemy.DateTime),
+            name='heartbeats',
+        ).data(alive)
+        async with db.begin():
+            result = await db.execute(
+                update(models.BuildTask)
+                .where(
+                    models.BuildTask.id == values.c.id,
+                    models.BuildTask.status == BuildTaskStatus.STARTED,
+                    models.BuildTask.ts < renew_before,
+                )
+                .values(ts=values.c.ts)
+                .execution_options(synchronize_session=False)
+            )
+        self.stats['flushes'] += 1
+        self.stats['flushed_tasks'] += result.rowcount
+        return result.rowcount
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                async with asynccontextmanager(get_db)() as db:
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot flush build task heartbeats')
+
+
+BUILD_TASK_HEARTBEATS = BuildTaskHeartbeats(
+    lease_timeout=settings.build_task_lease_timeout,
+    flush_interval=settings.build_task_heartbeats_flush_interval,
+    redis_url=(
+        settings.redis_url
+        if settings.build_task_heartbeats_redis_enabled
+        else None
+    ),
+)
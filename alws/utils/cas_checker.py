@@ -0,0 +1,101 @@
+import asyncio
+import collections
+import concurrent.futures
+import time
+import typing
+
+from alws.config import settings
+
+
+__all__ = ['CasArtifactChecker', 'CAS_ARTIFACT_CHECKER']
+
+
+class CasArtifactChecker:
+    """
+    Runs blocking CAS notarization checks of artifacts in a bounded
+    thread pool, so checks of release packages run in parallel and don't
+    block the event loop.
+
+    Successful checks are cached by sha256 for `ttl` seconds because the
+    same packages are checked again on plan updates, retries and reverts.
+    Failed checks aren't cached, since a package can be notarized
+    in the meantime. Concurrent checks of the same sha256 share one call.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        ttl: int = 3600,
+        max_size: int = 100000,
+    ):
+        self._max_workers = max_workers
+        self._ttl = ttl
+        self._max_size = max_size
+        self._executor = None
+        self._authenticated: typing.OrderedDict[str, float] = (
+            collections.OrderedDict()
+        )
+        self._pending: typing.Dict[str, asyncio.Future] = {}
+        self._loop = None
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix='cas-checker',
+            )
+        return self._executor
+
+    def _is_cached(self, sha256: str) -> bool:
+        expires_at = self._authenticated.get(sha256)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._authenticated[sha256]
+            return False
+        self._authenticated.move_to_end(sha256)
+        return True
+
+    def _remember(self, sha256: str):
+        self._authenticated[sha256] = time.monotonic() + self._ttl
+        self._authenticated.move_to_end(sha256)
+        while len(self._authenticated) > self._max_size:
+            self._authenticated.popitem(last=False)
+
+    async def authenticate(self, cas_wrapper, sha256: str) -> bool:
+        if self._is_cached(sha256):
+            self.stats['hits'] += 1
+            return True
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._pending.clear()
+            self._loop = loop
+        future = self._pending.get(sha256)
+        if future is None:
+            self.stats['misses'] += 1
+            future = loop.run_in_executor(
+                self._get_executor(),
+                lambda: cas_wrapper.authenticate_artifact(
+                    sha256, use_hash=True
+                ),
+            )
+            self._pending[sha256] = future
+            try:
+                is_authenticated = await asyncio.shield(future)
+            finally:
+                self._pending.pop(sha256, None)
+            if is_authenticated:
+                self._remember(sha256)
+            return bool(is_authenticated)
+        return bool(await asyncio.shield(future))
+
+    def clear(self):
+        self._authenticated.clear()
+
+
+CAS_ARTIFACT_CHECKER = CasArtifactChecker(
+    max_workers=settings.cas_check_concurrency,
+    ttl=settings.cas_check_cache_ttl,
+    max_size=settings.cas_check_cache_max_size,
+)
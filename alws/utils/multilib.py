@@ -19,7 +19,7 @@ from alws.utils.modularity import IndexWrapper
 from alws.utils.parsing import get_clean_distr_name
 from alws.utils.pulp_client import PulpClient
 from alws.utils.pulp_utils import (
-    get_rpm_packages_by_ids,
+    get_rpm_packages_by_ids_async,
     get_uuid_from_pulp_href,
 )
 
@@ -244,7 +244,7 @@ class MultilibProcessor:
         db_artifacts = await get_build_task_artifacts(
             self._db, self._build_task
         )
-        pulp_packages = get_rpm_packages_by_ids(
+        pulp_packages = await get_rpm_packages_by_ids_async(
             [
                 get_uuid_from_pulp_href(artifact.href)
                 for artifact in db_artifacts
@@ -301,7 +301,7 @@ class MultilibProcessor:
         self,
         rpm_packages: typing.List[BuildDoneArtifact],
     ) -> typing.List[typing.Dict[str, typing.Any]]:
-        results = get_rpm_packages_by_ids(
+        results = await get_rpm_packages_by_ids_async(
             [get_uuid_from_pulp_href(rpm.href) for rpm in rpm_packages],
             [
                 RpmPackage.content_ptr_id,
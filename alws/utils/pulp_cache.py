@@ -0,0 +1,97 @@
+import asyncio
+import collections
+import logging
+import time
+import typing
+
+import aioredis
+
+
+__all__ = ['PulpContentCache']
+
+
+class PulpContentCache:
+    """
+    Bounded LRU cache with TTL eviction for immutable Pulp lookups
+    (artifact by sha256, content by artifact and relative path, etc.).
+
+    If `redis_url` is provided, values are also stored in Redis,
+    so every worker process can reuse lookups made by the others.
+    Local cache is always checked first.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: int = 3600,
+        redis_url: typing.Optional[str] = None,
+        key_prefix: str = 'pulp_cache',
+    ):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._redis_url = redis_url
+        self._key_prefix = key_prefix
+        self._items: typing.OrderedDict[str, typing.Tuple[float, str]] = (
+            collections.OrderedDict()
+        )
+        self._redis = None
+        self._loop = None
+        self.stats = {'hits': 0, 'redis_hits': 0, 'misses': 0}
+
+    def _get_redis(self) -> typing.Optional[aioredis.Redis]:
+        if not self._redis_url:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(self._redis_url)
+            self._loop = loop
+        return self._redis
+
+    def _get_local(self, key: str) -> typing.Optional[str]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._items.pop(key, None)
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: str):
+        self._items[key] = (time.monotonic() + self._ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    async def get(self, key: str) -> typing.Optional[str]:
+        value = self._get_local(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                value = await redis.get(f'{self._key_prefix}:{key}')
+            except Exception:
+                logging.exception('Cannot get %s from Redis cache', key)
+            if value is not None:
+                value = value.decode()
+                self._set_local(key, value)
+                self.stats['redis_hits'] += 1
+                return value
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        self._set_local(key, value)
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(f'{self._key_prefix}:{key}', value, ex=self._ttl)
+        except Exception:
+            logging.exception('Cannot save %s into Redis cache', key)
+
+    def clear(self):
+        self._items.clear()
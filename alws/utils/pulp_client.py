@@ -1,8 +1,8 @@
 import asyncio
+import hashlib
 import io
 import json
 import logging
-import math
 import re
 import os
 import typing
@@ -18,25 +18,176 @@ from aiohttp.client_exceptions import ClientResponseError
 from fastapi import status
 from aiohttp_retry import RetryClient, ExponentialRetry
 
+from alws.config import settings
 from alws.constants import UPLOAD_FILE_CHUNK_SIZE
-from alws.utils.file_utils import hash_content, hash_file
+from alws.utils.file_utils import hash_content
 from alws.utils.ids import get_random_unique_version
+from alws.utils.pulp_cache import PulpContentCache
+from alws.utils.pulp_modify_coalescer import PulpModifyCoalescer
+from alws.utils.pulp_publication_scheduler import PulpPublicationScheduler
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
+from alws.utils.pulp_task_watcher import PulpTaskWatcher
+
+
+class PulpConnectionPool:
+    """
+    Keep-alive HTTP connection pool shared by all PulpClient instances
+    of the process (FastAPI application or dramatiq worker).
 
+    aiohttp sessions are bound to the event loop they were created in,
+    so the session is recreated lazily if the running loop has changed.
+    """
 
-PULP_SEMAPHORE = asyncio.Semaphore(5)
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 60.0,
+    ):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._retry_client = None
+        self._loop = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def _on_connection_reused(self, *args):
+        self.stats["hits"] += 1
+
+    async def _on_connection_created(self, *args):
+        self.stats["misses"] += 1
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_reuseconn.append(
+            self._on_connection_reused
+        )
+        trace_config.on_connection_create_end.append(
+            self._on_connection_created
+        )
+        connector = aiohttp.TCPConnector(
+            limit=self._limit,
+            limit_per_host=self._limit_per_host,
+            keepalive_timeout=self._keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[trace_config],
+        )
+
+    def _ensure_session(self):
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._loop is not loop
+        ):
+            self._session = self._create_session()
+            self._retry_client = RetryClient(client_session=self._session)
+            self._loop = loop
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        self._ensure_session()
+        return self._session
+
+    @property
+    def retry_client(self) -> RetryClient:
+        self._ensure_session()
+        return self._retry_client
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._retry_client = None
+        self._loop = None
+
+
+PULP_CONNECTION_POOL = PulpConnectionPool(
+    limit=settings.pulp_pool_limit,
+    limit_per_host=settings.pulp_pool_limit_per_host,
+    keepalive_timeout=settings.pulp_pool_keepalive_timeout,
+)
+
+
+async def close_pulp_connection_pool():
+    await PULP_CONNECTION_POOL.close()
+
+
+PULP_SCHEDULER = PulpRequestScheduler(settings.pulp_request_lanes)
+
+
+PULP_CONTENT_CACHE = PulpContentCache(
+    max_size=settings.pulp_cache_max_size,
+    ttl=settings.pulp_cache_ttl,
+    redis_url=(
+        settings.redis_url if settings.pulp_cache_redis_enabled else None
+    ),
+)
+
+
+PULP_MODIFY_COALESCER = PulpModifyCoalescer(
+    window=settings.pulp_modify_coalesce_window,
+)
+
+
+PULP_PUBLICATION_SCHEDULER = PulpPublicationScheduler(
+    quiet_period=settings.pulp_publication_quiet_period,
+    max_delay=settings.pulp_publication_max_delay,
+)
+
+
+PULP_TASK_WATCHERS: typing.Dict[str, PulpTaskWatcher] = {}
+
+
+def get_pulp_task_watcher(host: str) -> PulpTaskWatcher:
+    if host not in PULP_TASK_WATCHERS:
+        PULP_TASK_WATCHERS[host] = PulpTaskWatcher(
+            min_interval=settings.pulp_task_poll_min_interval,
+            max_interval=settings.pulp_task_poll_max_interval,
+        )
+    return PULP_TASK_WATCHERS[host]
 
 
 class PulpClient:
-    def __init__(self, host: str, username: str, password: str):
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        priority: int = 0,
+    ):
         self._host = host
         self._username = username
         self._password = password
+        # Requests with lower priority value are served first
+        # when lane concurrency budget is exhausted
+        self._priority = priority
         self._auth = aiohttp.BasicAuth(self._username, self._password)
         self._current_transaction = None
         self._retry_options = ExponentialRetry(
             exceptions={asyncio.TimeoutError, ClientResponseError}
         )
 
+    @property
+    def pool_stats(self) -> typing.Dict[str, int]:
+        return dict(PULP_CONNECTION_POOL.stats)
+
+    @property
+    def cache_stats(self) -> typing.Dict[str, int]:
+        return dict(PULP_CONTENT_CACHE.stats)
+
+    @property
+    def scheduler_stats(self) -> typing.Dict[str, typing.Dict[str, Any]]:
+        return PULP_SCHEDULER.stats
+
     async def create_log_repo(
         self, name: str, distro_path_start: str = "build_logs"
     ) -> (str, str):
@@ -77,6 +228,47 @@ class PulpClient:
             name, auto_publish=True, create_publication=True
         )
 
+    async def rename_repository(
+        self,
+        repo_href: str,
+        name: str,
+        new_name: str,
+        repo_type: str = "rpm",
+    ):
+        # Distribution keeps its base path, so repository URL isn't changed
+        task = await self.request(
+            "PATCH", repo_href, json={"name": new_name}, lane=TASK_LANE
+        )
+        await self.wait_for_task(task["task"])
+        endpoint = f"pulp/api/v3/distributions/{repo_type}/{repo_type}/"
+        distros = await self.request(
+            "GET", endpoint, params={"name": f"{name}-distro"}
+        )
+        for distro in distros["results"]:
+            task = await self.request(
+                "PATCH",
+                distro["pulp_href"],
+                json={"name": f"{new_name}-distro"},
+                lane=TASK_LANE,
+            )
+            await self.wait_for_task(task["task"])
+
+    async def delete_repository_with_distro(
+        self,
+        repo_href: str,
+        name: str,
+        repo_type: str = "rpm",
+    ):
+        endpoint = f"pulp/api/v3/distributions/{repo_type}/{repo_type}/"
+        distros = await self.request(
+            "GET", endpoint, params={"name": f"{name}-distro"}
+        )
+        for distro in distros["results"]:
+            await self.delete_by_href(
+                distro["pulp_href"], wait_for_result=True
+            )
+        await self.delete_by_href(repo_href, wait_for_result=True)
+
     async def get_repo_modules(self, repo_href: str) -> typing.List[str]:
         version = await self.get_by_href(repo_href)
         content = await self.get_latest_repo_present_content(
@@ -199,7 +391,9 @@ class PulpClient:
 
     async def create_module_by_payload(self, payload: dict) -> str:
         ENDPOINT = "pulp/api/v3/content/rpm/modulemds/"
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         return task_result["created_resources"][0]
 
@@ -224,16 +418,24 @@ class PulpClient:
             "artifacts": [],
             "dependencies": [],
         }
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         return task_result["created_resources"][0], sha256
 
     async def check_if_artifact_exists(self, sha256: str) -> typing.Optional[str]:
         ENDPOINT = "pulp/api/v3/artifacts/"
+        cache_key = f"artifact:{sha256}"
+        artifact_href = await PULP_CONTENT_CACHE.get(cache_key)
+        if artifact_href:
+            return artifact_href
         payload = {"sha256": sha256}
         response = await self.request("GET", ENDPOINT, params=payload)
         if response["count"]:
-            return response["results"][0]["pulp_href"]
+            artifact_href = response["results"][0]["pulp_href"]
+            await PULP_CONTENT_CACHE.set(cache_key, artifact_href)
+            return artifact_href
         return None
 
     async def upload_comps(self, data: dict) -> typing.List[str]:
@@ -241,45 +443,124 @@ class PulpClient:
         Endpoint will modify and publish repository after adding content units
         """
         endpoint = "pulp/api/v3/rpm/comps/"
-        task = await self.request("POST", endpoint, data=data)
+        task = await self.request("POST", endpoint, data=data, lane=TASK_LANE)
         task_result = await self.wait_for_task(task["task"])
         return task_result["created_resources"]
 
-    async def _upload_local_file(
-        self, file_path: str, sha256: str, chunk_size: int = UPLOAD_FILE_CHUNK_SIZE
+    async def _upload_chunk(
+        self,
+        upload_href: str,
+        chunk: memoryview,
+        chunk_name: str,
+        start: int,
+        file_size: int,
     ):
+        payload = aiohttp.FormData()
+        payload.add_field(
+            "file",
+            chunk,
+            filename=chunk_name,
+            content_type="application/octet-stream",
+        )
+        stop = start + len(chunk) - 1
+        headers = {"Content-Range": f"bytes {start}-{stop}/{file_size}"}
+        await self.request("PUT", upload_href, data=payload, headers=headers)
+
+    async def _upload_local_file(
+        self,
+        file_path: str,
+        sha256: typing.Optional[str] = None,
+        chunk_size: int = UPLOAD_FILE_CHUNK_SIZE,
+        parallel_chunks: int = settings.pulp_upload_parallel_chunks,
+    ) -> typing.Tuple[typing.Optional[str], str]:
+        """
+        Uploads file in a single pass: file chunks are hashed while
+        they are read and up to `parallel_chunks` of them are being PUT
+        at the same time. Chunk buffers are reused between chunks,
+        so memory usage is bounded by `parallel_chunks * chunk_size`.
+        If artifact with calculated checksum already exists in Pulp,
+        upload is dropped and existing artifact is returned.
+        """
+        loop = asyncio.get_running_loop()
         file_size = os.path.getsize(file_path)
-        chunks = math.ceil(file_size / chunk_size)
-        start = 0
+        chunk_prefix = file_path.strip("/").replace("/", "_")
+        hasher = hashlib.sha256()
+        buffers = asyncio.Queue()
+        for _ in range(max(parallel_chunks, 1)):
+            buffers.put_nowait(None)
+        uploads = []
+
+        async def upload_chunk(buffer, chunk, chunk_number, start):
+            try:
+                await self._upload_chunk(
+                    upload_href,
+                    chunk,
+                    f"{chunk_prefix}_{chunk_number}",
+                    start,
+                    file_size,
+                )
+            finally:
+                buffers.put_nowait(buffer)
+
         upload_href = (
-            await self.request("POST", "pulp/api/v3/uploads/", json={"size": file_size})
+            await self.request(
+                "POST", "pulp/api/v3/uploads/", json={"size": file_size}
+            )
         )["pulp_href"]
         try:
             with open(file_path, "rb") as f:
-                for i in range(chunks):
-                    chunk = io.BytesIO(f.read(chunk_size))
-                    chunk.name = f'{file_path.strip("/").replace("/", "_")}_{i}'
-                    payload = {"file": chunk}
-                    if chunk_size >= file_size:
-                        stop = file_size - 1
-                    else:
-                        stop = start + chunk_size - 1
-                        if stop >= file_size:
-                            stop = file_size - 1
-                    headers = {"Content-Range": f"bytes {start}-{stop}/{file_size}"}
-                    await self.request(
-                        "PUT", upload_href, data=payload, headers=headers
+                start = 0
+                chunk_number = 0
+                while start < file_size:
+                    buffer = await buffers.get()
+                    # Fail fast if some of previous chunks weren't uploaded
+                    for upload in uploads:
+                        if upload.done():
+                            upload.result()
+                    if buffer is None:
+                        buffer = bytearray(chunk_size)
+                    read_bytes = await loop.run_in_executor(
+                        None, f.readinto, buffer
+                    )
+                    if not read_bytes:
+                        raise EOFError(f"{file_path} was truncated")
+                    chunk = memoryview(buffer)[:read_bytes]
+                    hasher.update(chunk)
+                    uploads.append(
+                        asyncio.create_task(
+                            upload_chunk(buffer, chunk, chunk_number, start)
+                        )
                     )
-                    start += chunk_size
+                    start += read_bytes
+                    chunk_number += 1
+            await asyncio.gather(*uploads)
         except Exception:
             logging.exception("Exception during the file upload", exc_info=True)
+            for upload in uploads:
+                upload.cancel()
+            await asyncio.gather(*uploads, return_exceptions=True)
             await self.request("DELETE", upload_href, raw=True)
-        else:
-            task = await self.request(
-                "POST", f"{upload_href}commit/", json={"sha256": sha256}
+            return None, hasher.hexdigest()
+        file_sha256 = hasher.hexdigest()
+        if sha256 and sha256 != file_sha256:
+            # Pulp rejects commits with wrong checksum, so does the client
+            await self.request("DELETE", upload_href, raw=True)
+            raise ValueError(
+                f"{file_path} checksum mismatch: "
+                f"expected {sha256}, got {file_sha256}"
             )
-            task_result = await self.wait_for_task(task["task"])
-            return task_result["created_resources"][0]
+        reference = await self.check_if_artifact_exists(file_sha256)
+        if reference:
+            await self.request("DELETE", upload_href, raw=True)
+            return reference, file_sha256
+        task = await self.request(
+            "POST",
+            f"{upload_href}commit/",
+            json={"sha256": file_sha256},
+            lane=TASK_LANE,
+        )
+        task_result = await self.wait_for_task(task["task"])
+        return task_result["created_resources"][0], file_sha256
 
     async def _upload_file(self, content, sha256):
         response = await self.request(
@@ -294,7 +575,10 @@ class PulpClient:
         headers = {"Content-Range": f"bytes 0-{len(content) - 1}/{len(content)}"}
         await self.request("PUT", upload_href, data=payload, headers=headers)
         task = await self.request(
-            "POST", f"{upload_href}commit/", json={"sha256": sha256}
+            "POST",
+            f"{upload_href}commit/",
+            json={"sha256": sha256},
+            lane=TASK_LANE,
         )
         task_result = await self.wait_for_task(task["task"])
         return task_result["created_resources"][0]
@@ -302,12 +586,17 @@ class PulpClient:
     async def upload_file(
         self, content=None, file_path: str = None, sha256: str = None
     ):
+        # Local files are hashed during the upload and checked
+        # for existing artifact before the upload commit
+        if file_path and not content and not sha256:
+            reference, sha256 = await self._upload_local_file(file_path)
+            if reference:
+                await PULP_CONTENT_CACHE.set(f"artifact:{sha256}", reference)
+            return reference, sha256
+
         # Check content already exists
-        if not sha256:
-            if content:
-                sha256 = hash_content(content)
-            elif file_path:
-                sha256 = hash_file(file_path, hash_type="sha256")
+        if not sha256 and content:
+            sha256 = hash_content(content)
 
         if not sha256:
             raise ValueError("Cannot get SHA256 checksum for the upload")
@@ -322,27 +611,31 @@ class PulpClient:
         if content:
             reference = await self._upload_file(content, sha256)
         elif file_path:
-            reference = await self._upload_local_file(file_path, sha256)
+            reference, sha256 = await self._upload_local_file(
+                file_path, sha256
+            )
         else:
             raise NotImplementedError("Other upload flows are not supported")
 
+        if reference:
+            await PULP_CONTENT_CACHE.set(f"artifact:{sha256}", reference)
         return reference, sha256
 
     async def get_repo_modules_yaml(self, url: str):
         repomd_url = urllib.parse.urljoin(url, "repodata/repomd.xml")
-        async with aiohttp.ClientSession(auth=self._auth) as session:
-            async with session.get(repomd_url) as response:
-                repomd_xml = await response.text()
-                response.raise_for_status()
-            res = re.search(r"repodata/[\w\d]+-modules.yaml", repomd_xml)
-            if not res:
-                return
-            modules_path = res.group()
-            modules_url = urllib.parse.urljoin(url, modules_path)
-            async with session.get(modules_url) as response:
-                modules_yaml = await response.text()
-                response.raise_for_status()
-                return modules_yaml
+        session = PULP_CONNECTION_POOL.session
+        async with session.get(repomd_url, auth=self._auth) as response:
+            repomd_xml = await response.text()
+            response.raise_for_status()
+        res = re.search(r"repodata/[\w\d]+-modules.yaml", repomd_xml)
+        if not res:
+            return
+        modules_path = res.group()
+        modules_url = urllib.parse.urljoin(url, modules_path)
+        async with session.get(modules_url, auth=self._auth) as response:
+            modules_yaml = await response.text()
+            response.raise_for_status()
+            return modules_yaml
 
     def begin(self):
         return self
@@ -386,6 +679,15 @@ class PulpClient:
 
     async def _modify_repository(
         self, repo_to: str, add: List[str] = None, remove: List[str] = None
+    ):
+        # Concurrent modifications of the same repository are merged
+        # into a single Pulp task and repository version
+        return await PULP_MODIFY_COALESCER.modify(
+            repo_to, self._submit_modify, add=add, remove=remove
+        )
+
+    async def _submit_modify(
+        self, repo_to: str, add: List[str] = None, remove: List[str] = None
     ):
         ENDPOINT = urllib.parse.urljoin(repo_to, "modify/")
         payload = {}
@@ -393,7 +695,9 @@ class PulpClient:
             payload["add_content_units"] = add
         if remove:
             payload["remove_content_units"] = remove
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         response = await self.wait_for_task(task["task"])
         return response
 
@@ -407,16 +711,42 @@ class PulpClient:
     async def create_file_publication(self, repository: str):
         ENDPOINT = "pulp/api/v3/publications/file/file/"
         payload = {"repository": repository}
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         await self.wait_for_task(task["task"])
 
     async def create_rpm_publication(self, repository: str):
         # Creates repodata for repositories in some way
         ENDPOINT = "pulp/api/v3/publications/rpm/rpm/"
         payload = {"repository": repository}
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         await self.wait_for_task(task["task"])
 
+    async def schedule_rpm_publication(
+        self,
+        repository: str,
+        wait: bool = True,
+    ):
+        """
+        Publishes repository once per burst of publication requests.
+        With `wait` caller is blocked until the publication which covers
+        all changes made before the call is finished, otherwise
+        the publication happens in background of the running event loop.
+        """
+        future = PULP_PUBLICATION_SCHEDULER.schedule(
+            repository, self.create_rpm_publication
+        )
+        if not wait:
+            # Errors are already logged by the scheduler
+            future.add_done_callback(
+                lambda result: result.cancelled() or result.exception()
+            )
+            return
+        await future
+
     async def create_file(
         self,
         file_name: str,
@@ -424,23 +754,39 @@ class PulpClient:
         repo: str = None,
     ) -> str:
         ENDPOINT = "pulp/api/v3/content/file/files/"
+        cache_key = f"content:{artifact_href}:{file_name}"
+        # Content creation with repository also modifies it,
+        # so we can't skip that request
+        if not repo:
+            file_href = await PULP_CONTENT_CACHE.get(cache_key)
+            if file_href:
+                return file_href
         payload = {
             "relative_path": file_name,
             "artifact": artifact_href,
         }
         if repo:
             payload["repository"] = repo
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         hrefs = [
             item for item in task_result["created_resources"] if "file/files" in item
         ]
-        return hrefs[0] if hrefs else None
+        if not hrefs:
+            return None
+        await PULP_CONTENT_CACHE.set(cache_key, hrefs[0])
+        return hrefs[0]
 
     async def create_rpm_package(
         self, package_name: str, artifact_href: str, repo: str = None
     ) -> typing.Optional[str]:
-        ENDPOINT = "pulp/api/v3/content/rpm/packages/"
+        cache_key = f"content:{artifact_href}:{package_name}"
+        if not repo:
+            package_href = await PULP_CONTENT_CACHE.get(cache_key)
+            if package_href:
+                return package_href
         artifact_info = await self.get_artifact(
             artifact_href, include_fields=["sha256"]
         )
@@ -448,14 +794,29 @@ class PulpClient:
             include_fields=["pulp_href"], sha256=artifact_info["sha256"]
         )
         if rpm_pkgs:
-            return rpm_pkgs[0]["pulp_href"]
+            package_href = rpm_pkgs[0]["pulp_href"]
+            await PULP_CONTENT_CACHE.set(cache_key, package_href)
+            return package_href
+        return await self.create_rpm_package_content(
+            package_name, artifact_href, repo=repo
+        )
+
+    async def create_rpm_package_content(
+        self, package_name: str, artifact_href: str, repo: str = None
+    ) -> typing.Optional[str]:
+        # Caller should check that package with the same checksum
+        # doesn't exist, otherwise Pulp task fails
+        ENDPOINT = "pulp/api/v3/content/rpm/packages/"
+        cache_key = f"content:{artifact_href}:{package_name}"
         payload = {
             "relative_path": package_name,
             "artifact": artifact_href,
         }
         if repo:
             payload["repository"] = repo
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         # Success case
         if task_result["state"] == "completed":
@@ -464,7 +825,10 @@ class PulpClient:
                 for item in task_result["created_resources"]
                 if "rpm/packages" in item
             ]
-            return hrefs[0] if hrefs else None
+            if not hrefs:
+                return None
+            await PULP_CONTENT_CACHE.set(cache_key, hrefs[0])
+            return hrefs[0]
         return None
 
     async def get_files(
@@ -493,7 +857,9 @@ class PulpClient:
             "name": f"{name}-distro",
             "base_path": f"{base_path_start}/{name}",
         }
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         distro = await self.get_distro(task_result["created_resources"][0])
         return distro["base_url"]
@@ -515,7 +881,9 @@ class PulpClient:
             "name": f"{name}-distro",
             "base_path": f"{base_path_start}/{name}",
         }
-        task = await self.request("POST", ENDPOINT, json=payload)
+        task = await self.request(
+            "POST", ENDPOINT, json=payload, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(task["task"])
         distro = await self.get_distro(task_result["created_resources"][0])
         return distro["base_url"]
@@ -621,7 +989,7 @@ class PulpClient:
         )
 
     async def delete_by_href(self, href: str, wait_for_result: bool = False):
-        task = await self.request("DELETE", href)
+        task = await self.request("DELETE", href, lane=TASK_LANE)
         if wait_for_result:
             result = await self.wait_for_task(task["task"])
             return result
@@ -667,7 +1035,9 @@ class PulpClient:
         """
         endpoint = f"{repo_href}sync/"
         payload = {"remote": remote_href, "sync_policy": sync_policy}
-        task = await self.request("POST", endpoint, json=payload)
+        task = await self.request(
+            "POST", endpoint, json=payload, lane=TASK_LANE
+        )
         if wait_for_result:
             result = await self.wait_for_task(task["task"])
             return result
@@ -712,12 +1082,16 @@ class PulpClient:
         fse_method: str = "hardlink",
     ):
         params = {"name": fse_name, "path": fse_path, "method": fse_method}
-        update_task = await self.request("PUT", fse_pulp_href, data=params)
+        update_task = await self.request(
+            "PUT", fse_pulp_href, data=params, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(update_task["task"])
         return task_result
 
     async def delete_filesystem_exporter(self, fse_pulp_href: str):
-        delete_task = await self.request("DELETE", fse_pulp_href)
+        delete_task = await self.request(
+            "DELETE", fse_pulp_href, lane=TASK_LANE
+        )
         task_result = await self.wait_for_task(delete_task["task"])
         return task_result
 
@@ -737,7 +1111,9 @@ class PulpClient:
     ):
         endpoint = urllib.parse.urljoin(fse_pulp_href, "exports/")
         params = {"repository_version": fse_repository_version}
-        fse_task = await self.request("POST", endpoint, json=params)
+        fse_task = await self.request(
+            "POST", endpoint, json=params, lane=TASK_LANE
+        )
         await self.wait_for_task(fse_task["task"])
         return fse_repository_version
 
@@ -799,15 +1175,19 @@ class PulpClient:
             entity_href = await self.create_rpm_package(artifact.name, artifact.href)
         else:
             entity_href = await self.create_file(artifact.name, artifact.href)
-        info = await self.get_artifact(entity_href, include_fields=["sha256"])
-        return entity_href, info["sha256"], artifact
+        cache_key = f"sha256:{entity_href}"
+        sha256 = await PULP_CONTENT_CACHE.get(cache_key)
+        if not sha256:
+            info = await self.get_artifact(entity_href, include_fields=["sha256"])
+            sha256 = info["sha256"]
+            await PULP_CONTENT_CACHE.set(cache_key, sha256)
+        return entity_href, sha256, artifact
 
     async def wait_for_task(self, task_href: str):
-        task = await self.request("GET", task_href)
-        while task["state"] not in ("failed", "completed"):
-            await asyncio.sleep(5)
-            task = await self.request("GET", task_href)
-        if task["state"] == "failed":
+        task = await get_pulp_task_watcher(self._host).wait(
+            task_href, self.request
+        )
+        if task["state"] in ("failed", "canceled"):
             error = task.get("error")
             error_msg = ""
             if error:
@@ -835,15 +1215,56 @@ class PulpClient:
             "file": io.StringIO(json.dumps(record)),
             "repository": repo_href,
         }
-        task = await self.request("POST", endpoint, data=payload)
+        task = await self.request(
+            "POST", endpoint, data=payload, lane=TASK_LANE
+        )
         response = await self.wait_for_task(task["task"])
         return response
 
-    async def add_errata_records(self, records: List[dict], repo_href: str):
-        tasks = []
-        for record in records:
-            tasks.append(self.add_errata_record(record, repo_href))
-        await asyncio.gather(*tasks)
+    async def create_errata_record(self, record: dict) -> str:
+        # Advisory isn't added into a repository here, so Pulp doesn't
+        # lock the repository and create a new version for every record
+        endpoint = "pulp/api/v3/content/rpm/advisories/"
+        payload = {"file": io.StringIO(json.dumps(record))}
+        task = await self.request(
+            "POST", endpoint, data=payload, lane=TASK_LANE
+        )
+        response = await self.wait_for_task(task["task"])
+        return next(
+            href
+            for href in response["created_resources"]
+            if "/advisories/" in href
+        )
+
+    async def add_errata_records(
+        self,
+        records: List[dict],
+        repo_href: str,
+    ) -> Dict[str, str]:
+        """
+        Uploads advisories and adds all of them into the repository
+        by a single modification.
+        Returns errors of the records that weren't added by record id.
+        """
+        results = await asyncio.gather(
+            *(self.create_errata_record(record) for record in records),
+            return_exceptions=True,
+        )
+        errors = {}
+        advisory_hrefs = []
+        for record, result in zip(records, results):
+            if isinstance(result, Exception):
+                errors[record["id"]] = str(result)
+                continue
+            advisory_hrefs.append(result)
+        if not advisory_hrefs:
+            return errors
+        try:
+            await self.modify_repository(repo_href, add=advisory_hrefs)
+        except Exception as exc:
+            for record in records:
+                errors.setdefault(record["id"], str(exc))
+        return errors
 
     async def request(
         self,
@@ -855,27 +1276,27 @@ class PulpClient:
         data: dict = None,
         headers: dict = None,
         raw: bool = False,
+        lane: typing.Optional[str] = None,
     ) -> dict:
         if pure_url:
             full_url = endpoint
         else:
             full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with PULP_SEMAPHORE:
+        if lane is None:
+            lane = READ_LANE if method.lower() == "get" else WRITE_LANE
+        async with PULP_SCHEDULER.slot(lane, priority=self._priority):
             if method.lower() == "get":
-                async with RetryClient(retry_options=self._retry_options) as client:
-                    response = await client.get(
-                        full_url,
-                        params=params,
-                        json=json,
-                        data=data,
-                        headers=headers,
-                        auth=self._auth,
-                    )
-                    if raw:
-                        return {"result": await response.text()}
-                    response_json = await response.json()
+                request_context = PULP_CONNECTION_POOL.retry_client.get(
+                    full_url,
+                    retry_options=self._retry_options,
+                    params=params,
+                    json=json,
+                    data=data,
+                    headers=headers,
+                    auth=self._auth,
+                )
             else:
-                async with aiohttp.request(
+                request_context = PULP_CONNECTION_POOL.session.request(
                     method,
                     full_url,
                     params=params,
@@ -883,10 +1304,11 @@ class PulpClient:
                     data=data,
                     headers=headers,
                     auth=self._auth,
-                ) as response:
-                    if raw:
-                        return {"result": await response.text()}
-                    response_json = await response.json()
+                )
+            async with request_context as response:
+                if raw:
+                    return {"result": await response.text()}
+                response_json = await response.json()
 
             try:
                 response.raise_for_status()
@@ -0,0 +1,115 @@
+import asyncio
+import typing
+
+from alws.config import settings
+from alws.errors import ArtifactConversionError
+from alws.utils.pulp_client import PULP_CONTENT_CACHE, PulpClient
+from alws.utils.pulp_utils import (
+    get_artifacts_sha256_async,
+    get_rpm_packages_by_checksums_async,
+    get_uuid_from_pulp_href,
+)
+
+
+__all__ = ['PulpContentConverter']
+
+
+ConvertedArtifact = typing.Tuple[str, str, typing.Any]
+
+
+class PulpContentConverter:
+    """
+    Bulk version of `PulpClient.create_entity` for build artifacts.
+
+    Checksums of all uploaded artifacts and already existing RPM packages
+    are read from Pulp database in one query each, only missing content
+    is created through Pulp API, `batch_size` creations at a time.
+    Content shares the checksum of the artifact it's created from,
+    so results can be verified against checksums sent by build node.
+    """
+
+    def __init__(
+        self,
+        pulp_client: PulpClient,
+        batch_size: int = settings.pulp_content_creation_batch_size,
+    ):
+        self._pulp_client = pulp_client
+        self._batch_size = batch_size
+        self.stats = {'cached': 0, 'existing': 0, 'created': 0}
+
+    async def _get_cached_hrefs(
+        self,
+        artifacts: list,
+    ) -> typing.Dict[int, str]:
+        cached = await asyncio.gather(*(
+            PULP_CONTENT_CACHE.get(f'content:{artifact.href}:{artifact.name}')
+            for artifact in artifacts
+        ))
+        return {i: href for i, href in enumerate(cached) if href}
+
+    async def _create_content(self, artifact) -> typing.Optional[str]:
+        if artifact.type == 'rpm':
+            return await self._pulp_client.create_rpm_package_content(
+                artifact.name, artifact.href
+            )
+        return await self._pulp_client.create_file(
+            artifact.name, artifact.href
+        )
+
+    async def convert(self, artifacts: list) -> typing.List[ConvertedArtifact]:
+        """
+        Returns (content href, sha256, artifact) for every artifact
+        in the same order, like `PulpClient.create_entity` does.
+        """
+        if not artifacts:
+            return []
+        artifacts_sha256 = await get_artifacts_sha256_async(
+            list({get_uuid_from_pulp_href(item.href) for item in artifacts})
+        )
+        sha256s = []
+        for artifact in artifacts:
+            artifact_id = get_uuid_from_pulp_href(artifact.href)
+            sha256 = artifacts_sha256.get(artifact_id)
+            if sha256 is None:
+                raise ArtifactConversionError(
+                    f'Artifact {artifact.href} for {artifact.name} is missing'
+                )
+            sha256s.append(sha256)
+        hrefs = await self._get_cached_hrefs(artifacts)
+        self.stats['cached'] += len(hrefs)
+        missing_rpms = [
+            i for i, artifact in enumerate(artifacts)
+            if i not in hrefs and artifact.type == 'rpm'
+        ]
+        if missing_rpms:
+            existing_packages = await get_rpm_packages_by_checksums_async(
+                list({sha256s[i] for i in missing_rpms})
+            )
+            for i in missing_rpms:
+                package = existing_packages.get(sha256s[i])
+                if package is None:
+                    continue
+                hrefs[i] = package.pulp_href
+                self.stats['existing'] += 1
+                artifact = artifacts[i]
+                await PULP_CONTENT_CACHE.set(
+                    f'content:{artifact.href}:{artifact.name}',
+                    package.pulp_href,
+                )
+        to_create = [i for i in range(len(artifacts)) if i not in hrefs]
+        for start in range(0, len(to_create), self._batch_size):
+            batch = to_create[start:start + self._batch_size]
+            created = await asyncio.gather(*(
+                self._create_content(artifacts[i]) for i in batch
+            ))
+            for i, href in zip(batch, created):
+                if href is None:
+                    raise ArtifactConversionError(
+                        f'Cannot create content for {artifacts[i].name}'
+                    )
+                hrefs[i] = href
+            self.stats['created'] += len(batch)
+        return [
+            (hrefs[i], sha256s[i], artifact)
+            for i, artifact in enumerate(artifacts)
+        ]
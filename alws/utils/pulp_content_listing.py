@@ -0,0 +1,392 @@
+import re
+import typing
+import urllib.parse
+import uuid
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
+
+from alws.dependencies import get_async_pulp_db
+from alws.pulp_models import (
+    CoreArtifact,
+    CoreContent,
+    CoreContentArtifact,
+    CoreRepositoryContent,
+    CoreRepositoryVersion,
+    RpmPackage,
+)
+
+
+__all__ = ['PulpContentListing']
+
+
+PRESENT = 'present'
+ADDED = 'added'
+REMOVED = 'removed'
+
+CONTENT_API_PREFIX = '/pulp/api/v3/content/'
+ARTIFACT_API_PREFIX = '/pulp/api/v3/artifacts/'
+
+# REST API content endpoint -> pulp type of the content
+CONTENT_TYPES = {
+    'rpm/packages': 'rpm.package',
+    'rpm/modulemds': 'rpm.modulemd',
+    'rpm/modulemd_defaults': 'rpm.modulemd_defaults',
+    'rpm/advisories': 'rpm.advisory',
+    'rpm/packagegroups': 'rpm.packagegroup',
+    'rpm/packagecategories': 'rpm.packagecategory',
+    'rpm/packageenvironments': 'rpm.packageenvironment',
+    'rpm/packagelangpacks': 'rpm.packagelangpacks',
+    'rpm/repo_metadata_files': 'rpm.repo_metadata_file',
+    'file/files': 'file.file',
+}
+
+# REST API field of RPM package -> database column
+RPM_PACKAGE_FIELDS = {
+    'pulp_href': RpmPackage.content_ptr_id,
+    'pulp_created': CoreContent.pulp_created,
+    'artifact': CoreContentArtifact.artifact_id,
+    # pkgId follows checksum_type, artifact digest is always sha256
+    'sha256': CoreArtifact.sha256,
+    'checksum_type': RpmPackage.checksum_type,
+    'name': RpmPackage.name,
+    'epoch': RpmPackage.epoch,
+    'version': RpmPackage.version,
+    'release': RpmPackage.release,
+    'arch': RpmPackage.arch,
+    'summary': RpmPackage.summary,
+    'description': RpmPackage.description,
+    'url': RpmPackage.url,
+    'location_base': RpmPackage.location_base,
+    'location_href': RpmPackage.location_href,
+    'rpm_buildhost': RpmPackage.rpm_buildhost,
+    'rpm_group': RpmPackage.rpm_group,
+    'rpm_license': RpmPackage.rpm_license,
+    'rpm_packager': RpmPackage.rpm_packager,
+    'rpm_sourcerpm': RpmPackage.rpm_sourcerpm,
+    'rpm_vendor': RpmPackage.rpm_vendor,
+    'rpm_header_start': RpmPackage.rpm_header_start,
+    'rpm_header_end': RpmPackage.rpm_header_end,
+    'is_modular': RpmPackage.is_modular,
+    'size_archive': RpmPackage.size_archive,
+    'size_installed': RpmPackage.size_installed,
+    'size_package': RpmPackage.size_package,
+    'time_build': RpmPackage.time_build,
+    'time_file': RpmPackage.time_file,
+}
+
+REPO_HREF_REGEX = re.compile(
+    r'/repositories/[^/]+/[^/]+/(?P<repo_id>[0-9a-f-]{36})/'
+    r'(versions/(?P<number>\d+)/)?$'
+)
+
+
+def parse_repository_href(
+    href: str,
+) -> typing.Tuple[uuid.UUID, typing.Optional[int]]:
+    """
+    Returns repository id and version number from repository
+    or repository version href, number is None for repository href.
+    """
+    result = REPO_HREF_REGEX.search(href)
+    if not result:
+        raise ValueError(f'Cannot parse repository href: {href}')
+    number = result.group('number')
+    return (
+        uuid.UUID(result.group('repo_id')),
+        int(number) if number is not None else None,
+    )
+
+
+def _normalize_fields(
+    fields: typing.Optional[typing.Union[str, typing.Iterable[str]]],
+) -> typing.List[str]:
+    if fields is None:
+        return []
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [field.strip() for field in fields if field.strip()]
+
+
+class PulpContentListing:
+    """
+    Lists repository content directly from Pulp database
+    instead of paging through Pulp REST API.
+
+    Methods mirror the corresponding `PulpClient` ones and return
+    the same dicts (with the requested fields only), so callers
+    can switch per call site. Rows are fetched from the server-side
+    cursor by `batch_size`, use `iter_package_rows` to get compact
+    tuples without building dicts at all.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self._batch_size = batch_size
+
+    @staticmethod
+    def _scope_to_repository(
+        query,
+        content_id,
+        repo_href: str,
+        relation: str = PRESENT,
+    ):
+        repo_id, number = parse_repository_href(repo_href)
+        query = query.join(
+            CoreRepositoryContent,
+            CoreRepositoryContent.content_id == content_id,
+        ).where(CoreRepositoryContent.repository_id == repo_id)
+        if number is None:
+            if relation != PRESENT:
+                raise ValueError(
+                    f'Repository version is required for {relation} content'
+                )
+            return query.where(
+                CoreRepositoryContent.version_removed_id.is_(None),
+            )
+        if relation in (ADDED, REMOVED):
+            version_id = (
+                select(CoreRepositoryVersion.pulp_id)
+                .where(
+                    CoreRepositoryVersion.repository_id == repo_id,
+                    CoreRepositoryVersion.number == number,
+                )
+                .scalar_subquery()
+            )
+            column = (
+                CoreRepositoryContent.version_added_id
+                if relation == ADDED
+                else CoreRepositoryContent.version_removed_id
+            )
+            return query.where(column == version_id)
+        added = aliased(CoreRepositoryVersion)
+        removed = aliased(CoreRepositoryVersion)
+        return (
+            query.join(
+                added,
+                CoreRepositoryContent.version_added_id == added.pulp_id,
+            )
+            .outerjoin(
+                removed,
+                CoreRepositoryContent.version_removed_id == removed.pulp_id,
+            )
+            .where(
+                added.number <= number,
+                or_(removed.pulp_id.is_(None), removed.number > number),
+            )
+        )
+
+    @staticmethod
+    def _package_conditions(search_params: dict) -> list:
+        conditions = []
+        for param, value in search_params.items():
+            field, _, lookup = param.partition('__')
+            column = RPM_PACKAGE_FIELDS.get(field)
+            if column is None or lookup not in ('', 'in'):
+                raise ValueError(f'Unsupported search parameter: {param}')
+            if lookup == 'in':
+                if isinstance(value, str):
+                    value = value.split(',')
+                conditions.append(column.in_(list(value)))
+            else:
+                conditions.append(column == value)
+        return conditions
+
+    @staticmethod
+    def _format_value(field: str, value: typing.Any) -> typing.Any:
+        if value is None:
+            return value
+        if field == 'pulp_href':
+            return f'{CONTENT_API_PREFIX}rpm/packages/{value}/'
+        if field == 'artifact':
+            return f'{ARTIFACT_API_PREFIX}{value}/'
+        return value
+
+    def _packages_query(
+        self,
+        repo_href: str,
+        fields: typing.List[str],
+        relation: str = PRESENT,
+        search_params: typing.Optional[dict] = None,
+    ):
+        unknown_fields = set(fields).difference(RPM_PACKAGE_FIELDS)
+        if unknown_fields:
+            raise ValueError(f'Unsupported fields: {sorted(unknown_fields)}')
+        query = select(
+            *(RPM_PACKAGE_FIELDS[field] for field in fields)
+        ).select_from(RpmPackage)
+        if 'pulp_created' in fields:
+            query = query.join(
+                CoreContent,
+                CoreContent.pulp_id == RpmPackage.content_ptr_id,
+            )
+        used_fields = set(fields).union(
+            param.partition('__')[0] for param in search_params or {}
+        )
+        if used_fields.intersection(('artifact', 'sha256')):
+            query = query.outerjoin(
+                CoreContentArtifact,
+                CoreContentArtifact.content_id == RpmPackage.content_ptr_id,
+            )
+        if 'sha256' in used_fields:
+            query = query.outerjoin(
+                CoreArtifact,
+                CoreArtifact.pulp_id == CoreContentArtifact.artifact_id,
+            )
+        query = self._scope_to_repository(
+            query, RpmPackage.content_ptr_id, repo_href, relation=relation
+        )
+        conditions = self._package_conditions(search_params or {})
+        if conditions:
+            query = query.where(and_(*conditions))
+        return query.execution_options(yield_per=self._batch_size)
+
+    async def iter_package_rows(
+        self,
+        repo_href: str,
+        fields: typing.List[str],
+        relation: str = PRESENT,
+        search_params: typing.Optional[dict] = None,
+    ) -> typing.AsyncIterator[tuple]:
+        """
+        Yields tuples with raw values of the requested fields
+        (UUIDs for `pulp_href` and `artifact`) for RPM packages
+        which are present in, added to or removed from
+        the repository (version) depending on `relation`.
+        """
+        query = self._packages_query(
+            repo_href, fields, relation=relation, search_params=search_params
+        )
+        async with get_async_pulp_db() as pulp_db:
+            result = await pulp_db.stream(query)
+            async for row in result:
+                yield tuple(row)
+
+    async def iter_packages(
+        self,
+        repo_href: str,
+        fields: typing.Optional[typing.List[str]] = None,
+        relation: str = PRESENT,
+        search_params: typing.Optional[dict] = None,
+    ) -> typing.AsyncIterator[typing.Dict[str, typing.Any]]:
+        fields = fields or list(RPM_PACKAGE_FIELDS)
+        async for row in self.iter_package_rows(
+            repo_href, fields, relation=relation, search_params=search_params
+        ):
+            yield {
+                field: self._format_value(field, value)
+                for field, value in zip(fields, row)
+            }
+
+    async def get_rpm_repository_packages(
+        self,
+        repository_href: str,
+        include_fields: typing.Optional[typing.List[str]] = None,
+        exclude_fields: typing.Optional[typing.List[str]] = None,
+        **search_params,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        fields = _normalize_fields(include_fields) or list(RPM_PACKAGE_FIELDS)
+        excluded = set(_normalize_fields(exclude_fields))
+        fields = [field for field in fields if field not in excluded]
+        return [
+            pkg
+            async for pkg in self.iter_packages(
+                repository_href, fields=fields, search_params=search_params
+            )
+        ]
+
+    async def iter_repo_packages(
+        self,
+        version_href: str,
+        limit: int = 1000,
+        fields=None,
+        search_params: dict = None,
+    ) -> typing.AsyncIterator[typing.Dict[str, typing.Any]]:
+        # `limit` is a page size of REST API, it's kept for compatibility
+        async for pkg in self.iter_packages(
+            version_href,
+            fields=_normalize_fields(fields),
+            search_params=search_params,
+        ):
+            yield pkg
+
+    async def iter_content_hrefs(
+        self,
+        repo_href: str,
+        pulp_type: str,
+        relation: str = PRESENT,
+    ) -> typing.AsyncIterator[str]:
+        endpoint = next(
+            (
+                endpoint
+                for endpoint, content_type in CONTENT_TYPES.items()
+                if content_type == pulp_type
+            ),
+            None,
+        )
+        if endpoint is None:
+            raise ValueError(f'Unsupported content type: {pulp_type}')
+        query = (
+            select(CoreContent.pulp_id)
+            .where(CoreContent.pulp_type == pulp_type)
+            .execution_options(yield_per=self._batch_size)
+        )
+        query = self._scope_to_repository(
+            query, CoreContent.pulp_id, repo_href, relation=relation
+        )
+        async with get_async_pulp_db() as pulp_db:
+            result = await pulp_db.stream_scalars(query)
+            async for content_id in result:
+                yield f'{CONTENT_API_PREFIX}{endpoint}/{content_id}/'
+
+    async def get_repo_modules(self, repo_href: str) -> typing.List[str]:
+        return [
+            href
+            async for href in self.iter_content_hrefs(
+                repo_href, 'rpm.modulemd'
+            )
+        ]
+
+    async def iter_repo(
+        self,
+        content_href: str,
+    ) -> typing.AsyncIterator[typing.Dict[str, typing.Any]]:
+        """
+        Replacement for paging through content listing hrefs like
+        `/pulp/api/v3/content/rpm/packages/?repository_version=...`
+        (as returned in repository version content summary).
+        Only `pulp_href` is returned for content other than RPM packages.
+        """
+        parsed_url = urllib.parse.urlsplit(content_href)
+        endpoint = parsed_url.path.replace(CONTENT_API_PREFIX, '').strip('/')
+        pulp_type = CONTENT_TYPES.get(endpoint)
+        if pulp_type is None:
+            raise ValueError(f'Unsupported content href: {content_href}')
+        params = dict(urllib.parse.parse_qsl(parsed_url.query))
+        relation, version_href = next(
+            (
+                (relation, params[f'repository_version{suffix}'])
+                for relation, suffix in (
+                    (PRESENT, ''),
+                    (ADDED, '_added'),
+                    (REMOVED, '_removed'),
+                )
+                if f'repository_version{suffix}' in params
+            ),
+            (None, None),
+        )
+        if version_href is None:
+            raise ValueError(
+                f'Repository version is missing in {content_href}'
+            )
+        if pulp_type == 'rpm.package':
+            async for pkg in self.iter_packages(
+                version_href,
+                fields=_normalize_fields(params.get('fields')),
+                relation=relation,
+            ):
+                yield pkg
+            return
+        async for href in self.iter_content_hrefs(
+            version_href, pulp_type, relation=relation
+        ):
+            yield {'pulp_href': href}
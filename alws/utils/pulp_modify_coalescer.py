@@ -0,0 +1,132 @@
+import asyncio
+import typing
+
+
+__all__ = ['PulpModifyCoalescer']
+
+
+ModifyFunc = typing.Callable[
+    [str, typing.List[str], typing.List[str]],
+    typing.Awaitable[dict],
+]
+
+
+class _ModifyBatch:
+    def __init__(self, modify: ModifyFunc):
+        self.modify = modify
+        self.add: typing.Set[str] = set()
+        self.remove: typing.Set[str] = set()
+        self.futures: typing.List[asyncio.Future] = []
+        self.timer: typing.Optional[asyncio.TimerHandle] = None
+
+    def conflicts_with(
+        self,
+        add: typing.Iterable[str],
+        remove: typing.Iterable[str],
+    ) -> bool:
+        # Pulp applies removals before additions inside one modify call,
+        # so opposite operations on the same unit can't be merged
+        # without changing the final repository content
+        return bool(self.add.intersection(remove)) or bool(
+            self.remove.intersection(add)
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.add) + len(self.remove)
+
+
+class PulpModifyCoalescer:
+    """
+    Merges repository modifications coming from concurrent callers
+    within `window` seconds into a single Pulp modify call
+    (and a single new repository version).
+    Every caller receives the result of the merged task.
+    """
+
+    def __init__(self, window: float = 0.5, max_units: int = 5000):
+        self._window = window
+        self._max_units = max_units
+        self._batches: typing.Dict[str, _ModifyBatch] = {}
+        self._running: typing.Dict[str, asyncio.Task] = {}
+        self._loop = None
+        self.stats = {'requests': 0, 'modifications': 0}
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._batches = {}
+            self._running = {}
+            self._loop = loop
+
+    async def modify(
+        self,
+        repo_href: str,
+        modify: ModifyFunc,
+        add: typing.Optional[typing.List[str]] = None,
+        remove: typing.Optional[typing.List[str]] = None,
+    ) -> dict:
+        self.stats['requests'] += 1
+        if self._window <= 0:
+            self.stats['modifications'] += 1
+            return await modify(repo_href, add, remove)
+        self._ensure_loop()
+        add = add or []
+        remove = remove or []
+        batch = self._batches.get(repo_href)
+        if batch and batch.conflicts_with(add, remove):
+            self._flush(repo_href)
+            batch = None
+        if batch is None:
+            batch = _ModifyBatch(modify)
+            batch.timer = self._loop.call_later(
+                self._window, self._flush, repo_href
+            )
+            self._batches[repo_href] = batch
+        batch.add.update(add)
+        batch.remove.update(remove)
+        future = self._loop.create_future()
+        batch.futures.append(future)
+        if batch.size >= self._max_units:
+            self._flush(repo_href)
+        return await future
+
+    def _flush(self, repo_href: str):
+        batch = self._batches.pop(repo_href, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        self.stats['modifications'] += 1
+        previous = self._running.get(repo_href)
+        task = self._loop.create_task(self._run(repo_href, batch, previous))
+        self._running[repo_href] = task
+        task.add_done_callback(
+            lambda finished: self._forget(repo_href, finished)
+        )
+
+    def _forget(self, repo_href: str, task: asyncio.Task):
+        if self._running.get(repo_href) is task:
+            self._running.pop(repo_href)
+
+    @staticmethod
+    async def _run(
+        repo_href: str,
+        batch: _ModifyBatch,
+        previous: typing.Optional[asyncio.Task],
+    ):
+        # Keep the order of modifications of the same repository
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            result = await batch.modify(
+                repo_href, list(batch.add), list(batch.remove)
+            )
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_result(result)
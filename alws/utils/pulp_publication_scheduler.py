@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+import typing
+
+
+__all__ = ['PulpPublicationScheduler']
+
+
+PublishFunc = typing.Callable[[str], typing.Awaitable[typing.Any]]
+
+
+class _PendingPublication:
+    def __init__(self, publish: PublishFunc):
+        self.publish = publish
+        self.created_at = time.monotonic()
+        self.futures: typing.List[asyncio.Future] = []
+        self.timer: typing.Optional[asyncio.TimerHandle] = None
+        # Quiet period is over, waiting for the running publication
+        self.ready = False
+
+
+class PulpPublicationScheduler:
+    """
+    Debounces repository publications: requests for the same repository
+    are collapsed while they keep coming within `quiet_period` seconds
+    (but no longer than `max_delay` seconds since the first request),
+    so repository metadata is generated once per burst of modifications.
+
+    Publication always starts after the request was made, so once the
+    returned future is resolved, the publication covers caller's changes.
+    """
+
+    def __init__(self, quiet_period: float = 2.0, max_delay: float = 30.0):
+        self._quiet_period = quiet_period
+        self._max_delay = max_delay
+        self._pending: typing.Dict[str, _PendingPublication] = {}
+        self._running: typing.Dict[str, asyncio.Task] = {}
+        self._loop = None
+        self.stats = {'requests': 0, 'publications': 0}
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._pending = {}
+            self._running = {}
+            self._loop = loop
+
+    def schedule(
+        self,
+        repo_href: str,
+        publish: PublishFunc,
+    ) -> asyncio.Future:
+        self.stats['requests'] += 1
+        self._ensure_loop()
+        future = self._loop.create_future()
+        pending = self._pending.get(repo_href)
+        if pending is None:
+            pending = _PendingPublication(publish)
+            self._pending[repo_href] = pending
+        pending.futures.append(future)
+        if pending.ready:
+            return future
+        if pending.timer:
+            pending.timer.cancel()
+        delay = min(
+            self._quiet_period,
+            max(pending.created_at + self._max_delay - time.monotonic(), 0),
+        )
+        pending.timer = self._loop.call_later(
+            delay, self._start, repo_href
+        )
+        return future
+
+    def _start(self, repo_href: str):
+        pending = self._pending.get(repo_href)
+        if pending is None:
+            return
+        # Publication that is already running could miss caller's
+        # changes, so requests made meanwhile are collapsed
+        # into the next one
+        if repo_href in self._running:
+            pending.ready = True
+            return
+        self._pending.pop(repo_href)
+        self.stats['publications'] += 1
+        task = self._loop.create_task(self._run(repo_href, pending))
+        self._running[repo_href] = task
+        task.add_done_callback(
+            lambda finished: self._finish(repo_href, finished)
+        )
+
+    def _finish(self, repo_href: str, task: asyncio.Task):
+        if self._running.get(repo_href) is not task:
+            return
+        self._running.pop(repo_href)
+        pending = self._pending.get(repo_href)
+        if pending is not None and pending.ready:
+            self._start(repo_href)
+
+    @staticmethod
+    async def _run(repo_href: str, pending: _PendingPublication):
+        try:
+            result = await pending.publish(repo_href)
+        except Exception as exc:
+            logging.exception('Cannot publish repository %s', repo_href)
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future in pending.futures:
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import typing
+import uuid
+
+import aioredis
+
+from alws.config import settings
+from alws.utils.pulp_client import PulpClient
+
+
+__all__ = ['PulpRepositoryPool', 'PULP_REPO_POOL']
+
+
+# Kinds of build repositories: (Pulp repository type, base path start)
+REPO_KINDS = {
+    'rpm': ('rpm', 'builds'),
+    'build_log': ('file', 'build_logs'),
+    'test_log': ('file', 'test_logs'),
+}
+
+
+class PulpRepositoryPool:
+    """
+    Keeps up to `size` ready-made Pulp repositories of every kind
+    (repository, publication and distribution are already created),
+    so a new build takes them instead of waiting for Pulp tasks.
+
+    Pool is stored in Redis lists shared by all processes, it's disabled
+    without `redis_url` or with zero `size`. Distribution of a claimed
+    repository keeps its base path, so repository URL is known right away,
+    and the repository is renamed for the build afterwards.
+    Repositories claimed by builds which failed to start are released
+    back, failed renames are scheduled and retried by `run`.
+    `run` refills the pool in background, only one process refills it
+    at a time. Current pool depth is kept in `stats`.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        refill_interval: float = 10.0,
+        concurrency: int = 4,
+        redis_url: typing.Optional[str] = None,
+        key_prefix: str = 'pulp_repo_pool',
+    ):
+        self._size = size
+        self._refill_interval = refill_interval
+        self._concurrency = concurrency
+        self._redis_url = redis_url
+        self._key_prefix = key_prefix
+        self._redis = None
+        self._loop = None
+        self.stats = {
+            'claimed': 0,
+            'empty': 0,
+            'created': 0,
+            'released': 0,
+            'renamed': 0,
+            'depth': {kind: 0 for kind in REPO_KINDS},
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._size and self._redis_url)
+
+    def _get_redis(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(self._redis_url)
+            self._loop = loop
+        return self._redis
+
+    def _get_key(self, kind: str) -> str:
+        return f'{self._key_prefix}:{kind}'
+
+    async def claim(self, kind: str) -> typing.Optional[dict]:
+        """
+        Returns name, url and pulp_href of a pooled repository
+        or None if there are no repositories of that kind in the pool.
+        """
+        if not self.enabled:
+            return None
+        try:
+            entry = await self._get_redis().lpop(self._get_key(kind))
+        except Exception:
+            logging.exception('Cannot claim %s repository from pool', kind)
+            return None
+        if entry is None:
+            self.stats['empty'] += 1
+            return None
+        self.stats['claimed'] += 1
+        return json.loads(entry)
+
+    async def release(self, kind: str, entry: dict):
+        """
+        Returns an unmodified claimed repository to the pool.
+        """
+        try:
+            await self._get_redis().lpush(
+                self._get_key(kind), json.dumps(entry))
+        except Exception:
+            logging.exception(
+                'Cannot release %s repository %s', kind, entry['name'])
+            return
+        self.stats['released'] += 1
+
+    async def schedule_rename(
+        self,
+        entry: dict,
+        new_name: str,
+        repo_type: str,
+    ):
+        rename = {
+            'pulp_href': entry['pulp_href'],
+            'name': entry['name'],
+            'new_name': new_name,
+            'repo_type': repo_type,
+        }
+        try:
+            await self._get_redis().rpush(
+                self._get_key('renames'), json.dumps(rename))
+        except Exception:
+            logging.exception(
+                'Cannot schedule rename of repository %s to %s',
+                entry['name'], new_name,
+            )
+
+    async def retry_renames(self, pulp_client: PulpClient) -> int:
+        redis = self._get_redis()
+        key = self._get_key('renames')
+        failed = []
+        renamed = 0
+        for _ in range(await redis.llen(key)):
+            rename = await redis.lpop(key)
+            if rename is None:
+                break
+            rename = json.loads(rename)
+            try:
+                await pulp_client.rename_repository(
+                    rename['pulp_href'],
+                    rename['name'],
+                    rename['new_name'],
+                    repo_type=rename['repo_type'],
+                )
+            except Exception as e:
+                logging.error(
+                    'Cannot rename pooled repository %s to %s: %s',
+                    rename['name'], rename['new_name'], e,
+                )
+                failed.append(rename)
+                continue
+            renamed += 1
+        for rename in failed:
+            await redis.rpush(key, json.dumps(rename))
+        self.stats['renamed'] += renamed
+        return renamed
+
+    async def get_depth(self) -> typing.Dict[str, int]:
+        redis = self._get_redis()
+        depth = {
+            kind: await redis.llen(self._get_key(kind))
+            for kind in REPO_KINDS
+        }
+        self.stats['depth'] = depth
+        return depth
+
+    async def _create(self, pulp_client: PulpClient, kind: str) -> dict:
+        repo_type, base_path_start = REPO_KINDS[kind]
+        name = f'pool-{kind.replace("_", "-")}-{uuid.uuid4().hex}'
+        if repo_type == 'rpm':
+            url, pulp_href = await pulp_client.create_rpm_repository(
+                name,
+                auto_publish=True,
+                create_publication=True,
+                base_path_start=base_path_start,
+            )
+        else:
+            url, pulp_href = await pulp_client.create_log_repo(
+                name, distro_path_start=base_path_start
+            )
+        return {'name': name, 'url': url, 'pulp_href': pulp_href}
+
+    async def refill(self, pulp_client: PulpClient) -> int:
+        redis = self._get_redis()
+        lock_key = f'{self._key_prefix}:refill_lock'
+        if not await redis.set(lock_key, '1', nx=True, ex=600):
+            return 0
+        created = 0
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def create(kind: str):
+            nonlocal created
+            async with semaphore:
+                entry = await self._create(pulp_client, kind)
+            await redis.rpush(self._get_key(kind), json.dumps(entry))
+            created += 1
+
+        try:
+            depth = await self.get_depth()
+            results = await asyncio.gather(
+                *(
+                    create(kind)
+                    for kind in REPO_KINDS
+                    for _ in range(self._size - depth[kind])
+                ),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logging.error(
+                        'Cannot create pooled repository: %s', result
+                    )
+        finally:
+            await redis.delete(lock_key)
+        self.stats['created'] += created
+        depth = await self.get_depth()
+        if created:
+            logging.info('Pulp repository pool depth: %s', depth)
+        return created
+
+    async def run(self):
+        pulp_client = PulpClient(
+            settings.pulp_host,
+            settings.pulp_user,
+            settings.pulp_password,
+            priority=settings.pulp_bulk_requests_priority,
+        )
+        while True:
+            try:
+                await self.retry_renames(pulp_client)
+                await self.refill(pulp_client)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot refill Pulp repository pool')
+            await asyncio.sleep(self._refill_interval)
+
+
+PULP_REPO_POOL = PulpRepositoryPool(
+    size=settings.pulp_repo_pool_size,
+    refill_interval=settings.pulp_repo_pool_refill_interval,
+    concurrency=settings.pulp_repo_pool_concurrency,
+    redis_url=settings.redis_url,
+)
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import time
+import typing
+from contextlib import asynccontextmanager
+
+
+__all__ = [
+    'READ_LANE',
+    'TASK_LANE',
+    'WRITE_LANE',
+    'PulpRequestLane',
+    'PulpRequestScheduler',
+]
+
+
+READ_LANE = 'read'
+WRITE_LANE = 'write'
+TASK_LANE = 'task'
+
+
+class PulpRequestLane:
+    """
+    Concurrency budget for one kind of Pulp requests.
+    Waiting requests are served by priority (lower value goes first)
+    and in arrival order inside the same priority.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._in_flight = 0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._requests = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'limit': self.limit,
+            'in_flight': self._in_flight,
+            'queue_depth': self.queue_depth,
+            'requests': self._requests,
+            'total_wait': round(self._total_wait, 3),
+            'max_wait': round(self._max_wait, 3),
+        }
+
+    async def acquire(self, priority: int = 0):
+        start = time.monotonic()
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiters, (priority, next(self._counter), future)
+            )
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Slot was already handed over to us, pass it further
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+        wait_time = time.monotonic() - start
+        self._requests += 1
+        self._total_wait += wait_time
+        self._max_wait = max(self._max_wait, wait_time)
+
+    def release(self):
+        while self._waiters:
+            *_, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+
+class PulpRequestScheduler:
+    """
+    Replaces a single global semaphore with independent lanes,
+    so long-running task submissions and bulk mutations can't starve
+    read requests and vice versa.
+    """
+
+    def __init__(
+        self,
+        lanes: typing.Dict[str, int],
+        default_lane: str = WRITE_LANE,
+    ):
+        self._limits = dict(lanes)
+        self._default_lane = default_lane
+        self._lanes: typing.Dict[str, PulpRequestLane] = {}
+        self._loop = None
+
+    def _get_lane(self, name: str) -> PulpRequestLane:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters from a previous event loop can't be woken up anymore
+            self._lanes = {}
+            self._loop = loop
+        if name not in self._limits:
+            name = self._default_lane
+        if name not in self._lanes:
+            self._lanes[name] = PulpRequestLane(name, self._limits[name])
+        return self._lanes[name]
+
+    @asynccontextmanager
+    async def slot(self, lane: str, priority: int = 0):
+        request_lane = self._get_lane(lane)
+        await request_lane.acquire(priority)
+        try:
+            yield
+        finally:
+            request_lane.release()
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        return {name: lane.stats for name, lane in self._lanes.items()}
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import typing
+
+
+__all__ = ['PulpTaskWatcher']
+
+
+FINISHED_TASK_STATES = ('completed', 'failed', 'canceled')
+TASKS_ENDPOINT = 'pulp/api/v3/tasks/'
+
+
+class PulpTaskWatcher:
+    """
+    Tracks every pending Pulp task of the process and checks their state
+    with a single batched query per tick instead of polling each task
+    separately.
+
+    Polling interval starts at `min_interval` and grows by `backoff`
+    factor up to `max_interval` while nothing changes, any new or finished
+    task resets it back, so short tasks are resolved almost immediately.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.2,
+        max_interval: float = 5.0,
+        backoff: float = 1.5,
+        batch_size: int = 100,
+    ):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._batch_size = batch_size
+        self._pending: typing.Dict[str, typing.List[asyncio.Future]] = {}
+        self._request = None
+        self._runner: typing.Optional[asyncio.Task] = None
+        self._wakeup: typing.Optional[asyncio.Event] = None
+        self._loop = None
+        self.stats = {'queries': 0, 'resolved': 0}
+
+    @staticmethod
+    def get_task_id(task_href: str) -> str:
+        return task_href.rstrip('/').split('/')[-1]
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Futures from a previous event loop can't be awaited anymore
+        self._pending = {}
+        self._runner = None
+        self._wakeup = asyncio.Event()
+        self._loop = loop
+
+    async def wait(
+        self,
+        task_href: str,
+        request: typing.Callable[..., typing.Awaitable[dict]],
+    ) -> dict:
+        """
+        Waits until the task is finished and returns its final state.
+        `request` is a PulpClient.request-like coroutine function
+        used for the batched queries.
+        """
+        self._ensure_loop()
+        self._request = request
+        future = self._loop.create_future()
+        self._pending.setdefault(task_href, []).append(future)
+        self._wakeup.set()
+        if self._runner is None or self._runner.done():
+            self._runner = self._loop.create_task(self._run())
+        return await future
+
+    def _resolve(self, task_href: str, task: dict):
+        for future in self._pending.pop(task_href, []):
+            if not future.done():
+                future.set_result(task)
+        self.stats['resolved'] += 1
+
+    def _fail(self, task_hrefs: typing.List[str], exc: Exception):
+        for task_href in task_hrefs:
+            for future in self._pending.pop(task_href, []):
+                if not future.done():
+                    future.set_exception(exc)
+
+    async def _query(self, task_hrefs: typing.List[str]) -> bool:
+        ids = [self.get_task_id(href) for href in task_hrefs]
+        params = {'pulp_id__in': ','.join(ids), 'limit': len(ids)}
+        self.stats['queries'] += 1
+        response = await self._request('GET', TASKS_ENDPOINT, params=params)
+        tasks = {
+            self.get_task_id(task['pulp_href']): task
+            for task in response['results']
+        }
+        has_finished = False
+        for href, task_id in zip(task_hrefs, ids):
+            task = tasks.get(task_id)
+            if task is None:
+                # Task is purged or href is wrong, it would be 404
+                # for a separate request, so waiting is pointless
+                self._fail(
+                    [href], LookupError(f'Pulp task {href} is not found'))
+                has_finished = True
+            elif task['state'] in FINISHED_TASK_STATES:
+                self._resolve(href, task)
+                has_finished = True
+        return has_finished
+
+    async def _run(self):
+        interval = self._min_interval
+        while self._pending:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+                # New task arrived, it's most likely a short one
+                interval = self._min_interval
+                await asyncio.sleep(self._min_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Drop tasks which nobody waits anymore (cancelled callers)
+            for href in list(self._pending):
+                futures = [f for f in self._pending[href] if not f.done()]
+                if futures:
+                    self._pending[href] = futures
+                else:
+                    self._pending.pop(href)
+            hrefs = list(self._pending)
+            has_finished = False
+            for start in range(0, len(hrefs), self._batch_size):
+                batch = hrefs[start:start + self._batch_size]
+                try:
+                    if await self._query(batch):
+                        has_finished = True
+                except Exception as exc:
+                    logging.exception('Cannot fetch Pulp tasks state')
+                    self._fail(batch, exc)
+            if has_finished:
+                interval = self._min_interval
+            else:
+                interval = min(interval * self._backoff, self._max_interval)
@@ -1,10 +1,11 @@
+import asyncio
 import typing
 import uuid
 
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload, load_only
 
-from alws.dependencies import get_pulp_db
+from alws.dependencies import get_async_pulp_db, get_pulp_db
 from alws.pulp_models import (
     CoreArtifact,
     CoreContent,
@@ -21,27 +22,10 @@ def get_uuid_from_pulp_href(pulp_href: str) -> uuid.UUID:
     return uuid.UUID(pulp_href.split("/")[-2])
 
 
-# TODO: After ALBS-1012 is fixed, we can refactor this function
-# to get module packages from pulp without having to grab the actual
-# modules.yaml file from the repository
-def get_rpm_module_packages_from_repository(
-    repo_id: uuid.UUID,
+def _get_module_pkg_releases(
+    repo_name: str,
     module: str,
-    pkg_names: typing.Optional[typing.List[str]] = None,
-    pkg_versions: typing.Optional[typing.List[str]] = None,
-    pkg_epochs: typing.Optional[typing.List[str]] = None,
-) -> typing.List[RpmPackage]:
-    result = []
-    repo_query = select(CoreRepository).where(
-        CoreRepository.pulp_id == repo_id
-    )
-    with get_pulp_db() as pulp_db:
-        repo = pulp_db.execute(repo_query).scalars().first()
-        repo_name = repo.name
-
-    if not repo_name:
-        return []
-
+) -> typing.List[str]:
     # TODO: Getting modules.yaml files from BS production repos is not right.
     # The problem here is that we need a way to get packages from
     # the provided module:stream, and pulp actually doesn't have an artifact
@@ -53,7 +37,7 @@ def get_rpm_module_packages_from_repository(
     try:
         repo_modules_yaml = get_modules_yaml_from_repo(repo_name)
     except Exception:
-        return result
+        return []
 
     module_name, module_stream = module.split(":")
     devel_module_name = (
@@ -68,8 +52,6 @@ def get_rpm_module_packages_from_repository(
         except Exception:
             continue
         repo_modules.append(repo_module)
-    if not repo_modules:
-        return result
 
     pkg_releases = []
     for repo_module in repo_modules:
@@ -77,7 +59,16 @@ def get_rpm_module_packages_from_repository(
             pkg_release = parse_rpm_nevra(pkg).release
             if pkg_release not in pkg_releases:
                 pkg_releases.append(pkg_release)
+    return pkg_releases
 
+
+def _rpm_module_packages_query(
+    repo_id: uuid.UUID,
+    pkg_releases: typing.List[str],
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+):
     conditions = []
 
     if pkg_names:
@@ -90,7 +81,7 @@ def get_rpm_module_packages_from_repository(
     first_subq = (
         select(CoreRepositoryContent.content_id)
         .where(
-            CoreRepositoryContent.repository_id == repo.pulp_id,
+            CoreRepositoryContent.repository_id == repo_id,
             CoreRepositoryContent.version_removed_id.is_(None),
         )
         .scalar_subquery()
@@ -110,21 +101,17 @@ def get_rpm_module_packages_from_repository(
             RpmPackage.release.in_(pkg_releases),
         ]
     )
-
-    query = select(RpmPackage).where(*conditions)
-    with get_pulp_db() as pulp_db:
-        result = pulp_db.execute(query).scalars().all()
-    return result
+    return select(RpmPackage).where(*conditions)
 
 
-def get_rpm_packages_from_repositories(
+def _rpm_packages_from_repositories_query(
     repo_ids: typing.List[uuid.UUID],
     pkg_names: typing.Optional[typing.List[str]] = None,
     pkg_versions: typing.Optional[typing.List[str]] = None,
     pkg_epochs: typing.Optional[typing.List[str]] = None,
     pkg_arches: typing.Optional[typing.List[str]] = None,
     pkg_releases: typing.Optional[typing.List[str]] = None,
-) -> typing.List[RpmPackage]:
+):
     conditions = [
         CoreRepository.pulp_id.in_(repo_ids),
         CoreRepositoryContent.version_removed_id.is_(None),
@@ -139,7 +126,7 @@ def get_rpm_packages_from_repositories(
         conditions.append(RpmPackage.arch.in_(pkg_arches))
     if pkg_releases:
         conditions.append(RpmPackage.release.in_(pkg_releases))
-    query = (
+    return (
         select(RpmPackage)
         .join(CoreContent)
         .join(CoreRepositoryContent)
@@ -153,17 +140,15 @@ def get_rpm_packages_from_repositories(
             )
         )
     )
-    with get_pulp_db() as pulp_db:
-        return pulp_db.execute(query).scalars().unique().all()
 
 
-def get_rpm_packages_from_repository(
+def _rpm_packages_from_repository_query(
     repo_id: uuid.UUID,
     pkg_names: typing.Optional[typing.List[str]] = None,
     pkg_versions: typing.Optional[typing.List[str]] = None,
     pkg_epochs: typing.Optional[typing.List[str]] = None,
     pkg_arches: typing.Optional[typing.List[str]] = None,
-) -> typing.List[RpmPackage]:
+):
     first_subq = (
         select(CoreRepository.pulp_id)
         .where(CoreRepository.pulp_id == repo_id)
@@ -197,8 +182,106 @@ def get_rpm_packages_from_repository(
         conditions.append(RpmPackage.epoch.in_(pkg_epochs))
     if pkg_arches:
         conditions.append(RpmPackage.arch.in_(pkg_arches))
+    return select(RpmPackage).where(*conditions)
+
+
+def _rpm_packages_by_ids_query(
+    pulp_pkg_ids: typing.List[uuid.UUID],
+    pkg_fields: typing.List[typing.Any],
+):
+    return (
+        select(RpmPackage)
+        .where(
+            RpmPackage.content_ptr_id.in_(pulp_pkg_ids),
+        )
+        .options(
+            joinedload(RpmPackage.content)
+            .joinedload(CoreContent.core_contentartifact)
+            .joinedload(CoreContentArtifact.artifact),
+            load_only(*pkg_fields),
+        )
+    )
+
+
+def _rpm_packages_by_checksums_query(pkg_checksums: typing.List[str]):
+    return (
+        select(RpmPackage)
+        .join(CoreContent)
+        .join(CoreContentArtifact)
+        .join(CoreArtifact)
+        .where(CoreArtifact.sha256.in_(pkg_checksums))
+        .options(
+            joinedload(RpmPackage.content)
+            .joinedload(CoreContent.core_contentartifact)
+            .joinedload(CoreContentArtifact.artifact),
+        )
+    )
+
+
+# TODO: After ALBS-1012 is fixed, we can refactor this function
+# to get module packages from pulp without having to grab the actual
+# modules.yaml file from the repository
+def get_rpm_module_packages_from_repository(
+    repo_id: uuid.UUID,
+    module: str,
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    repo_query = select(CoreRepository.name).where(
+        CoreRepository.pulp_id == repo_id
+    )
+    with get_pulp_db() as pulp_db:
+        repo_name = pulp_db.execute(repo_query).scalars().first()
+
+    if not repo_name:
+        return []
+
+    pkg_releases = _get_module_pkg_releases(repo_name, module)
+    if not pkg_releases:
+        return []
+
+    query = _rpm_module_packages_query(
+        repo_id, pkg_releases, pkg_names, pkg_versions, pkg_epochs
+    )
+    with get_pulp_db() as pulp_db:
+        return pulp_db.execute(query).scalars().all()
+
+
+def get_rpm_packages_from_repositories(
+    repo_ids: typing.List[uuid.UUID],
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+    pkg_arches: typing.Optional[typing.List[str]] = None,
+    pkg_releases: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    query = _rpm_packages_from_repositories_query(
+        repo_ids,
+        pkg_names=pkg_names,
+        pkg_versions=pkg_versions,
+        pkg_epochs=pkg_epochs,
+        pkg_arches=pkg_arches,
+        pkg_releases=pkg_releases,
+    )
+    with get_pulp_db() as pulp_db:
+        return pulp_db.execute(query).scalars().unique().all()
+
 
-    query = select(RpmPackage).where(*conditions)
+def get_rpm_packages_from_repository(
+    repo_id: uuid.UUID,
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+    pkg_arches: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    query = _rpm_packages_from_repository_query(
+        repo_id,
+        pkg_names=pkg_names,
+        pkg_versions=pkg_versions,
+        pkg_epochs=pkg_epochs,
+        pkg_arches=pkg_arches,
+    )
     with get_pulp_db() as pulp_db:
         return pulp_db.execute(query).scalars().all()
 
@@ -207,52 +290,117 @@ def get_rpm_packages_by_ids(
     pulp_pkg_ids: typing.List[uuid.UUID],
     pkg_fields: typing.List[typing.Any],
 ) -> typing.Dict[str, RpmPackage]:
-    result = {}
+    query = _rpm_packages_by_ids_query(pulp_pkg_ids, pkg_fields)
     with get_pulp_db() as pulp_db:
-        pulp_pkgs = (
-            pulp_db.execute(
-                select(RpmPackage)
-                .where(
-                    RpmPackage.content_ptr_id.in_(pulp_pkg_ids),
-                )
-                .options(
-                    joinedload(RpmPackage.content)
-                    .joinedload(CoreContent.core_contentartifact)
-                    .joinedload(CoreContentArtifact.artifact),
-                    load_only(*pkg_fields),
-                )
-            )
-            .unique()
-            .scalars()
-            .all()
-        )
-        for pkg in pulp_pkgs:
-            result[pkg.pulp_href] = pkg
-        return result
+        pulp_pkgs = pulp_db.execute(query).unique().scalars().all()
+        return {pkg.pulp_href: pkg for pkg in pulp_pkgs}
 
 
 def get_rpm_packages_by_checksums(
     pkg_checksums: typing.List[str],
 ) -> typing.Dict[str, RpmPackage]:
-    result = {}
+    query = _rpm_packages_by_checksums_query(pkg_checksums)
     with get_pulp_db() as pulp_db:
-        pulp_pkgs = (
-            pulp_db.execute(
-                select(RpmPackage)
-                .join(CoreContent)
-                .join(CoreContentArtifact)
-                .join(CoreArtifact)
-                .where(CoreArtifact.sha256.in_(pkg_checksums))
-                .options(
-                    joinedload(RpmPackage.content)
-                    .joinedload(CoreContent.core_contentartifact)
-                    .joinedload(CoreContentArtifact.artifact),
-                ),
-            )
-            .unique()
-            .scalars()
-            .all()
-        )
-        for package in pulp_pkgs:
-            result[package.sha256] = package
-        return result
+        pulp_pkgs = pulp_db.execute(query).unique().scalars().all()
+        return {pkg.sha256: pkg for pkg in pulp_pkgs}
+
+
+# Async versions of the functions above, they should be used
+# in the event loop instead of the sync ones, which are kept for scripts
+
+
+async def get_rpm_module_packages_from_repository_async(
+    repo_id: uuid.UUID,
+    module: str,
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    repo_query = select(CoreRepository.name).where(
+        CoreRepository.pulp_id == repo_id
+    )
+    async with get_async_pulp_db() as pulp_db:
+        repo_name = (await pulp_db.execute(repo_query)).scalars().first()
+
+    if not repo_name:
+        return []
+
+    # modules.yaml is downloaded with a blocking HTTP client
+    pkg_releases = await asyncio.get_running_loop().run_in_executor(
+        None, _get_module_pkg_releases, repo_name, module
+    )
+    if not pkg_releases:
+        return []
+
+    query = _rpm_module_packages_query(
+        repo_id, pkg_releases, pkg_names, pkg_versions, pkg_epochs
+    )
+    async with get_async_pulp_db() as pulp_db:
+        return (await pulp_db.execute(query)).scalars().all()
+
+
+async def get_rpm_packages_from_repositories_async(
+    repo_ids: typing.List[uuid.UUID],
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+    pkg_arches: typing.Optional[typing.List[str]] = None,
+    pkg_releases: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    query = _rpm_packages_from_repositories_query(
+        repo_ids,
+        pkg_names=pkg_names,
+        pkg_versions=pkg_versions,
+        pkg_epochs=pkg_epochs,
+        pkg_arches=pkg_arches,
+        pkg_releases=pkg_releases,
+    )
+    async with get_async_pulp_db() as pulp_db:
+        return (await pulp_db.execute(query)).scalars().unique().all()
+
+
+async def get_rpm_packages_from_repository_async(
+    repo_id: uuid.UUID,
+    pkg_names: typing.Optional[typing.List[str]] = None,
+    pkg_versions: typing.Optional[typing.List[str]] = None,
+    pkg_epochs: typing.Optional[typing.List[str]] = None,
+    pkg_arches: typing.Optional[typing.List[str]] = None,
+) -> typing.List[RpmPackage]:
+    query = _rpm_packages_from_repository_query(
+        repo_id,
+        pkg_names=pkg_names,
+        pkg_versions=pkg_versions,
+        pkg_epochs=pkg_epochs,
+        pkg_arches=pkg_arches,
+    )
+    async with get_async_pulp_db() as pulp_db:
+        return (await pulp_db.execute(query)).scalars().all()
+
+
+async def get_rpm_packages_by_ids_async(
+    pulp_pkg_ids: typing.List[uuid.UUID],
+    pkg_fields: typing.List[typing.Any],
+) -> typing.Dict[str, RpmPackage]:
+    query = _rpm_packages_by_ids_query(pulp_pkg_ids, pkg_fields)
+    async with get_async_pulp_db() as pulp_db:
+        pulp_pkgs = (await pulp_db.execute(query)).unique().scalars().all()
+        return {pkg.pulp_href: pkg for pkg in pulp_pkgs}
+
+
+async def get_rpm_packages_by_checksums_async(
+    pkg_checksums: typing.List[str],
+) -> typing.Dict[str, RpmPackage]:
+    query = _rpm_packages_by_checksums_query(pkg_checksums)
+    async with get_async_pulp_db() as pulp_db:
+        pulp_pkgs = (await pulp_db.execute(query)).unique().scalars().all()
+        return {pkg.sha256: pkg for pkg in pulp_pkgs}
+
+
+async def get_artifacts_sha256_async(
+    artifact_ids: typing.List[uuid.UUID],
+) -> typing.Dict[uuid.UUID, str]:
+    query = select(CoreArtifact.pulp_id, CoreArtifact.sha256).where(
+        CoreArtifact.pulp_id.in_(artifact_ids),
+    )
+    async with get_async_pulp_db() as pulp_db:
+        return dict((await pulp_db.execute(query)).all())
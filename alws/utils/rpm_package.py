@@ -3,14 +3,14 @@ import typing
 from alws.models import BuildTaskArtifact
 from alws.pulp_models import RpmPackage
 from alws.utils.pulp_utils import (
-    get_rpm_packages_by_ids,
+    get_rpm_packages_by_ids_async,
     get_uuid_from_pulp_href,
 )
 
 __all__ = ["get_rpm_packages_info"]
 
 
-def get_rpm_packages_info(
+async def get_rpm_packages_info(
     artifacts: typing.List[BuildTaskArtifact],
 ) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
     pkg_fields = [
@@ -22,7 +22,7 @@ def get_rpm_packages_info(
         RpmPackage.arch,
         RpmPackage.rpm_sourcerpm,
     ]
-    pulp_packages = get_rpm_packages_by_ids(
+    pulp_packages = await get_rpm_packages_by_ids_async(
         [get_uuid_from_pulp_href(artifact.href) for artifact in artifacts],
         pkg_fields,
     )
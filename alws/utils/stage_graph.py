@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+
+__all__ = ['StageGraph']
+
+
+StageFunc = typing.Callable[[], typing.Awaitable[typing.Any]]
+
+
+class _Stage:
+    def __init__(self, func: StageFunc, depends_on: typing.Iterable[str]):
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.started_at: typing.Optional[datetime.datetime] = None
+        self.finished_at: typing.Optional[datetime.datetime] = None
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return self.finished_at - self.started_at
+
+
+class StageGraph:
+    """
+    Runs processing stages concurrently, each stage starts as soon as
+    the stages it depends on are finished. Stages sharing a resource
+    that doesn't allow concurrent use (e.g. a database session)
+    should depend on each other.
+
+    `run` executes stages added since the previous run, so the graph
+    can be extended with stages which need results of the earlier ones.
+    Timings of every stage are collected in `stats` in the same format
+    as other build_done statistics, `critical_path` contains the
+    longest chain of dependent stages across all runs.
+    """
+
+    def __init__(self):
+        self._stages: typing.Dict[str, _Stage] = {}
+        self._pending: typing.List[str] = []
+        self.results: typing.Dict[str, typing.Any] = {}
+        self.stats: typing.Dict[str, typing.Dict[str, str]] = {}
+        self.critical_path: typing.List[str] = []
+        self.critical_path_duration = datetime.timedelta()
+
+    def add(
+        self,
+        name: str,
+        func: StageFunc,
+        depends_on: typing.Iterable[str] = (),
+    ):
+        if name in self._stages:
+            raise ValueError(f'Stage {name} is already added')
+        depends_on = list(depends_on)
+        unknown = [dep for dep in depends_on if dep not in self._stages]
+        if unknown:
+            raise ValueError(f'Stage {name} depends on unknown {unknown}')
+        self._stages[name] = _Stage(func, depends_on)
+        self._pending.append(name)
+
+    async def _run_stage(
+        self,
+        name: str,
+        tasks: typing.Dict[str, asyncio.Task],
+    ):
+        stage = self._stages[name]
+        for dep in stage.depends_on:
+            if dep in tasks:
+                await tasks[dep]
+        logging.info('Stage %s is started', name)
+        stage.started_at = datetime.datetime.utcnow()
+        self.results[name] = await stage.func()
+        stage.finished_at = datetime.datetime.utcnow()
+        self.stats[name] = {
+            'start_ts': str(stage.started_at),
+            'end_ts': str(stage.finished_at),
+            'delta': str(stage.duration),
+        }
+        logging.info('Stage %s is finished', name)
+
+    def _update_critical_path(self, names: typing.List[str]):
+        # Stages of one run start after the previous run is finished,
+        # so critical paths of consecutive runs are chained
+        paths = {}
+        for name in names:
+            stage = self._stages[name]
+            longest = max(
+                (paths[dep] for dep in stage.depends_on if dep in paths),
+                key=lambda path: path[0],
+                default=(datetime.timedelta(), []),
+            )
+            paths[name] = (longest[0] + stage.duration, longest[1] + [name])
+        duration, path = max(paths.values(), key=lambda path: path[0])
+        self.critical_path_duration += duration
+        self.critical_path.extend(path)
+
+    async def run(self) -> typing.Dict[str, typing.Any]:
+        names, self._pending = self._pending, []
+        if not names:
+            return self.results
+        tasks = {}
+        for name in names:
+            tasks[name] = asyncio.create_task(self._run_stage(name, tasks))
+        done, pending = await asyncio.wait(
+            tasks.values(),
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+        if pending:
+            # Remaining stages shouldn't touch shared resources
+            # while the caller is handling the failure
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for name in names:
+            task = tasks[name]
+            if task.done() and not task.cancelled() and task.exception():
+                raise task.exception()
+        self._update_critical_path(names)
+        return self.results
+
+    def get_critical_path_stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'delta': str(self.critical_path_duration),
+            'stages': list(self.critical_path),
+        }
@@ -49,7 +49,7 @@ class MetadataUploader:
             "replace": "true",
         }
         await self.pulp.upload_comps(data)
-        await self.pulp.create_rpm_publication(repo_href)
+        await self.pulp.schedule_rpm_publication(repo_href)
 
     async def upload_modules(
         self,
@@ -145,7 +145,7 @@ class MetadataUploader:
             logging.exception("Cannot restore packages in repo:")
             raise exc
         finally:
-            await self.pulp.create_rpm_publication(repo_href)
+            await self.pulp.schedule_rpm_publication(repo_href)
 
         # we need to update module if we update template in build repo
         re_result = re.search(
@@ -34,6 +34,12 @@ import urllib.parse
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from alws.utils import pulp_client
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
 from alws.database import PulpSession, SyncSession
 from alws.config import settings
 from alws.pulp_models import UpdateRecord, UpdatePackage
@@ -327,7 +333,9 @@ async def update_pulp_repos():
 
 
 async def main():
-    pulp_client.PULP_SEMAPHORE = asyncio.Semaphore(10)
+    pulp_client.PULP_SCHEDULER = PulpRequestScheduler(
+        {lane: 10 for lane in (READ_LANE, WRITE_LANE, TASK_LANE)}
+    )
 
     await prepare_albs_errata_cache()
 
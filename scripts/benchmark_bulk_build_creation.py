@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from alws import models
+from alws.build_planner import BuildPlanner
+from alws.database import Session
+from alws.schemas.build_schema import BuildCreatePlatforms
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        "benchmark_bulk_build_creation",
+        description="Plans and writes build tasks of a synthetic mass "
+        "rebuild with ORM objects and in the bulk mode. Repositories "
+        "aren't created and every transaction is rolled back, "
+        "but sequences are advanced, so run it against "
+        "a disposable database",
+    )
+    parser.add_argument(
+        "-r",
+        "--refs",
+        type=int,
+        default=5000,
+        help="Number of refs in the synthetic build",
+    )
+    parser.add_argument(
+        "-p",
+        "--platform",
+        type=str,
+        default="AlmaLinux-8",
+        help="Name of an existing build platform",
+    )
+    parser.add_argument(
+        "-a",
+        "--arches",
+        nargs="+",
+        default=["i686", "x86_64", "aarch64", "ppc64le"],
+        help="Build arches",
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=3,
+        help="Number of created builds for every mode",
+    )
+    return parser.parse_args()
+
+
+async def create_build(args, bulk_mode: bool) -> float:
+    async with Session() as db:
+        started_at = time.monotonic()
+        build = models.Build(tasks=[])
+        db.add(build)
+        await db.flush()
+        planner = BuildPlanner(
+            db,
+            build,
+            platforms=[
+                BuildCreatePlatforms(
+                    name=args.platform,
+                    arch_list=args.arches,
+                    parallel_mode_enabled=True,
+                ),
+            ],
+            platform_flavors=None,
+            is_secure_boot=False,
+            module_build_index=None,
+            bulk_mode=bulk_mode,
+        )
+        await planner.load()
+        for number in range(args.refs):
+            await planner._add_single_ref(
+                models.BuildTaskRef(
+                    url=f"https://git.almalinux.org/rpms/pkg-{number}.git",
+                    git_ref="c8",
+                    ref_type=1,
+                )
+            )
+        await db.flush()
+        await planner.write_bulk_tasks()
+        elapsed = time.monotonic() - started_at
+        await db.rollback()
+    return elapsed
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for name, bulk_mode in (("orm", False), ("bulk", True)):
+        latencies = sorted([
+            await create_build(args, bulk_mode)
+            for _ in range(args.iterations)
+        ])
+        logging.info(
+            "%s: %d refs, %d arches, p50 %.2fs, p99 %.2fs, max %.2fs",
+            name,
+            args.refs,
+            len(args.arches),
+            statistics.median(latencies),
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            latencies[-1],
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import typing
+
+import sqlalchemy
+from sqlalchemy.future import select
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from alws import models
+from alws.crud.build_node import find_errata_packages
+from alws.database import Session
+from alws.utils.parsing import clean_release
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        "benchmark_errata_matching",
+        description="Matches RPMs of a synthetic build against errata "
+        "packages with a query per RPM and with a single set-based "
+        "query, the database isn't modified",
+    )
+    parser.add_argument(
+        "-p",
+        "--packages",
+        type=int,
+        default=500,
+        help="Number of binary RPMs in the synthetic build",
+    )
+    parser.add_argument(
+        "-m",
+        "--matching",
+        type=int,
+        default=100,
+        help="Number of RPMs taken from existing errata packages",
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=20,
+        help="Number of matching rounds for every strategy",
+    )
+    return parser.parse_args()
+
+
+async def make_rpms_info(packages: int, matching: int) -> typing.List[dict]:
+    async with Session() as db:
+        errata_packages = (
+            (
+                await db.execute(
+                    select(models.ErrataPackage).limit(min(matching, packages))
+                )
+            )
+            .scalars()
+            .all()
+        )
+    rpms_info = [
+        {
+            "name": errata_package.name,
+            "version": errata_package.version,
+            "release": errata_package.release,
+            "arch": errata_package.arch,
+        }
+        for errata_package in errata_packages
+    ]
+    for i in range(packages - len(rpms_info)):
+        rpms_info.append(
+            {
+                "name": f"synthetic-package-{i}",
+                "version": "1.0",
+                "release": "1.el8",
+                "arch": "noarch" if i % 5 == 0 else "x86_64",
+            }
+        )
+    return rpms_info
+
+
+async def match_per_rpm(db, rpms_info: typing.List[dict]) -> int:
+    # That's how errata packages were matched in __process_rpms
+    matched = 0
+    for rpm_info in rpms_info:
+        conditions = [
+            models.ErrataPackage.name == rpm_info["name"],
+            models.ErrataPackage.version == rpm_info["version"],
+        ]
+        if rpm_info["arch"] != "noarch":
+            conditions.append(models.ErrataPackage.arch == rpm_info["arch"])
+        query = select(models.ErrataPackage).where(
+            sqlalchemy.and_(*conditions)
+        )
+        for errata_package in (await db.execute(query)).scalars().all():
+            if clean_release(rpm_info["release"]) == clean_release(
+                errata_package.release
+            ):
+                matched += 1
+    return matched
+
+
+async def match_bulk(db, rpms_info: typing.List[dict]) -> int:
+    matches = await find_errata_packages(db, rpms_info)
+    return sum(len(errata_packages) for errata_packages in matches)
+
+
+async def run_case(
+    name: str,
+    match: typing.Callable[..., typing.Awaitable[int]],
+    rpms_info: typing.List[dict],
+    iterations: int,
+):
+    latencies = []
+    matched = 0
+    for _ in range(iterations):
+        async with Session() as db:
+            started_at = time.monotonic()
+            matched = await match(db, rpms_info)
+            latencies.append(time.monotonic() - started_at)
+    latencies.sort()
+    logging.info(
+        "%s: %d RPMs, %d matches, p50 %.1fms, p99 %.1fms, max %.1fms",
+        name,
+        len(rpms_info),
+        matched,
+        statistics.median(latencies) * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        latencies[-1] * 1000,
+    )
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    rpms_info = await make_rpms_info(args.packages, args.matching)
+    for name, match in (("per-rpm", match_per_rpm), ("bulk", match_bulk)):
+        await run_case(name, match, rpms_info, args.iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import typing
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from alws.crud.build_node import get_available_build_task
+from alws.database import Session
+from alws.schemas.build_node_schema import RequestTask
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        "benchmark_get_task",
+        description="Simulates build nodes polling for build tasks "
+        "concurrently and reports get_task latency. Claimed tasks "
+        "are marked as started, so run it against a disposable database",
+    )
+    parser.add_argument(
+        "-n",
+        "--nodes",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50, 100, 200],
+        help="Numbers of concurrently polling build nodes",
+    )
+    parser.add_argument(
+        "-r",
+        "--requests",
+        type=int,
+        default=20,
+        help="Number of get_task requests made by every node",
+    )
+    parser.add_argument(
+        "-a",
+        "--arches",
+        nargs="+",
+        default=["i686", "x86_64"],
+        help="Architectures supported by simulated build nodes",
+    )
+    parser.add_argument(
+        "-c",
+        "--connections",
+        type=int,
+        default=90,
+        help="Limit of concurrent database connections, "
+        "the same as in alws.dependencies",
+    )
+    return parser.parse_args()
+
+
+async def poll(
+    request: RequestTask,
+    requests: int,
+    db_semaphore: asyncio.Semaphore,
+    latencies: typing.List[float],
+) -> int:
+    claimed = 0
+    for _ in range(requests):
+        started_at = time.monotonic()
+        async with db_semaphore, Session() as db:
+            task = await get_available_build_task(db, request)
+        latencies.append(time.monotonic() - started_at)
+        if task is not None:
+            claimed += 1
+    return claimed
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    request = RequestTask(supported_arches=args.arches)
+    db_semaphore = asyncio.Semaphore(args.connections)
+    for nodes in args.nodes:
+        latencies = []
+        started_at = time.monotonic()
+        claimed = await asyncio.gather(
+            *(
+                poll(request, args.requests, db_semaphore, latencies)
+                for _ in range(nodes)
+            )
+        )
+        elapsed = time.monotonic() - started_at
+        latencies.sort()
+        logging.info(
+            "%d nodes: %d requests in %.2fs, %d tasks claimed, "
+            "latency p50 %.1fms, p99 %.1fms, max %.1fms",
+            nodes,
+            len(latencies),
+            elapsed,
+            sum(claimed),
+            statistics.median(latencies) * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            * 1000,
+            latencies[-1] * 1000,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import typing
+
+from sqlalchemy import select
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from alws.dependencies import get_async_pulp_db
+from alws.pulp_models import RpmPackage
+from alws.utils.pulp_utils import (
+    get_rpm_packages_by_ids,
+    get_rpm_packages_by_ids_async,
+)
+
+
+PKG_FIELDS = [
+    RpmPackage.content_ptr_id,
+    RpmPackage.name,
+    RpmPackage.epoch,
+    RpmPackage.version,
+    RpmPackage.release,
+    RpmPackage.arch,
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        "benchmark_pulp_db_lag",
+        description="Measures event loop lag caused by Pulp DB lookups "
+        "made with sync and async helpers under concurrent load",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=50,
+        help="Number of concurrent lookups",
+    )
+    parser.add_argument(
+        "-p",
+        "--packages",
+        type=int,
+        default=500,
+        help="Number of packages requested by every lookup",
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.01,
+        help="Interval of the event loop lag probe in seconds",
+    )
+    return parser.parse_args()
+
+
+async def probe_lag(interval: float, lags: typing.List[float]):
+    loop = asyncio.get_running_loop()
+    while True:
+        started_at = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - started_at - interval)
+
+
+async def sync_lookup(pkg_ids: list):
+    # That's how the sync helper was called from the async code
+    get_rpm_packages_by_ids(pkg_ids, PKG_FIELDS)
+
+
+async def async_lookup(pkg_ids: list):
+    await get_rpm_packages_by_ids_async(pkg_ids, PKG_FIELDS)
+
+
+async def run_case(
+    name: str,
+    lookup: typing.Callable[[list], typing.Awaitable],
+    pkg_ids: list,
+    concurrency: int,
+    interval: float,
+):
+    lags = []
+    probe = asyncio.create_task(probe_lag(interval, lags))
+    await asyncio.sleep(interval)
+    started_at = time.monotonic()
+    await asyncio.gather(*(lookup(pkg_ids) for _ in range(concurrency)))
+    elapsed = time.monotonic() - started_at
+    probe.cancel()
+    lags = sorted(lags) or [0.0]
+    logging.info(
+        "%s: total %.2fs, lag p50 %.1fms, p99 %.1fms, max %.1fms",
+        name,
+        elapsed,
+        statistics.median(lags) * 1000,
+        lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        lags[-1] * 1000,
+    )
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    async with get_async_pulp_db() as pulp_db:
+        pkg_ids = (
+            (
+                await pulp_db.execute(
+                    select(RpmPackage.content_ptr_id).limit(args.packages)
+                )
+            )
+            .scalars()
+            .all()
+        )
+    if not pkg_ids:
+        logging.error("There are no RPM packages in Pulp DB")
+        return
+    for name, lookup in (("sync", sync_lookup), ("async", async_lookup)):
+        await run_case(
+            name, lookup, pkg_ids, args.concurrency, args.interval
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import typing
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from alws.constants import BuildTaskStatus
+from alws.crud.build_node import plan_failed_build_items_restart_in_parallel
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        "benchmark_restart_failed_build",
+        description="Plans restart of a synthetic failed build with "
+        "the previous per-task dependency walk and with the in-memory "
+        "planner, the database isn't used",
+    )
+    parser.add_argument(
+        "-r",
+        "--refs",
+        type=int,
+        default=600,
+        help="Number of refs (task indexes) in the synthetic build",
+    )
+    parser.add_argument(
+        "-a",
+        "--arches",
+        type=str,
+        default="i686,x86_64,aarch64,ppc64le",
+        help="Comma-separated list of build arches",
+    )
+    parser.add_argument(
+        "-f",
+        "--failed",
+        type=float,
+        default=0.5,
+        help="Share of failed tasks",
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=5,
+        help="Number of planning rounds for every strategy",
+    )
+    return parser.parse_args()
+
+
+def make_tasks_matrix(
+    refs: int,
+    arches: typing.List[str],
+    failed: float,
+) -> dict:
+    statuses = [BuildTaskStatus.FAILED, BuildTaskStatus.COMPLETED]
+    weights = [failed, 1 - failed]
+    tasks_matrix = {}
+    task_id = 0
+    for idx in range(refs):
+        index_dict = {}
+        for arch in arches:
+            task_id += 1
+            index_dict[(1, arch)] = SimpleNamespace(
+                id=task_id,
+                arch=arch,
+                status=random.choices(statuses, weights)[0],
+                built_srpm_url=f"srpm-{idx}",
+            )
+        if any(
+            task.status == BuildTaskStatus.FAILED
+            for task in index_dict.values()
+        ):
+            tasks_matrix[len(tasks_matrix)] = index_dict
+    return tasks_matrix
+
+
+def reset_statuses(tasks_matrix: dict, statuses: dict):
+    for index_dict in tasks_matrix.values():
+        for task in index_dict.values():
+            task.status = statuses[task.id]
+
+
+def plan_walk(tasks_matrix: dict) -> int:
+    # That's how update_failed_build_items_in_parallel worked,
+    # every dependency was a separate ORM append via db.run_sync
+    statements = 0
+    tasks_indexes = list(tasks_matrix.keys())
+    for task_index, index_dict in tasks_matrix.items():
+        current_idx = tasks_indexes.index(task_index)
+        first_index_dep = None
+        completed_index_tasks = [
+            task
+            for task in index_dict.values()
+            if task.status == BuildTaskStatus.COMPLETED
+        ]
+        for key in sorted(
+            list(index_dict.keys()),
+            key=lambda x: x[1] == "i686",
+            reverse=True,
+        ):
+            task = index_dict[key]
+            if task.status != BuildTaskStatus.FAILED:
+                continue
+            task.status = BuildTaskStatus.IDLE
+            statements += 1
+            if first_index_dep:
+                statements += 1
+            idx = current_idx - 1
+            while idx >= 0:
+                prev_task_index = tasks_indexes[idx]
+                dep = tasks_matrix.get(prev_task_index, {}).get(key)
+                if dep and dep.status == BuildTaskStatus.IDLE:
+                    statements += 1
+                idx -= 1
+            if first_index_dep is None and not completed_index_tasks:
+                first_index_dep = task
+    return statements
+
+
+def plan_in_memory(tasks_matrix: dict) -> int:
+    restart = plan_failed_build_items_restart_in_parallel(tasks_matrix)
+    # One UPDATE of statuses and one INSERT of all dependencies
+    return 1 + bool(restart.dependencies)
+
+
+def run_case(
+    name: str,
+    plan: typing.Callable[[dict], int],
+    tasks_matrix: dict,
+    statuses: dict,
+    iterations: int,
+):
+    latencies = []
+    statements = 0
+    for _ in range(iterations):
+        reset_statuses(tasks_matrix, statuses)
+        started_at = time.monotonic()
+        statements = plan(tasks_matrix)
+        latencies.append(time.monotonic() - started_at)
+    latencies.sort()
+    logging.info(
+        "%s: %d failed indexes, %d statements, "
+        "p50 %.1fms, p99 %.1fms, max %.1fms",
+        name,
+        len(tasks_matrix),
+        statements,
+        statistics.median(latencies) * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        latencies[-1] * 1000,
+    )
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    tasks_matrix = make_tasks_matrix(
+        args.refs,
+        args.arches.split(","),
+        args.failed,
+    )
+    statuses = {
+        task.id: task.status
+        for index_dict in tasks_matrix.values()
+        for task in index_dict.values()
+    }
+    for name, plan in (("walk", plan_walk), ("in-memory", plan_in_memory)):
+        run_case(name, plan, tasks_matrix, statuses, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
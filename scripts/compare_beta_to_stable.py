@@ -19,9 +19,8 @@ from alws.models import (
     Product,
     Repository,
 )
-from alws.config import settings
 from alws.database import Session
-from alws.utils import pulp_client
+from alws.utils.pulp_content_listing import PulpContentListing
 from alws.utils.debuginfo import is_debuginfo
 
 
@@ -97,10 +96,7 @@ async def get_repositories(
 
 class PackagesComparator:
     def __init__(self):
-        self.pulp = pulp_client.PulpClient(
-            settings.pulp_host, settings.pulp_user,
-            settings.pulp_password
-        )
+        self.content_listing = PulpContentListing()
 
     async def retrieve_all_packages_from_repo(
             self,
@@ -116,7 +112,7 @@ class PackagesComparator:
                 search_params["arch"] = arch
             else:
                 search_params["arch__in"] = (arch, "noarch")
-        packages = await self.pulp.get_rpm_repository_packages(
+        packages = await self.content_listing.get_rpm_repository_packages(
             repository.pulp_href,
             include_fields=["sha256", "location_href"],
             **search_params,
@@ -9,6 +9,12 @@ from sqlalchemy import select
 import createrepo_c as cr
 
 from alws.utils import pulp_client
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
 from alws.database import PulpSession, SyncSession
 from alws.config import settings
 from alws.constants import ErrataReferenceType, ErrataPackageStatus
@@ -187,7 +193,9 @@ async def update_albs_db():
 
 
 async def main():
-    pulp_client.PULP_SEMAPHORE = asyncio.Semaphore(10)
+    pulp_client.PULP_SCHEDULER = PulpRequestScheduler(
+        {lane: 10 for lane in (READ_LANE, WRITE_LANE, TASK_LANE)}
+    )
     tasks = [
         update_pulp_db(),
         update_albs_db(),
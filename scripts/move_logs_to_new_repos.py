@@ -29,6 +29,12 @@ from alws.pulp_models import (
     CoreRepositoryContent,
 )
 from alws.utils import pulp_client
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
 from alws.utils.file_utils import hash_content
 
 logging.basicConfig(
@@ -45,7 +51,9 @@ log_regex = re.compile(r'href="(?P<log_name>.+\.log)"')
 
 
 async def main():
-    pulp_client.PULP_SEMAPHORE = asyncio.Semaphore(5)
+    pulp_client.PULP_SCHEDULER = PulpRequestScheduler(
+        {lane: 5 for lane in (READ_LANE, WRITE_LANE, TASK_LANE)}
+    )
     pulp = pulp_client.PulpClient(
         settings.pulp_host,
         settings.pulp_user,
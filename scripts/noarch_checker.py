@@ -6,7 +6,6 @@ import logging
 import os
 import sys
 import typing
-import urllib.parse
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,6 +17,13 @@ from alws.models import Platform, Product, Repository
 from alws.config import settings
 from alws.dependencies import get_db
 from alws.utils import pulp_client
+from alws.utils.pulp_content_listing import PulpContentListing
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
 
 
 class NoarchProcessor:
@@ -49,6 +55,7 @@ class NoarchProcessor:
             settings.pulp_user,
             settings.pulp_password,
         )
+        self.content_listing = PulpContentListing()
         self.session = session
         self.source_obj_name = source_obj_name
         self.source_type = source_type
@@ -67,27 +74,14 @@ class NoarchProcessor:
         self,
         latest_repo_version: str,
     ) -> typing.List[typing.Dict[str, str]]:
-        endpoint = "pulp/api/v3/content/rpm/packages/"
-        params = {
-            "arch": "noarch",
-            "fields": ",".join((
-                "name",
-                "version",
-                "release",
-                "sha256",
-                "pulp_href",
-            )),
-            "repository_version": latest_repo_version,
-        }
-        response = await self.pulp.request("GET", endpoint, params=params)
-        packages = response["results"]
-        while response.get("next"):
-            new_url = response.get("next")
-            parsed_url = urllib.parse.urlsplit(new_url)
-            new_url = parsed_url.path + "?" + parsed_url.query
-            response = await self.pulp.request("GET", new_url)
-            packages.extend(response["results"])
-        return packages
+        return [
+            pkg
+            async for pkg in self.content_listing.iter_repo_packages(
+                latest_repo_version,
+                fields=["name", "version", "release", "sha256", "pulp_href"],
+                search_params={"arch": "noarch"},
+            )
+        ]
 
     async def copy_noarch_packages_from_source(
         self,
@@ -326,7 +320,9 @@ def parse_args():
 
 async def main():
     args = parse_args()
-    pulp_client.PULP_SEMAPHORE = asyncio.Semaphore(10)
+    pulp_client.PULP_SCHEDULER = PulpRequestScheduler(
+        {lane: 10 for lane in (READ_LANE, WRITE_LANE, TASK_LANE)}
+    )
     async with asynccontextmanager(get_db)() as session:
         processor = NoarchProcessor(
             session=session,
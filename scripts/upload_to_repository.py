@@ -10,6 +10,12 @@ import urllib.parse
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from alws.utils import pulp_client
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
 from alws.utils.file_utils import download_big_file, hash_file
 from alws.utils.parsing import parse_rpm_nevra
 from scripts.utils.log import setup_logging
@@ -54,7 +60,9 @@ async def create_rpm_package(
 
 
 async def async_main(args, work_dir, logger):
-    pulp_client.PULP_SEMAPHORE = asyncio.Semaphore(5)
+    pulp_client.PULP_SCHEDULER = PulpRequestScheduler(
+        {lane: 5 for lane in (READ_LANE, WRITE_LANE, TASK_LANE)}
+    )
     pulp_host, pulp_user, pulp_password = get_pulp_params()
     pulp = pulp_client.PulpClient(pulp_host, pulp_user, pulp_password)
     repository = await pulp.get_rpm_repository(args.repository_name)
@@ -6,10 +6,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from alws.crud.build import create_build, get_builds
 from alws.models import Build
 from alws.schemas.build_schema import BuildCreate
+from alws.utils.build_task_environment import BUILD_TASK_ENVIRONMENT_CACHE
+from alws.utils.build_task_heartbeats import BuildTaskHeartbeats
+from alws.utils.pulp_repo_pool import PULP_REPO_POOL
 from tests.constants import ADMIN_USER_ID
 from tests.test_utils.pulp_utils import get_rpm_pkg_info
 
 
+@pytest.fixture(autouse=True)
+def build_task_heartbeats_patch(monkeypatch):
+    monkeypatch.setattr(
+        "alws.crud.build_node.BUILD_TASK_HEARTBEATS",
+        BuildTaskHeartbeats(lease_timeout=1200),
+    )
+
+
+@pytest.fixture(autouse=True)
+def build_task_environment_cache_patch(monkeypatch):
+    # Cached environments shouldn't outlive the test database
+    monkeypatch.setattr(BUILD_TASK_ENVIRONMENT_CACHE, "_redis_url", None)
+    BUILD_TASK_ENVIRONMENT_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def pulp_repo_pool_patch(monkeypatch):
+    # Build repositories are created by mocked Pulp client in tests
+    monkeypatch.setattr(PULP_REPO_POOL, "_size", 0)
+
+
 @pytest.fixture(
     params=[
         [],
@@ -253,7 +277,7 @@ async def regular_build(
 
 @pytest.fixture
 def get_rpm_packages_info(monkeypatch):
-    def func(artifacts):
+    async def func(artifacts):
         return {
             artifact.href: get_rpm_pkg_info(artifact) for artifact in artifacts
         }
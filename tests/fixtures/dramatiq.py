@@ -21,6 +21,15 @@ def patch_dramatiq_actor_send(monkeypatch):
     monkeypatch.setattr("dramatiq.Actor.send", func)
 
 
+@pytest.fixture(autouse=True)
+def patch_build_tasks_notifications(monkeypatch):
+    async def func(*args, **kwargs):
+        return
+
+    for module in ("alws.crud.build_node", "alws.dramatiq.build"):
+        monkeypatch.setattr(f"{module}.notify_build_tasks_ready", func)
+
+
 @pytest.mark.anyio
 @pytest.fixture
 async def start_modular_build(
@@ -52,7 +61,7 @@ async def build_done(
     session: AsyncSession,
     regular_build: Build,
     start_build,
-    create_entity,
+    create_entities,
     get_rpm_packages_info,
 ):
     build = await get_builds(db=session, build_id=regular_build.id)
@@ -84,7 +93,7 @@ async def modular_build_done(
     session: AsyncSession,
     modular_build: Build,
     start_modular_build,
-    create_entity,
+    create_entities,
     get_rpm_packages_info,
     get_repo_modules_yaml,
     get_repo_modules,
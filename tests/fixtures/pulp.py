@@ -1,4 +1,3 @@
-import asyncio
 import hashlib
 import re
 import uuid
@@ -7,7 +6,12 @@ import pytest
 
 from alws.config import settings
 from alws.utils.modularity import IndexWrapper
+from alws.utils.pulp_cache import PulpContentCache
 from alws.utils.pulp_client import PulpClient
+from alws.utils.pulp_content_converter import PulpContentConverter
+from alws.utils.pulp_modify_coalescer import PulpModifyCoalescer
+from alws.utils.pulp_publication_scheduler import PulpPublicationScheduler
+from alws.utils.pulp_scheduler import PulpRequestScheduler
 from tests.test_utils.pulp_utils import (
     get_artifact_href,
     get_distros_href,
@@ -22,10 +26,34 @@ from tests.test_utils.pulp_utils import (
 
 
 @pytest.fixture(autouse=True)
-def semaphore_patch(monkeypatch):
+def scheduler_patch(monkeypatch):
     monkeypatch.setattr(
-        "alws.utils.pulp_client.PULP_SEMAPHORE",
-        asyncio.Semaphore(5),
+        "alws.utils.pulp_client.PULP_SCHEDULER",
+        PulpRequestScheduler(settings.pulp_request_lanes),
+    )
+
+
+@pytest.fixture(autouse=True)
+def content_cache_patch(monkeypatch):
+    monkeypatch.setattr(
+        "alws.utils.pulp_client.PULP_CONTENT_CACHE",
+        PulpContentCache(),
+    )
+
+
+@pytest.fixture(autouse=True)
+def modify_coalescer_patch(monkeypatch):
+    monkeypatch.setattr(
+        "alws.utils.pulp_client.PULP_MODIFY_COALESCER",
+        PulpModifyCoalescer(window=0),
+    )
+
+
+@pytest.fixture(autouse=True)
+def publication_scheduler_patch(monkeypatch):
+    monkeypatch.setattr(
+        "alws.utils.pulp_client.PULP_PUBLICATION_SCHEDULER",
+        PulpPublicationScheduler(quiet_period=0),
     )
 
 
@@ -306,15 +334,18 @@ def get_repo_modules(
 
 
 @pytest.fixture
-def create_entity(monkeypatch):
+def create_entities(monkeypatch):
     async def func(*args, **kwargs):
-        _, artifact = args
-        href = get_file_href()
-        if artifact.type == "rpm":
-            href = get_rpm_pkg_href()
-        return href, hashlib.sha256().hexdigest(), artifact
-
-    monkeypatch.setattr(PulpClient, "create_entity", func)
+        _, artifacts = args
+        results = []
+        for artifact in artifacts:
+            href = get_file_href()
+            if artifact.type == "rpm":
+                href = get_rpm_pkg_href()
+            results.append((href, hashlib.sha256().hexdigest(), artifact))
+        return results
+
+    monkeypatch.setattr(PulpContentConverter, "convert", func)
 
 
 @pytest.fixture
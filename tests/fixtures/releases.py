@@ -20,11 +20,11 @@ async def get_pulp_packages_info(monkeypatch):
 
 @pytest.fixture
 def disable_packages_check_in_prod_repos(monkeypatch):
-    def func(*args, **kwargs):
+    async def func(*args, **kwargs):
         return []
 
     monkeypatch.setattr(
-        "alws.release_planner.get_rpm_packages_from_repositories",
+        "alws.release_planner.get_rpm_packages_from_repositories_async",
         func,
     )
 
@@ -43,10 +43,10 @@ async def disable_sign_verify(monkeypatch):
 
 @pytest.fixture(autouse=True)
 def mock_get_packages_from_64_bit_repos(monkeypatch):
-    def func(*args, **kwargs):
+    async def func(*args, **kwargs):
         return []
 
     monkeypatch.setattr(
-        "alws.release_planner.get_rpm_packages_from_repository",
+        "alws.release_planner.get_rpm_packages_from_repository_async",
         func,
     )
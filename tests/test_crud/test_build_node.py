@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import Delete
+
+from alws import models
+from alws.constants import BuildTaskStatus
+from alws.crud.build_node import (
+    plan_failed_build_items_restart,
+    plan_failed_build_items_restart_in_parallel,
+    restart_failed_build_items,
+)
+
+
+def _task(task_id: int, arch: str, status: int, srpm_url: str = None):
+    return SimpleNamespace(
+        id=task_id,
+        arch=arch,
+        status=status,
+        built_srpm_url=srpm_url,
+    )
+
+
+def _make_tasks_matrix():
+    failed = BuildTaskStatus.FAILED
+    return {
+        0: {
+            (1, "x86_64"): _task(1, "x86_64", failed, "srpm-1"),
+            (1, "i686"): _task(2, "i686", failed, "srpm-1"),
+        },
+        1: {
+            (1, "x86_64"): _task(3, "x86_64", failed, "srpm-2"),
+            (1, "i686"): _task(4, "i686", BuildTaskStatus.COMPLETED),
+        },
+        2: {
+            (1, "x86_64"): _task(5, "x86_64", failed),
+            (1, "i686"): _task(6, "i686", failed, "srpm-3"),
+        },
+    }
+
+
+class TestPlanFailedBuildItemsRestart:
+    def test_parallel(self):
+        restart = plan_failed_build_items_restart_in_parallel(
+            _make_tasks_matrix()
+        )
+        assert [task.id for task in restart.tasks] == [2, 1, 3, 6, 5]
+        assert restart.drop_srpm_task_ids == {1, 2, 6}
+        assert sorted(restart.dependencies) == [
+            (1, 2),
+            (3, 1),
+            (5, 3),
+            (5, 6),
+            (6, 2),
+        ]
+
+    def test_parallel_long_run_of_failed_items(self):
+        failed = BuildTaskStatus.FAILED
+        arches = ["i686", "x86_64", "aarch64"]
+        tasks_matrix = {
+            idx: {
+                (1, arch): _task(idx * len(arches) + number, arch, failed)
+                for number, arch in enumerate(arches)
+            }
+            for idx in range(500)
+        }
+        restart = plan_failed_build_items_restart_in_parallel(tasks_matrix)
+        # Every task waits for the first task of its index
+        # and for the previous task of its arch only
+        assert len(restart.tasks) == 1500
+        assert len(restart.dependencies) == 500 * 2 + 499 * 3
+
+    def test_sequential(self):
+        restart = plan_failed_build_items_restart(_make_tasks_matrix())
+        assert [task.id for task in restart.tasks] == [1, 2, 3, 5, 6]
+        assert restart.drop_srpm_task_ids == {1, 2, 6}
+        assert restart.dependencies == [(2, 1), (3, 2), (5, 3), (6, 5)]
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+
+class TestRestartFailedBuildItems:
+    @pytest.mark.anyio
+    async def test_build_done_ledger_is_cleared(self):
+        db = FakeSession()
+        restart = plan_failed_build_items_restart(_make_tasks_matrix())
+        await restart_failed_build_items(db, restart)
+        deleted_tables = [
+            statement.table.name
+            for statement in db.statements
+            if isinstance(statement, Delete)
+        ]
+        assert deleted_tables == [
+            models.BuildDoneLedgerEntry.__tablename__
+        ]
@@ -23,3 +23,34 @@ class TestBuildNodeSchema:
         )
         message = "is_debuginfo don't work with incorrect data"
         assert test_artifact.is_debuginfo is False, message
+
+    def test_artifacts_digest(self):
+        artifacts = [
+            {
+                "name": name,
+                "type": "rpm",
+                "href": f"/pulp/api/v3/artifacts/{i}/",
+                "sha256": f"{i}" * 64,
+            }
+            for i, name in enumerate(
+                ("chan-0.0.4-3.el8.src.rpm", "chan-0.0.4-3.el8.x86_64.rpm")
+            )
+        ]
+        build_done = build_node_schema.BuildDone(
+            task_id=1, status="done", artifacts=artifacts, stats={}
+        )
+        retry = build_node_schema.BuildDone(
+            task_id=1,
+            status="done",
+            artifacts=[
+                {**artifact, "href": f"/pulp/api/v3/artifacts/retry-{i}/"}
+                for i, artifact in enumerate(reversed(artifacts))
+            ],
+            stats={"build_node_task": {"start_ts": "2023-01-01T00:00:00"}},
+        )
+        failed = build_node_schema.BuildDone(
+            task_id=1, status="failed", artifacts=artifacts, stats={}
+        )
+        message = "artifacts_digest should be the same for retried build"
+        assert build_done.artifacts_digest == retry.artifacts_digest, message
+        assert build_done.artifacts_digest != failed.artifacts_digest
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from alws.utils.beholder_client import BeholderCache, BeholderClient
+
+
+@pytest.mark.anyio
+async def test_same_endpoint_is_requested_once(monkeypatch):
+    calls = []
+
+    async def get(self, endpoint, headers=None, params=None):
+        calls.append(endpoint)
+        await asyncio.sleep(0)
+        return {"artifacts": [{"arch": "x86_64"}]}
+
+    monkeypatch.setattr(BeholderClient, "_get", get)
+    client = BeholderClient("http://beholder", cache=BeholderCache())
+    endpoint = "api/v1/distros/almalinux/8/module/go/1/x86_64/"
+    params = {"match": "closest"}
+    responses = await asyncio.gather(
+        client.get(f"/{endpoint}", params=params),
+        client.get(endpoint, params=params),
+    )
+    responses[0]["artifacts"][0]["arch"] = "i686"
+    assert responses[1] == {"artifacts": [{"arch": "x86_64"}]}
+    assert len(calls) == 1
+    await client.get(endpoint)
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_shared_cache_keeps_only_responses():
+    shared = BeholderCache(ttl=60)
+    results = iter([ValueError("unavailable"), {"ok": True}])
+
+    async def fetch():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    key = ("http://beholder/api/v1/distros/", ())
+    with pytest.raises(ValueError):
+        await BeholderCache(shared=shared).get_or_fetch(key, fetch)
+    assert await BeholderCache(shared=shared).get_or_fetch(key, fetch) == {
+        "ok": True,
+    }
+    assert await BeholderCache(shared=shared).get_or_fetch(key, fetch) == {
+        "ok": True,
+    }
+    assert shared.stats == {"hits": 1, "misses": 2}
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from alws.utils.build_task_dispatcher import ANY_ARCH, BuildTaskDispatcher
+
+
+@pytest.fixture
+def dispatcher(monkeypatch) -> BuildTaskDispatcher:
+    dispatcher = BuildTaskDispatcher()
+    # Redis subscription isn't needed to test waiters matching
+    monkeypatch.setattr(dispatcher, "_ensure_listener", lambda: None)
+    return dispatcher
+
+
+@pytest.mark.anyio
+async def test_waiters_are_woken_by_matching_arches(dispatcher):
+    with dispatcher.subscribe(["x86_64", "i686"]) as x86_ready, \
+            dispatcher.subscribe(["aarch64"]) as arm_ready:
+        dispatcher.wake(["i686"])
+        assert x86_ready.is_set()
+        assert not arm_ready.is_set()
+        dispatcher.wake([ANY_ARCH])
+        assert arm_ready.is_set()
+    assert dispatcher.stats == {"notifications": 2, "wakeups": 3}
+
+
+@pytest.mark.anyio
+async def test_unsubscribed_waiter_is_not_woken(dispatcher):
+    with dispatcher.subscribe(["x86_64"]) as ready:
+        pass
+    dispatcher.wake(["x86_64"])
+    assert not ready.is_set()
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(ready.wait(), 0.01)
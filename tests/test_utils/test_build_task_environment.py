@@ -0,0 +1,35 @@
+import pytest
+
+from alws.utils.build_task_environment import BuildTaskEnvironmentCache
+
+
+@pytest.mark.anyio
+async def test_environment_is_created_once():
+    cache = BuildTaskEnvironmentCache()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        return {"mock": {"definitions": {}}}
+
+    environment = await cache.get_or_create((1, 1, "x86_64"), create)
+    environment["mock"]["definitions"]["task"] = "1"
+    assert await cache.get_or_create((1, 1, "x86_64"), create) == {
+        "mock": {"definitions": {}},
+    }
+    await cache.get_or_create((1, 1, "i686"), create)
+    assert len(calls) == 2
+    assert cache.stats["hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_invalidate_drops_environments():
+    cache = BuildTaskEnvironmentCache()
+    values = iter(["old", "new"])
+
+    async def create():
+        return next(values)
+
+    assert await cache.get_or_create((1, 1, "x86_64"), create) == "old"
+    await cache.invalidate()
+    assert await cache.get_or_create((1, 1, "x86_64"), create) == "new"
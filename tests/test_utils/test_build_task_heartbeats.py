@@ -0,0 +1,45 @@
+import contextlib
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from alws.constants import BuildTaskStatus
+from alws.utils.build_task_heartbeats import BuildTaskHeartbeats
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=1)
+
+
+@pytest.mark.anyio
+async def test_discarded_heartbeats_are_not_flushed():
+    heartbeats = BuildTaskHeartbeats(lease_timeout=60)
+    await heartbeats.record([1, 2, 3])
+    heartbeats._heartbeats[2] = time.time() - 120
+    await heartbeats.discard([3])
+    db = FakeSession()
+    assert await heartbeats.flush(db) == 1
+    assert heartbeats._heartbeats.keys() == {1}
+    params = db.statements[0].compile(
+        dialect=postgresql.asyncpg.dialect()
+    ).params
+    assert BuildTaskStatus.STARTED in params.values()
+
+
+@pytest.mark.anyio
+async def test_flush_without_heartbeats():
+    heartbeats = BuildTaskHeartbeats(lease_timeout=60)
+    db = FakeSession()
+    assert await heartbeats.flush(db) == 0
+    assert not db.statements
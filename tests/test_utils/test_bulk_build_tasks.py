@@ -0,0 +1,112 @@
+import itertools
+
+import pytest
+
+from alws import models
+from alws.build_planner import BuildPlanner
+from alws.schemas.build_schema import BuildCreatePlatforms
+
+
+class FakeResult:
+    def __init__(self, values):
+        self._values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._values
+
+
+class FakeSession:
+    def __init__(self):
+        self._ids = itertools.count(100)
+        self.inserts = {}
+
+    async def execute(self, statement, params=None):
+        if params is None:
+            count = statement.get_final_froms()[0].clauses.clauses[1].value
+            return FakeResult([next(self._ids) for _ in range(count)])
+        self.inserts.setdefault(statement.table.name, []).extend(params)
+        return FakeResult([])
+
+
+def make_planner(bulk_mode: bool, parallel: bool) -> BuildPlanner:
+    planner = BuildPlanner(
+        FakeSession(),
+        models.Build(id=1, tasks=[]),
+        platforms=[
+            BuildCreatePlatforms(
+                name="AlmaLinux-8",
+                arch_list=["x86_64", "i686", "aarch64"],
+                parallel_mode_enabled=parallel,
+            ),
+        ],
+        platform_flavors=None,
+        is_secure_boot=False,
+        module_build_index=None,
+        bulk_mode=bulk_mode,
+    )
+    planner._platforms = [models.Platform(id=1, name="AlmaLinux-8")]
+    return planner
+
+
+async def add_refs(planner: BuildPlanner, count: int):
+    for number in range(count):
+        await planner._add_single_ref(
+            models.BuildTaskRef(url=f"https://git/{number}", ref_type=1)
+        )
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("parallel", [True, False])
+async def test_bulk_tasks_keep_dependencies(parallel: bool):
+    orm_planner = make_planner(bulk_mode=False, parallel=parallel)
+    bulk_planner = make_planner(bulk_mode=True, parallel=parallel)
+    for planner in (orm_planner, bulk_planner):
+        await add_refs(planner, 5)
+
+    orm_tasks = orm_planner.create_build().tasks
+    orm_numbers = {id(task): number for number, task in enumerate(orm_tasks)}
+    orm_rows = [
+        (task.ref.url, task.arch, task.index) for task in orm_tasks
+    ]
+    orm_dependencies = sorted(
+        (number, orm_numbers[id(dependency)])
+        for number, task in enumerate(orm_tasks)
+        for dependency in task.dependencies
+    )
+
+    bulk_tasks = bulk_planner._bulk_tasks
+    bulk_rows = [
+        (bulk_tasks._refs[ref_number].url, fields["arch"], fields["index"])
+        for ref_number, _, _, fields in bulk_tasks.tasks
+    ]
+    assert bulk_rows == orm_rows
+    assert orm_rows[0][1] == "i686"
+    assert sorted(bulk_tasks.dependencies) == orm_dependencies
+
+
+@pytest.mark.anyio
+async def test_bulk_tasks_write_in_chunks():
+    planner = make_planner(bulk_mode=True, parallel=True)
+    planner._bulk_tasks._chunk_size = 4
+    await add_refs(planner, 3)
+    await planner.write_bulk_tasks()
+
+    inserts = planner._db.inserts
+    refs = inserts["build_task_refs"]
+    tasks = inserts["build_tasks"]
+    dependencies = inserts["build_task_dependency"]
+    assert len(refs) == 3
+    assert len(tasks) == 9
+    ref_ids = {row["id"] for row in refs}
+    task_ids = {row["id"] for row in tasks}
+    assert all(row["ref_id"] in ref_ids for row in tasks)
+    assert all(row["build_id"] == 1 for row in tasks)
+    assert all(
+        row["build_task_id"] in task_ids
+        and row["build_task_dependency"] in task_ids
+        for row in dependencies
+    )
+    assert len(dependencies) == len(planner._bulk_tasks.dependencies)
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from alws.utils.cas_checker import CasArtifactChecker
+
+
+class FakeCasWrapper:
+    def __init__(self, notarized, delay: float = 0.0):
+        self._notarized = notarized
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    def authenticate_artifact(self, sha256: str, use_hash: bool = False):
+        with self._lock:
+            self.calls.append(sha256)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self._delay)
+        with self._lock:
+            self.running -= 1
+        return sha256 in self._notarized
+
+
+@pytest.mark.anyio
+async def test_checks_run_in_bounded_pool():
+    checker = CasArtifactChecker(max_workers=3)
+    cas_wrapper = FakeCasWrapper({"a", "c"}, delay=0.05)
+    results = await asyncio.gather(*(
+        checker.authenticate(cas_wrapper, sha256)
+        for sha256 in ("a", "b", "c", "d", "e", "f")
+    ))
+    assert results == [True, False, True, False, False, False]
+    assert cas_wrapper.max_running == 3
+
+
+@pytest.mark.anyio
+async def test_successful_checks_are_cached():
+    checker = CasArtifactChecker(max_workers=2)
+    cas_wrapper = FakeCasWrapper({"a"})
+    for _ in range(3):
+        assert await checker.authenticate(cas_wrapper, "a")
+        assert not await checker.authenticate(cas_wrapper, "b")
+    assert cas_wrapper.calls == ["a", "b", "b", "b"]
+    assert checker.stats["hits"] == 2
+
+
+@pytest.mark.anyio
+async def test_cached_checks_expire():
+    checker = CasArtifactChecker(ttl=0)
+    cas_wrapper = FakeCasWrapper({"a"})
+    assert await checker.authenticate(cas_wrapper, "a")
+    await asyncio.sleep(0.01)
+    assert await checker.authenticate(cas_wrapper, "a")
+    assert cas_wrapper.calls == ["a", "a"]
+
+
+@pytest.mark.anyio
+async def test_concurrent_checks_share_call():
+    checker = CasArtifactChecker()
+    cas_wrapper = FakeCasWrapper({"a"}, delay=0.05)
+    results = await asyncio.gather(*(
+        checker.authenticate(cas_wrapper, "a") for _ in range(5)
+    ))
+    assert results == [True] * 5
+    assert cas_wrapper.calls == ["a"]
@@ -0,0 +1,23 @@
+import pytest
+
+from alws.utils.pulp_cache import PulpContentCache
+
+
+@pytest.mark.anyio
+async def test_cache_evicts_least_recently_used():
+    cache = PulpContentCache(max_size=2)
+    await cache.set("artifact:1", "href-1")
+    await cache.set("artifact:2", "href-2")
+    assert await cache.get("artifact:1") == "href-1"
+    await cache.set("artifact:3", "href-3")
+    assert await cache.get("artifact:2") is None
+    assert await cache.get("artifact:1") == "href-1"
+    assert await cache.get("artifact:3") == "href-3"
+    assert cache.stats == {"hits": 3, "redis_hits": 0, "misses": 1}
+
+
+@pytest.mark.anyio
+async def test_cache_entries_expire():
+    cache = PulpContentCache(ttl=-1)
+    await cache.set("artifact:1", "href-1")
+    assert await cache.get("artifact:1") is None
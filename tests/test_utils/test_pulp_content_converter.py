@@ -0,0 +1,67 @@
+import hashlib
+import uuid
+
+import pytest
+
+from alws.schemas.build_node_schema import BuildDoneArtifact
+from alws.utils.pulp_client import PulpClient
+from alws.utils.pulp_content_converter import PulpContentConverter
+
+
+def make_artifact(name: str, artifact_type: str = "rpm"):
+    return BuildDoneArtifact(
+        name=name,
+        type=artifact_type,
+        href=f"/pulp/api/v3/artifacts/{uuid.uuid4()}/",
+        sha256=hashlib.sha256(name.encode()).hexdigest(),
+    )
+
+
+class ExistingPackage:
+    pulp_href = f"/pulp/api/v3/content/rpm/packages/{uuid.uuid4()}/"
+
+
+@pytest.mark.anyio
+async def test_only_missing_content_is_created(monkeypatch):
+    artifacts = [
+        make_artifact("chan-0.0.4-3.el8.src.rpm"),
+        make_artifact("chan-0.0.4-3.el8.x86_64.rpm"),
+        make_artifact("mock_stderr.log", "build_log"),
+    ]
+    created = []
+
+    async def get_artifacts_sha256(artifact_ids):
+        return {
+            uuid.UUID(artifact.href.split("/")[-2]): artifact.sha256
+            for artifact in artifacts
+        }
+
+    async def get_packages_by_checksums(checksums):
+        return {artifacts[0].sha256: ExistingPackage()}
+
+    async def create_content(self, name, href, *args, **kwargs):
+        created.append(name)
+        return f"/pulp/api/v3/content/{name}/"
+
+    module = "alws.utils.pulp_content_converter"
+    monkeypatch.setattr(
+        f"{module}.get_artifacts_sha256_async", get_artifacts_sha256
+    )
+    monkeypatch.setattr(
+        f"{module}.get_rpm_packages_by_checksums_async",
+        get_packages_by_checksums,
+    )
+    monkeypatch.setattr(
+        PulpClient, "create_rpm_package_content", create_content
+    )
+    monkeypatch.setattr(PulpClient, "create_file", create_content)
+    converter = PulpContentConverter(
+        PulpClient("http://pulp", "user", "password"), batch_size=1
+    )
+    results = await converter.convert(artifacts)
+    assert created == [artifacts[1].name, artifacts[2].name]
+    assert results[0][0] == ExistingPackage.pulp_href
+    assert [sha256 for _, sha256, _ in results] == [
+        artifact.sha256 for artifact in artifacts
+    ]
+    assert converter.stats == {"cached": 0, "existing": 1, "created": 2}
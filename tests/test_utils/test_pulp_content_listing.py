@@ -0,0 +1,146 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from alws.pulp_models import (
+    CoreArtifact,
+    CoreContent,
+    CoreContentArtifact,
+    CoreRepository,
+    CoreRepositoryContent,
+    CoreRepositoryVersion,
+    PulpBase,
+    RpmPackage,
+)
+from alws.utils.pulp_content_listing import (
+    PulpContentListing,
+    parse_repository_href,
+)
+
+REPO_ID = uuid.uuid4()
+REPO_HREF = f"/pulp/api/v3/repositories/rpm/rpm/{REPO_ID}/"
+VERSION_HREF = f"{REPO_HREF}versions/3/"
+
+
+# Pulp tables are created in SQLite to query real rows
+@compiles(postgresql.UUID, "sqlite")
+def compile_uuid(type_, compiler, **kwargs):
+    return "CHAR(32)"
+
+
+@compiles(postgresql.JSONB, "sqlite")
+def compile_jsonb(type_, compiler, **kwargs):
+    return "TEXT"
+
+
+@pytest.fixture
+def pulp_db():
+    engine = create_engine("sqlite://")
+    PulpBase.metadata.create_all(
+        engine,
+        tables=[
+            model.__table__
+            for model in (
+                CoreRepository,
+                CoreRepositoryVersion,
+                CoreContent,
+                CoreArtifact,
+                CoreContentArtifact,
+                CoreRepositoryContent,
+                RpmPackage,
+            )
+        ],
+    )
+    with Session(engine) as session:
+        yield session
+
+
+def compile_query(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_parse_repository_href():
+    assert parse_repository_href(REPO_HREF) == (REPO_ID, None)
+    assert parse_repository_href(VERSION_HREF) == (REPO_ID, 3)
+    with pytest.raises(ValueError):
+        parse_repository_href("/pulp/api/v3/content/rpm/packages/")
+
+
+def test_packages_query_selects_requested_columns_only():
+    listing = PulpContentListing()
+    query = listing._packages_query(
+        VERSION_HREF,
+        ["pulp_href", "sha256", "artifact"],
+        search_params={"arch__in": "noarch,x86_64", "name": "bash"},
+    )
+    sql = compile_query(query)
+    select_clause = sql.split("FROM")[0]
+    assert "rpm_package.content_ptr_id" in select_clause
+    assert "core_artifact.sha256" in select_clause
+    assert "core_contentartifact.artifact_id" in select_clause
+    assert "rpm_package.location_href" not in select_clause
+    assert "core_repositoryversion_1.number <=" in sql
+    assert "rpm_package.arch IN" in sql
+
+
+def test_unsupported_search_params_are_rejected():
+    listing = PulpContentListing()
+    with pytest.raises(ValueError):
+        listing._packages_query(
+            REPO_HREF, ["pulp_href"], search_params={"name__contains": "a"}
+        )
+    with pytest.raises(ValueError):
+        listing._packages_query(REPO_HREF, ["requires"])
+
+
+def test_sha256_is_artifact_digest(pulp_db):
+    version_id = uuid.uuid4()
+    content_id = uuid.uuid4()
+    artifact_id = uuid.uuid4()
+    pulp_db.add_all([
+        CoreRepository(pulp_id=REPO_ID, name="repo"),
+        CoreRepositoryVersion(
+            pulp_id=version_id, repository_id=REPO_ID, number=3
+        ),
+        CoreContent(pulp_id=content_id, pulp_type="rpm.package"),
+        CoreArtifact(pulp_id=artifact_id, sha256="a" * 64),
+        CoreContentArtifact(
+            pulp_id=uuid.uuid4(),
+            content_id=content_id,
+            artifact_id=artifact_id,
+            relative_path="bash-5.1-1.x86_64.rpm",
+        ),
+        # pkgId of packages with sha1 checksum type isn't their sha256
+        RpmPackage(
+            content_ptr_id=content_id,
+            name="bash",
+            arch="x86_64",
+            pkgId="b" * 40,
+            checksum_type="sha1",
+        ),
+        CoreRepositoryContent(
+            pulp_id=uuid.uuid4(),
+            content_id=content_id,
+            repository_id=REPO_ID,
+            version_added_id=version_id,
+        ),
+    ])
+    pulp_db.commit()
+    package = pulp_db.get(RpmPackage, content_id)
+    listing = PulpContentListing()
+    rows = pulp_db.execute(
+        listing._packages_query(VERSION_HREF, ["name", "sha256"])
+    ).all()
+    assert rows == [("bash", package.sha256)]
+    rows = pulp_db.execute(
+        listing._packages_query(
+            VERSION_HREF,
+            ["name"],
+            search_params={"sha256__in": [package.sha256]},
+        )
+    ).all()
+    assert rows == [("bash",)]
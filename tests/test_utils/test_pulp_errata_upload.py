@@ -0,0 +1,56 @@
+import pytest
+
+from alws.utils.pulp_client import PulpClient
+
+
+@pytest.mark.anyio
+async def test_advisories_are_added_by_single_modification(monkeypatch):
+    modifications = []
+
+    async def create_errata_record(_, record: dict) -> str:
+        if record["id"] == "ALSA-2023:0002":
+            raise ValueError("invalid advisory")
+        return f"/pulp/api/v3/content/rpm/advisories/{record['id']}/"
+
+    async def modify_repository(_, repo_to: str, add=None, remove=None):
+        modifications.append((repo_to, add))
+        return {}
+
+    monkeypatch.setattr(
+        PulpClient, "create_errata_record", create_errata_record
+    )
+    monkeypatch.setattr(PulpClient, "modify_repository", modify_repository)
+    pulp = PulpClient("http://pulp", "user", "password")
+    records = [{"id": f"ALSA-2023:000{i}"} for i in range(1, 4)]
+
+    errors = await pulp.add_errata_records(records, "repo")
+
+    assert errors == {"ALSA-2023:0002": "invalid advisory"}
+    assert modifications == [
+        (
+            "repo",
+            [
+                "/pulp/api/v3/content/rpm/advisories/ALSA-2023:0001/",
+                "/pulp/api/v3/content/rpm/advisories/ALSA-2023:0003/",
+            ],
+        )
+    ]
+
+
+@pytest.mark.anyio
+async def test_modification_error_is_reported_for_every_record(monkeypatch):
+    async def create_errata_record(_, record: dict) -> str:
+        return record["id"]
+
+    async def modify_repository(*args, **kwargs):
+        raise ValueError("task failed")
+
+    monkeypatch.setattr(
+        PulpClient, "create_errata_record", create_errata_record
+    )
+    monkeypatch.setattr(PulpClient, "modify_repository", modify_repository)
+    pulp = PulpClient("http://pulp", "user", "password")
+
+    errors = await pulp.add_errata_records([{"id": "a"}, {"id": "b"}], "repo")
+
+    assert errors == {"a": "task failed", "b": "task failed"}
@@ -0,0 +1,73 @@
+import hashlib
+
+import pytest
+
+from alws.utils.pulp_client import PulpClient
+
+UPLOAD_HREF = "/pulp/api/v3/uploads/1/"
+
+
+@pytest.fixture
+def upload_requests(monkeypatch):
+    requests = []
+    chunks = {}
+
+    async def request(_, method: str, endpoint: str, **kwargs):
+        requests.append((method, endpoint, kwargs.get("json")))
+        if endpoint == "pulp/api/v3/uploads/":
+            return {"pulp_href": UPLOAD_HREF}
+        if endpoint.endswith("commit/"):
+            return {"task": "/pulp/api/v3/tasks/1/"}
+        return {}
+
+    async def upload_chunk(_, upload_href, chunk, name, start, file_size):
+        chunks[start] = bytes(chunk)
+
+    async def check_if_artifact_exists(_, sha256: str):
+        return None
+
+    async def wait_for_task(_, task_href: str):
+        return {"created_resources": ["/pulp/api/v3/artifacts/1/"]}
+
+    monkeypatch.setattr(PulpClient, "request", request)
+    monkeypatch.setattr(PulpClient, "_upload_chunk", upload_chunk)
+    monkeypatch.setattr(
+        PulpClient, "check_if_artifact_exists", check_if_artifact_exists
+    )
+    monkeypatch.setattr(PulpClient, "wait_for_task", wait_for_task)
+    return requests, chunks
+
+
+@pytest.mark.anyio
+async def test_file_is_hashed_while_uploaded(tmp_path, upload_requests):
+    requests, chunks = upload_requests
+    content = bytes(range(256)) * 40
+    file_path = tmp_path / "package.rpm"
+    file_path.write_bytes(content)
+    sha256 = hashlib.sha256(content).hexdigest()
+    pulp = PulpClient("http://pulp", "user", "password")
+
+    reference, file_sha256 = await pulp._upload_local_file(
+        str(file_path), sha256, chunk_size=1000, parallel_chunks=2
+    )
+
+    assert reference == "/pulp/api/v3/artifacts/1/"
+    assert file_sha256 == sha256
+    assert b"".join(chunks[start] for start in sorted(chunks)) == content
+    assert ("POST", f"{UPLOAD_HREF}commit/", {"sha256": sha256}) in requests
+
+
+@pytest.mark.anyio
+async def test_checksum_mismatch_drops_upload(tmp_path, upload_requests):
+    requests, _ = upload_requests
+    file_path = tmp_path / "package.rpm"
+    file_path.write_bytes(b"swapped content")
+    pulp = PulpClient("http://pulp", "user", "password")
+
+    with pytest.raises(ValueError):
+        await pulp._upload_local_file(str(file_path), "0" * 64)
+
+    assert ("DELETE", UPLOAD_HREF, None) in requests
+    assert not any(
+        endpoint.endswith("commit/") for _, endpoint, _ in requests
+    )
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from alws.utils.pulp_modify_coalescer import PulpModifyCoalescer
+
+
+class FakeModify:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, repo_href: str, add: list, remove: list):
+        self.calls.append((repo_href, sorted(add), sorted(remove)))
+        return {"state": "completed", "call": len(self.calls)}
+
+
+@pytest.mark.anyio
+async def test_concurrent_modifications_are_merged():
+    modify = FakeModify()
+    coalescer = PulpModifyCoalescer(window=0.01)
+    results = await asyncio.gather(
+        coalescer.modify("repo-1", modify, add=["a", "b"]),
+        coalescer.modify("repo-1", modify, add=["b", "c"], remove=["d"]),
+        coalescer.modify("repo-2", modify, add=["a"]),
+    )
+    assert sorted(modify.calls) == [
+        ("repo-1", ["a", "b", "c"], ["d"]),
+        ("repo-2", ["a"], []),
+    ]
+    assert results[0] is results[1]
+
+
+@pytest.mark.anyio
+async def test_conflicting_modifications_are_not_merged():
+    modify = FakeModify()
+    coalescer = PulpModifyCoalescer(window=0.01)
+    await asyncio.gather(
+        coalescer.modify("repo-1", modify, add=["a"]),
+        coalescer.modify("repo-1", modify, remove=["a"]),
+    )
+    assert modify.calls == [
+        ("repo-1", ["a"], []),
+        ("repo-1", [], ["a"]),
+    ]
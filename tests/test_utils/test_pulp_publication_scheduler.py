@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from alws.utils.pulp_publication_scheduler import PulpPublicationScheduler
+
+
+@pytest.mark.anyio
+async def test_requests_within_quiet_period_are_collapsed():
+    scheduler = PulpPublicationScheduler(quiet_period=0.05)
+    published = []
+
+    async def publish(repo_href: str):
+        published.append(repo_href)
+        return repo_href
+
+    results = await asyncio.gather(
+        scheduler.schedule("repo-a", publish),
+        scheduler.schedule("repo-a", publish),
+        scheduler.schedule("repo-b", publish),
+    )
+    assert results == ["repo-a", "repo-a", "repo-b"]
+    assert sorted(published) == ["repo-a", "repo-b"]
+    assert scheduler.stats == {"requests": 3, "publications": 2}
+
+
+@pytest.mark.anyio
+async def test_request_during_publication_triggers_next_one():
+    scheduler = PulpPublicationScheduler(quiet_period=0)
+    release = asyncio.Event()
+    calls = 0
+
+    async def publish(repo_href: str):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await release.wait()
+        return calls
+
+    first = scheduler.schedule("repo", publish)
+    await asyncio.sleep(0.01)
+    second = scheduler.schedule("repo", publish)
+    third = scheduler.schedule("repo", publish)
+    await asyncio.sleep(0.01)
+    assert calls == 1
+    release.set()
+    assert await first == 1
+    assert await second == 2
+    assert await third == 2
+
+
+@pytest.mark.anyio
+async def test_publication_error_is_propagated():
+    scheduler = PulpPublicationScheduler(quiet_period=0)
+
+    async def publish(repo_href: str):
+        raise ValueError(repo_href)
+
+    with pytest.raises(ValueError):
+        await scheduler.schedule("repo", publish)
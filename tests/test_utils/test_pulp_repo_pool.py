@@ -0,0 +1,97 @@
+import collections
+
+import pytest
+
+from alws.utils.pulp_repo_pool import PulpRepositoryPool
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lists = collections.defaultdict(list)
+        self.keys = {}
+
+    async def lpop(self, key):
+        if not self.lists[key]:
+            return None
+        return self.lists[key].pop(0)
+
+    async def lpush(self, key, value):
+        self.lists[key].insert(0, value)
+
+    async def rpush(self, key, value):
+        self.lists[key].append(value)
+
+    async def llen(self, key):
+        return len(self.lists[key])
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def delete(self, key):
+        self.keys.pop(key, None)
+
+
+class FakePulpClient:
+    def __init__(self, rename_failures: int = 0):
+        self.rename_failures = rename_failures
+        self.renamed = []
+
+    async def rename_repository(self, repo_href, name, new_name, **kwargs):
+        if self.rename_failures:
+            self.rename_failures -= 1
+            raise ConnectionError("Pulp is unavailable")
+        self.renamed.append((name, new_name))
+
+    async def create_rpm_repository(self, name, **kwargs):
+        return f"http://pulp/builds/{name}/", f"/rpm/{name}/"
+
+    async def create_log_repo(self, name, **kwargs):
+        return f"http://pulp/logs/{name}/", f"/file/{name}/"
+
+
+@pytest.mark.anyio
+async def test_pool_is_refilled_up_to_size(monkeypatch):
+    pool = PulpRepositoryPool(size=2, redis_url="redis://redis")
+    redis = FakeRedis()
+    monkeypatch.setattr(pool, "_get_redis", lambda: redis)
+    assert await pool.claim("rpm") is None
+    assert await pool.refill(FakePulpClient()) == 6
+    repo = await pool.claim("rpm")
+    assert repo["url"] == f"http://pulp/builds/{repo['name']}/"
+    assert await pool.refill(FakePulpClient()) == 1
+    assert pool.stats["depth"] == {"rpm": 2, "build_log": 2, "test_log": 2}
+
+
+@pytest.mark.anyio
+async def test_disabled_pool_is_empty():
+    pool = PulpRepositoryPool(size=0, redis_url="redis://redis")
+    assert await pool.claim("rpm") is None
+
+
+@pytest.mark.anyio
+async def test_released_repository_is_claimed_first(monkeypatch):
+    pool = PulpRepositoryPool(size=2, redis_url="redis://redis")
+    redis = FakeRedis()
+    monkeypatch.setattr(pool, "_get_redis", lambda: redis)
+    await pool.refill(FakePulpClient())
+    repo = await pool.claim("build_log")
+    await pool.release("build_log", repo)
+    assert await pool.claim("build_log") == repo
+    assert pool.stats["released"] == 1
+
+
+@pytest.mark.anyio
+async def test_failed_renames_are_retried(monkeypatch):
+    pool = PulpRepositoryPool(size=1, redis_url="redis://redis")
+    redis = FakeRedis()
+    monkeypatch.setattr(pool, "_get_redis", lambda: redis)
+    pulp_client = FakePulpClient(rename_failures=1)
+    entry = {"name": "pool-rpm-1", "url": "url", "pulp_href": "/rpm/1/"}
+    await pool.schedule_rename(entry, "AlmaLinux-8-x86_64-1-br", "rpm")
+    assert await pool.retry_renames(pulp_client) == 0
+    assert await pool.retry_renames(pulp_client) == 1
+    assert pulp_client.renamed == [("pool-rpm-1", "AlmaLinux-8-x86_64-1-br")]
+    assert await pool.retry_renames(pulp_client) == 0
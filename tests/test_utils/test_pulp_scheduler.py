@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from alws.utils.pulp_scheduler import (
+    READ_LANE,
+    TASK_LANE,
+    WRITE_LANE,
+    PulpRequestScheduler,
+)
+
+
+@pytest.mark.anyio
+async def test_waiters_are_served_by_priority():
+    scheduler = PulpRequestScheduler({WRITE_LANE: 1})
+    order = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: int):
+        async with scheduler.slot(WRITE_LANE, priority=priority):
+            if name == "first":
+                await release.wait()
+            order.append(name)
+
+    first = asyncio.create_task(request("first", 0))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(request("bulk", 10)),
+        asyncio.create_task(request("interactive", 0)),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.stats[WRITE_LANE]["queue_depth"] == 2
+    release.set()
+    await asyncio.gather(first, *waiters)
+    assert order == ["first", "interactive", "bulk"]
+    assert scheduler.stats[WRITE_LANE]["in_flight"] == 0
+
+
+@pytest.mark.anyio
+async def test_lanes_have_independent_budgets():
+    scheduler = PulpRequestScheduler({READ_LANE: 1, TASK_LANE: 1})
+    async with scheduler.slot(TASK_LANE):
+        async with scheduler.slot(READ_LANE):
+            stats = scheduler.stats
+    assert stats[TASK_LANE]["in_flight"] == 1
+    assert stats[READ_LANE]["in_flight"] == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = PulpRequestScheduler({READ_LANE: 1})
+    async with scheduler.slot(READ_LANE):
+        waiter = asyncio.create_task(
+            scheduler.slot(READ_LANE).__aenter__()
+        )
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    async with scheduler.slot(READ_LANE):
+        assert scheduler.stats[READ_LANE]["in_flight"] == 1
+    assert scheduler.stats[READ_LANE]["in_flight"] == 0
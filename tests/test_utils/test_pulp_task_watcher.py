@@ -0,0 +1,70 @@
+import asyncio
+import uuid
+
+import pytest
+
+from alws.utils.pulp_task_watcher import PulpTaskWatcher
+
+
+def get_task_href() -> str:
+    return f"/pulp/api/v3/tasks/{uuid.uuid4()}/"
+
+
+class FakeTasksApi:
+    def __init__(self, finish_after: dict):
+        self.finish_after = finish_after
+        self.requests = 0
+
+    async def request(self, method: str, endpoint: str, params: dict = None):
+        self.requests += 1
+        results = []
+        for task_id in params["pulp_id__in"].split(","):
+            href = f"/pulp/api/v3/tasks/{task_id}/"
+            if href not in self.finish_after:
+                continue
+            self.finish_after[href] -= 1
+            state = "running"
+            if self.finish_after[href] <= 0:
+                state = "completed"
+            results.append({"pulp_href": href, "state": state})
+        return {"count": len(results), "results": results}
+
+
+@pytest.mark.anyio
+async def test_tasks_are_checked_in_batches():
+    hrefs = [get_task_href() for _ in range(20)]
+    api = FakeTasksApi({href: 2 for href in hrefs})
+    watcher = PulpTaskWatcher(min_interval=0.01, max_interval=0.05)
+    results = await asyncio.gather(
+        *(watcher.wait(href, api.request) for href in hrefs)
+    )
+    assert [task["pulp_href"] for task in results] == hrefs
+    assert all(task["state"] == "completed" for task in results)
+    assert api.requests == 2
+    assert watcher.pending_count == 0
+
+
+@pytest.mark.anyio
+async def test_failed_query_is_propagated():
+    async def request(*args, **kwargs):
+        raise ValueError("Pulp is down")
+
+    watcher = PulpTaskWatcher(min_interval=0.01)
+    with pytest.raises(ValueError):
+        await watcher.wait(get_task_href(), request)
+
+
+@pytest.mark.anyio
+async def test_missing_task_is_failed():
+    href = get_task_href()
+    missing_href = get_task_href()
+    api = FakeTasksApi({href: 2})
+    watcher = PulpTaskWatcher(min_interval=0.01, max_interval=0.05)
+    results = await asyncio.gather(
+        watcher.wait(href, api.request),
+        watcher.wait(missing_href, api.request),
+        return_exceptions=True,
+    )
+    assert results[0]["state"] == "completed"
+    assert isinstance(results[1], LookupError)
+    assert watcher.pending_count == 0
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from alws.utils.stage_graph import StageGraph
+
+
+def make_stage(events: list, name: str, delay: float):
+    async def stage():
+        events.append(f"{name} started")
+        await asyncio.sleep(delay)
+        events.append(f"{name} finished")
+        return name
+
+    return stage
+
+
+@pytest.mark.anyio
+async def test_independent_stages_run_concurrently():
+    events = []
+    graph = StageGraph()
+    graph.add("logs", make_stage(events, "logs", 0.02))
+    graph.add("packages", make_stage(events, "packages", 0.01))
+    graph.add(
+        "module",
+        make_stage(events, "module", 0.01),
+        depends_on=["packages"],
+    )
+    results = await graph.run()
+    assert results == {
+        "logs": "logs",
+        "packages": "packages",
+        "module": "module",
+    }
+    assert events[:2] == ["logs started", "packages started"]
+    assert events.index("module started") > events.index("packages finished")
+    graph.add("noarch", make_stage(events, "noarch", 0))
+    await graph.run()
+    assert set(graph.stats) == {"logs", "packages", "module", "noarch"}
+    assert graph.critical_path[-1] == "noarch"
+
+
+@pytest.mark.anyio
+async def test_failed_stage_cancels_others():
+    events = []
+
+    async def fail():
+        raise ValueError("Pulp is down")
+
+    graph = StageGraph()
+    graph.add("logs", make_stage(events, "logs", 1))
+    graph.add("packages", fail)
+    graph.add("module", make_stage(events, "module", 0), ["packages"])
+    with pytest.raises(ValueError):
+        await graph.run()
+    assert events == ["logs started"]